@@ -0,0 +1,58 @@
+# core/arranque.py
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Momento en que se importó este módulo (main.py lo importa primero): origen de los tiempos del reporte
+INICIO_PROCESO = time.perf_counter()
+
+class ReporteArranque:
+    """
+    Registra el tiempo de cada fase del arranque (importaciones, inicialización del proceso y
+    de la primera sesión) para el reporte de --startup-report.
+    """
+    def __init__(self):
+        self._fases = [] # [(nombre, segundos)] en el orden en que terminaron
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def fase(self, nombre: str):
+        """Mide el bloque 'with' y lo registra como una fase del arranque."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nombre, time.perf_counter() - inicio)
+
+    def registrar(self, nombre: str, segundos: float):
+        with self._lock:
+            self._fases.append((nombre, segundos))
+
+    def importar(self, modulo: str):
+        """
+        Importa un módulo midiendo el tiempo como una fase 'import <modulo>'.
+        Si ya estaba importado no se registra (su costo se contó en la fase que lo cargó).
+
+        Returns:
+            module: El módulo importado.
+        """
+        if modulo in sys.modules:
+            return sys.modules[modulo]
+        with self.fase(f"import {modulo}"):
+            return importlib.import_module(modulo)
+
+    def texto(self) -> str:
+        """Reporte con la duración de cada fase y el tiempo total desde el inicio del proceso."""
+        with self._lock:
+            fases = list(self._fases)
+        ancho = max([len(nombre) for nombre, _ in fases] + [len("Fase")])
+        lineas = ["Reporte de arranque", f"{'Fase':<{ancho}}  {'ms':>9}"]
+        for nombre, segundos in fases:
+            lineas.append(f"{nombre:<{ancho}}  {segundos * 1000:>9.1f}")
+        lineas.append(f"{'Total desde el inicio del proceso':<{ancho}}  {(time.perf_counter() - INICIO_PROCESO) * 1000:>9.1f}")
+        return "\n".join(lineas)
+
+# Reporte compartido por main.py y la primera sesión
+reporte_arranque = ReporteArranque()
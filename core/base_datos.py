@@ -0,0 +1,108 @@
+# core/base_datos.py
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from core.config import settings
+from core.replicas import ESCRITURA, destino_consultas
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+def es_sqlite(url: str) -> bool:
+    """Indica si la URL de conexión es de SQLite (modo de un solo nodo)."""
+    return make_url(url).get_backend_name() == "sqlite"
+
+def crear_engine(url: str = None):
+    """
+    Crea el motor de base de datos de la aplicación. Con PostgreSQL es el motor por defecto de SQLAlchemy;
+    con SQLite se configura para los manejadores de Flet, que usan la base desde varios hilos:
+      - Un pool de conexiones (una por hilo a la vez) con check_same_thread desactivado.
+      - WAL: las lecturas no bloquean a la escritura ni la escritura a las lecturas (hay un solo escritor a la vez).
+      - synchronous=NORMAL (con WAL no se pierde la consistencia ante un corte, solo las últimas
+        transacciones), caché de páginas, mmap y tablas temporales en memoria.
+      - Claves foráneas activadas (ON DELETE CASCADE como en PostgreSQL).
+      - Las transacciones empiezan con BEGIN DEFERRED (sin bloqueo hasta la primera escritura), salvo las
+        de los métodos de los servicios que pueden escribir (todos menos get_*, search_*, count*, ...; ver
+        services/base_service.py), que usan SQLITE_BEGIN (IMMEDIATE): toman el bloqueo de escritura al
+        empezar y esperan hasta SQLITE_BUSY_TIMEOUT_MS, en lugar de fallar con "database is locked"
+        cuando una transacción que ya leyó intenta escribir mientras otra escribe. Así solo se
+        serializan las escrituras; las lecturas se ejecutan en paralelo.
+
+    Args:
+        url (str, optional): URL de conexión. Defaults to settings.DATABASE_URL.
+
+    Returns:
+        Engine: El motor de SQLAlchemy.
+    """
+    url = url or settings.DATABASE_URL
+    if not es_sqlite(url):
+        return create_engine(url)
+
+    engine = create_engine(url, connect_args={
+        "check_same_thread": False, # El pool garantiza que cada conexión la use un solo hilo a la vez
+        "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    })
+    pragmas = (
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_MB * 1024}", # Negativo: tamaño en KiB
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_MB * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA foreign_keys=ON",
+    )
+    inicio_escritura = f"BEGIN {settings.SQLITE_BEGIN}"
+
+    @event.listens_for(engine, "connect")
+    def _al_conectar(dbapi_connection, connection_record):
+        # El driver no abre transacciones por su cuenta: las abre el evento "begin" con el modo configurado
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _al_iniciar(conn):
+        if conn.get_execution_options().get("isolation_level") == "AUTOCOMMIT":
+            return
+        conn.exec_driver_sql(inicio_escritura if destino_consultas.get() == ESCRITURA else "BEGIN DEFERRED")
+
+    logger.info("Base de datos SQLite en %s (WAL, escrituras con %s).", engine.url.database, inicio_escritura)
+    return engine
+
+def insert_con_conflicto(session, modelo):
+    """
+    INSERT del dialecto de la sesión, con on_conflict_do_update() y excluded (PostgreSQL y SQLite >= 3.24).
+
+    Args:
+        session (Session): Sesión (o conexión) con la que se ejecutará la sentencia.
+        modelo: Modelo o tabla en la que se inserta.
+
+    Returns:
+        Insert: La sentencia INSERT del dialecto.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(modelo)
+
+class mayor(FunctionElement):
+    """
+    El mayor de varios valores: greatest() en PostgreSQL y max() con varios argumentos en SQLite.
+    A diferencia de greatest(), en SQLite el resultado es NULL si algún valor es NULL.
+    """
+    name = "mayor"
+    inherit_cache = True
+
+@compiles(mayor)
+def _mayor_por_defecto(elemento, compilador, **kw):
+    return f"greatest({compilador.process(elemento.clauses, **kw)})"
+
+@compiles(mayor, "sqlite")
+def _mayor_sqlite(elemento, compilador, **kw):
+    return f"max({compilador.process(elemento.clauses, **kw)})"
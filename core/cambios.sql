@@ -16,3 +16,93 @@ ADD COLUMN whatsapp_chat_link TEXT;
 -- Añadir columna para el método de pago en la tabla pedidos
 ALTER TABLE pedidos
 ADD COLUMN metodo_pago VARCHAR(50);
+
+-- Columnas normalizadas de clientes para la búsqueda exacta del checkout
+-- (teléfono solo con dígitos en formato tipo E.164 y email en minúsculas)
+ALTER TABLE clientes
+ADD COLUMN telefono_normalizado VARCHAR(20),
+ADD COLUMN email_normalizado VARCHAR(120);
+
+-- Rellenar las columnas para los clientes existentes.
+-- Debe coincidir con utils/normalizacion.py (código de país por defecto: 58).
+UPDATE clientes SET telefono_normalizado = CASE
+    WHEN regexp_replace(telefono, '\D', '', 'g') = '' THEN NULL
+    WHEN regexp_replace(telefono, '\D', '', 'g') LIKE '00%' THEN '+' || substr(regexp_replace(telefono, '\D', '', 'g'), 3)
+    WHEN regexp_replace(telefono, '\D', '', 'g') LIKE '0%' THEN '+58' || substr(regexp_replace(telefono, '\D', '', 'g'), 2)
+    WHEN ltrim(telefono) NOT LIKE '+%' AND length(regexp_replace(telefono, '\D', '', 'g')) <= 10 THEN '+58' || regexp_replace(telefono, '\D', '', 'g')
+    ELSE '+' || regexp_replace(telefono, '\D', '', 'g')
+END
+WHERE telefono IS NOT NULL;
+UPDATE clientes SET email_normalizado = NULLIF(lower(btrim(email)), '');
+
+-- Índices únicos (btree). Si existen clientes duplicados por teléfono o email
+-- hay que fusionarlos antes de crear estos índices.
+CREATE UNIQUE INDEX ix_clientes_telefono_normalizado ON clientes (telefono_normalizado);
+CREATE UNIQUE INDEX ix_clientes_email_normalizado ON clientes (email_normalizado);
+
+-- El email del cliente es opcional en el checkout; el upsert de clientes usa el teléfono normalizado como clave
+ALTER TABLE clientes
+ALTER COLUMN email DROP NOT NULL;
+
+-- Búsqueda difusa de clientes en el panel de administración (ClienteService.search_clientes)
+-- Requiere la extensión pg_trgm (incluida en PostgreSQL contrib).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX ix_clientes_nombre_trgm ON clientes USING gin (nombre gin_trgm_ops);
+CREATE INDEX ix_clientes_email_trgm ON clientes USING gin (email gin_trgm_ops);
+CREATE INDEX ix_clientes_telefono_trgm ON clientes USING gin (telefono gin_trgm_ops);
+
+-- Métricas precalculadas por cliente (RFM) para segmentación y el panel de clientes
+CREATE TABLE cliente_metricas (
+    cliente_id INTEGER PRIMARY KEY REFERENCES clientes(id) ON DELETE CASCADE,
+    ultima_compra TIMESTAMP,
+    num_pedidos INTEGER NOT NULL DEFAULT 0,
+    total_gastado REAL NOT NULL DEFAULT 0,
+    ticket_promedio REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX ix_cliente_metricas_ultima_compra ON cliente_metricas (ultima_compra);
+
+-- Carga inicial (equivalente a MetricasClienteService.reconstruir_metricas())
+INSERT INTO cliente_metricas (cliente_id, ultima_compra, num_pedidos, total_gastado, ticket_promedio)
+SELECT cliente_id, max(fecha_hora), count(*), sum(total), avg(total)
+FROM pedidos
+WHERE estado <> 'Cancelado'
+GROUP BY cliente_id;
+
+-- Sesiones de administrador para despliegues con varios procesos (SESSION_BACKEND=postgres)
+CREATE TABLE sesiones_admin (
+    token VARCHAR(64) PRIMARY KEY,
+    administrador_id INTEGER NOT NULL REFERENCES administradores(id) ON DELETE CASCADE,
+    usuario VARCHAR(50) NOT NULL,
+    expira_en TIMESTAMP NOT NULL
+);
+CREATE INDEX ix_sesiones_admin_expira_en ON sesiones_admin (expira_en);
+
+-- Fecha de última modificación para las consultas incrementales del panel de administración
+-- (BaseService.changed_since). Un trigger la mantiene también en escrituras fuera del ORM
+-- (upserts, UPDATE manuales). Se usa clock_timestamp() y no now() para que la marca se acerque
+-- al momento del commit y no al inicio de la transacción.
+ALTER TABLE pedidos ADD COLUMN fecha_actualizacion TIMESTAMP NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE clientes ADD COLUMN fecha_actualizacion TIMESTAMP NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE items_menu ADD COLUMN fecha_actualizacion TIMESTAMP NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE registros_financieros ADD COLUMN fecha_actualizacion TIMESTAMP NOT NULL DEFAULT clock_timestamp();
+
+CREATE INDEX ix_pedidos_fecha_actualizacion ON pedidos (fecha_actualizacion);
+CREATE INDEX ix_clientes_fecha_actualizacion ON clientes (fecha_actualizacion);
+CREATE INDEX ix_items_menu_fecha_actualizacion ON items_menu (fecha_actualizacion);
+CREATE INDEX ix_registros_financieros_fecha_actualizacion ON registros_financieros (fecha_actualizacion);
+
+CREATE OR REPLACE FUNCTION marcar_fecha_actualizacion() RETURNS trigger AS $$
+BEGIN
+    NEW.fecha_actualizacion := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tr_pedidos_fecha_actualizacion BEFORE INSERT OR UPDATE ON pedidos
+    FOR EACH ROW EXECUTE FUNCTION marcar_fecha_actualizacion();
+CREATE TRIGGER tr_clientes_fecha_actualizacion BEFORE INSERT OR UPDATE ON clientes
+    FOR EACH ROW EXECUTE FUNCTION marcar_fecha_actualizacion();
+CREATE TRIGGER tr_items_menu_fecha_actualizacion BEFORE INSERT OR UPDATE ON items_menu
+    FOR EACH ROW EXECUTE FUNCTION marcar_fecha_actualizacion();
+CREATE TRIGGER tr_registros_financieros_fecha_actualizacion BEFORE INSERT OR UPDATE ON registros_financieros
+    FOR EACH ROW EXECUTE FUNCTION marcar_fecha_actualizacion();
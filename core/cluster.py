@@ -0,0 +1,301 @@
+# core/cluster.py
+import asyncio
+import os
+import subprocess
+import sys
+import zlib
+from core.config import settings
+from core.metricas import registro_metricas, iniciar_servidor_metricas
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+# Tamaño máximo de la cabecera de la primera petición HTTP de cada conexión
+MAX_CABECERA = 64 * 1024
+
+# Cabeceras de la petición que el balanceador reemplaza: las de la IP de origen las podría falsificar
+# el cliente, y las de conexión se sustituyen por "Connection: close" (una petición por conexión)
+_CABECERAS_ORIGEN = (b"x-forwarded-for", b"forwarded", b"x-real-ip")
+_CABECERAS_CONEXION = (b"connection", b"keep-alive", b"proxy-connection")
+
+conexiones_balanceadas = registro_metricas.counter(
+    "pizzeria_balancer_connections_total", "Conexiones reenviadas a un worker.")
+reinicios_workers = registro_metricas.counter(
+    "pizzeria_worker_restarts_total", "Workers reiniciados tras terminar inesperadamente.")
+
+def elegir_backend(ip: str, num_backends: int) -> int:
+    """
+    Índice del worker asignado a una IP. Es estable (crc32, no hash() que cambia entre procesos),
+    así que todas las conexiones de un cliente, incluida la reconexión del websocket de Flet,
+    llegan al proceso que guarda su sesión.
+    """
+    return zlib.crc32((ip or "").encode("utf-8")) % num_backends
+
+def _lineas_cabecera(cabecera: bytes) -> list[bytes]:
+    return cabecera.rstrip(b"\r\n").split(b"\r\n")
+
+def _valores(lineas: list[bytes], nombre: bytes) -> set[bytes]:
+    """Elementos (en minúsculas) de las cabeceras 'nombre', separados por comas y con las líneas de continuación unidas."""
+    valores = []
+    actual = None
+    for linea in lineas[1:]:
+        if linea.startswith((b" ", b"\t")): # Las líneas que empiezan con espacio continúan la cabecera anterior
+            if actual is not None:
+                actual.append(linea)
+            continue
+        partes = linea.split(b":", 1)
+        actual = [partes[1]] if len(partes) == 2 and partes[0].strip().lower() == nombre else None
+        if actual is not None:
+            valores.append(actual)
+    return {elemento.strip().lower() for valor in valores for elemento in b" ".join(valor).split(b",")} - {b""}
+
+def es_handshake_websocket(cabecera: bytes) -> bool:
+    """Indica si la petición es un handshake de websocket ("Upgrade: websocket" y "Connection: upgrade")."""
+    lineas = _lineas_cabecera(cabecera)
+    return b"websocket" in _valores(lineas, b"upgrade") and b"upgrade" in _valores(lineas, b"connection")
+
+def _filtrar(lineas: list[bytes], descartadas: tuple) -> list[bytes]:
+    conservadas = [lineas[0]]
+    descartar = False
+    for linea in lineas[1:]:
+        if not linea.startswith((b" ", b"\t")): # Las líneas que empiezan con espacio continúan la cabecera anterior
+            descartar = linea.split(b":", 1)[0].strip().lower() in descartadas
+        if not descartar:
+            conservadas.append(linea)
+    return conservadas
+
+def reescribir_cabecera(cabecera: bytes, ip: str) -> bytes:
+    """
+    Reescribe la cabecera de una petición HTTP para el worker: quita las cabeceras de IP de origen del
+    cliente y añade X-Forwarded-For con 'ip'; si no es un handshake de websocket, reemplaza las de
+    conexión por "Connection: close".
+
+    Args:
+        cabecera (bytes): Línea de la petición y cabeceras, terminadas en una línea vacía.
+        ip (str): IP real del cliente.
+
+    Returns:
+        bytes: La cabecera reescrita.
+    """
+    lineas = _lineas_cabecera(cabecera)
+    handshake = es_handshake_websocket(cabecera)
+    conservadas = _filtrar(lineas, _CABECERAS_ORIGEN if handshake else _CABECERAS_ORIGEN + _CABECERAS_CONEXION)
+    conservadas.append(f"X-Forwarded-For: {ip}".encode("latin-1"))
+    if not handshake:
+        conservadas.append(b"Connection: close")
+    return b"\r\n".join(conservadas) + b"\r\n\r\n"
+
+def cerrar_respuesta(cabecera: bytes) -> bytes:
+    """Reemplaza las cabeceras de conexión de una respuesta HTTP por "Connection: close"."""
+    conservadas = _filtrar(_lineas_cabecera(cabecera), _CABECERAS_CONEXION)
+    conservadas.append(b"Connection: close")
+    return b"\r\n".join(conservadas) + b"\r\n\r\n"
+
+def es_cambio_de_protocolo(cabecera: bytes) -> bool:
+    """Indica si la respuesta del worker es "101 Switching Protocols"."""
+    partes = cabecera.split(b" ", 2)
+    return len(partes) >= 2 and partes[0].startswith(b"HTTP/") and partes[1] == b"101"
+
+class BalanceadorSticky:
+    """
+    Balanceador TCP local con afinidad por IP de cliente para varios procesos de la aplicación.
+    Flet guarda el estado de cada sesión en el proceso que atiende su websocket, por eso todas las
+    conexiones de una IP van al mismo worker; si ese worker no acepta conexiones se usa el siguiente.
+    Cada petición HTTP llega al worker con X-Forwarded-For igual a la IP real, para que la reporte en
+    page.client_ip (límite de intentos de login por IP): se descartan las cabeceras de origen que envíe
+    el cliente y, salvo en el handshake del websocket (tras el cual la conexión ya no transporta HTTP),
+    se fuerza "Connection: close" para que la siguiente petición abra otra conexión y también se reescriba.
+    Si el worker no acepta el handshake (no responde 101), se le envía la respuesta al cliente con
+    "Connection: close" y el resto de lo que envíe el cliente ya no se reenvía.
+    """
+    def __init__(self, host: str, puerto: int, backends: list[tuple[str, int]], timeout_conexion: float = 3.0):
+        """
+        Args:
+            host (str): Dirección en la que escucha el balanceador.
+            puerto (int): Puerto público de la aplicación.
+            backends (list[tuple[str, int]]): (host, puerto) de cada worker.
+            timeout_conexion (float, optional): Segundos para conectar con un worker. Defaults to 3.0.
+        """
+        self.host = host
+        self.puerto = puerto
+        self.backends = backends
+        self.timeout_conexion = timeout_conexion
+        self.conexiones_activas = 0
+        self._servidor = None
+
+    async def _conectar_backend(self, ip: str):
+        inicio = elegir_backend(ip, len(self.backends))
+        for desplazamiento in range(len(self.backends)):
+            host, puerto = self.backends[(inicio + desplazamiento) % len(self.backends)]
+            try:
+                return await asyncio.wait_for(asyncio.open_connection(host, puerto), self.timeout_conexion)
+            except (OSError, asyncio.TimeoutError):
+                logger.warning("Worker %s:%s no disponible para %s; se intenta con el siguiente.", host, puerto, ip)
+        return None
+
+    @staticmethod
+    async def _leer_cabecera(reader: asyncio.StreamReader) -> bytes:
+        """Lee una cabecera HTTP (None si la conexión se cierra antes de completarla o es demasiado grande)."""
+        try:
+            return await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return None
+
+    @staticmethod
+    async def _canalizar(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                datos = await reader.read(64 * 1024)
+                if not datos:
+                    break
+                writer.write(datos)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _descartar(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Lee sin reenviar lo que envíe el cliente; cuando cierra, se cierra también la conexión con el worker
+        try:
+            while await reader.read(64 * 1024):
+                pass
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _atender(self, cliente_reader: asyncio.StreamReader, cliente_writer: asyncio.StreamWriter):
+        ip = (cliente_writer.get_extra_info("peername") or ("",))[0]
+        backend = await self._conectar_backend(ip)
+        if backend is None:
+            logger.error("Ningún worker disponible para la conexión de %s.", ip)
+            cliente_writer.close()
+            return
+        backend_reader, backend_writer = backend
+        self.conexiones_activas += 1
+        conexiones_balanceadas.inc()
+        try:
+            cabecera = await self._leer_cabecera(cliente_reader)
+            if cabecera is None:
+                cliente_writer.close()
+                backend_writer.close()
+                return
+            handshake = es_handshake_websocket(cabecera)
+            backend_writer.write(reescribir_cabecera(cabecera, ip))
+            await backend_writer.drain()
+            if handshake:
+                # La conexión solo se deja abierta si el worker cambia de protocolo: si rechaza el handshake
+                # (ej. 400), las siguientes peticiones del cliente llegarían sin reescribir
+                respuesta = await self._leer_cabecera(backend_reader)
+                if respuesta is None:
+                    cliente_writer.close()
+                    backend_writer.close()
+                    return
+                if not es_cambio_de_protocolo(respuesta):
+                    cliente_writer.write(cerrar_respuesta(respuesta))
+                    await asyncio.gather(
+                        self._descartar(cliente_reader, backend_writer),
+                        self._canalizar(backend_reader, cliente_writer),
+                    )
+                    return
+                cliente_writer.write(respuesta)
+                await cliente_writer.drain()
+            await asyncio.gather(
+                self._canalizar(cliente_reader, backend_writer),
+                self._canalizar(backend_reader, cliente_writer),
+            )
+        except ConnectionError:
+            cliente_writer.close()
+            backend_writer.close()
+        finally:
+            self.conexiones_activas -= 1
+
+    async def iniciar(self):
+        """Empieza a aceptar conexiones (no bloquea)."""
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto, limit=MAX_CABECERA)
+        logger.info("Balanceador escuchando en %s:%s con %s workers.", self.host, self.puerto, len(self.backends))
+
+    async def detener(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+
+def iniciar_worker(script: str, puerto: int, argumentos: list[str] = None, puerto_metricas: int = 0) -> subprocess.Popen:
+    """
+    Inicia un proceso worker de la aplicación (python <script> --worker --port <puerto>).
+
+    Args:
+        puerto_metricas (int, optional): Puerto del endpoint de métricas del worker (0 lo desactiva). Defaults to 0.
+
+    Returns:
+        subprocess.Popen: El proceso iniciado.
+    """
+    comando = [sys.executable, script, "--worker", "--port", str(puerto)] + (argumentos or [])
+    entorno = os.environ.copy()
+    entorno["METRICS_PORT"] = str(puerto_metricas) # Cada worker expone sus métricas en un puerto propio
+    # Cada worker rota su propio archivo de log (la rotación no es segura entre procesos)
+    base, extension = os.path.splitext(settings.LOG_FILE)
+    entorno["LOG_FILE"] = f"{base}.{puerto}{extension}"
+    proceso = subprocess.Popen(comando, env=entorno)
+    logger.info("Worker iniciado (PID %s) en el puerto %s.", proceso.pid, puerto)
+    return proceso
+
+async def _supervisar(script: str, procesos: dict, argumentos: list[str], puertos_metricas: dict,
+                      intervalo: float = 2.0):
+    # Reinicia los workers que terminan inesperadamente; sus clientes se reconectan a una sesión nueva
+    while True:
+        await asyncio.sleep(intervalo)
+        for puerto, proceso in list(procesos.items()):
+            if proceso.poll() is not None:
+                logger.error("El worker del puerto %s terminó (código %s). Reiniciando.", puerto, proceso.returncode)
+                reinicios_workers.inc()
+                procesos[puerto] = iniciar_worker(script, puerto, argumentos, puertos_metricas[puerto])
+
+def ejecutar_cluster(script: str, num_workers: int, host: str, puerto: int, puerto_base: int,
+                     argumentos: list[str] = None, puerto_metricas: int = 0):
+    """
+    Ejecuta 'num_workers' procesos de la aplicación detrás de un BalanceadorSticky y los supervisa
+    hasta recibir Ctrl+C. Cada worker tiene su propio GIL, motor de base de datos y cachés; las
+    cachés se mantienen coherentes entre procesos con el InvalidationBus (LISTEN/NOTIFY).
+
+    Args:
+        script (str): Ruta de main.py.
+        num_workers (int): Cantidad de procesos worker.
+        host (str): Dirección pública del balanceador.
+        puerto (int): Puerto público del balanceador.
+        puerto_base (int): Puerto del primer worker (los demás usan los siguientes).
+        argumentos (list[str], optional): Argumentos adicionales para cada worker. Defaults to None.
+        puerto_metricas (int, optional): Puerto de las métricas del balanceador; los workers usan los
+            siguientes (0 desactiva todos). Defaults to 0.
+    """
+    puertos = [puerto_base + i for i in range(num_workers)]
+    puertos_metricas = {p: puerto_metricas + 1 + i if puerto_metricas > 0 else 0 for i, p in enumerate(puertos)}
+    procesos = {p: iniciar_worker(script, p, argumentos, puertos_metricas[p]) for p in puertos}
+    balanceador = BalanceadorSticky(host, puerto, [("127.0.0.1", p) for p in puertos])
+    registro_metricas.gauge("pizzeria_balancer_connections_active", "Conexiones abiertas a través del balanceador.",
+                            funcion=lambda: balanceador.conexiones_activas)
+    registro_metricas.gauge("pizzeria_workers_alive", "Workers en ejecución.",
+                            funcion=lambda: sum(1 for proceso in procesos.values() if proceso.poll() is None))
+    iniciar_servidor_metricas(settings.METRICS_HOST, puerto_metricas)
+
+    async def servir():
+        await balanceador.iniciar()
+        try:
+            await _supervisar(script, procesos, argumentos or [], puertos_metricas)
+        finally:
+            await balanceador.detener()
+
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        logger.info("Deteniendo el clúster...")
+    finally:
+        for proceso in procesos.values():
+            proceso.terminate()
+        for proceso in procesos.values():
+            try:
+                proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
@@ -3,7 +3,6 @@ import os
 from dotenv import load_dotenv
 from pathlib import Path
 from typing import Dict, Any
-import flet as ft
 from urllib.parse import quote_plus # Importa quote_plus para escapar la contraseña
 
 # Carga las variables de entorno del archivo .env
@@ -26,10 +25,29 @@ class Config:
     DB_USER: str = os.getenv("DB_USER", "pizzeria_user") # Usuario de la base de datos
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "") # Contraseña de la base de datos
 
+    # URL completa (ej. sqlite:///pizzeria.db para una sucursal sin PostgreSQL). Si está vacía se usa PostgreSQL
+    # con los valores anteriores. SQLite funciona con un solo proceso (ver core/base_datos.py).
+    DB_URL: str = os.getenv("DATABASE_URL", "")
+
+    # Modo SQLite (un solo nodo): ajustes de las conexiones
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")) # Espera máxima por el bloqueo de escritura
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL") # NORMAL (recomendado con WAL) o FULL
+    SQLITE_CACHE_MB: int = int(os.getenv("SQLITE_CACHE_MB", "64")) # Caché de páginas por conexión
+    SQLITE_MMAP_MB: int = int(os.getenv("SQLITE_MMAP_MB", "256")) # Lectura del archivo con mmap (0 la desactiva)
+    SQLITE_BEGIN: str = os.getenv("SQLITE_BEGIN", "IMMEDIATE") # Inicio de las transacciones de escritura: IMMEDIATE o DEFERRED
+
+    # Réplica de lectura (ver core/replicas.py). Vacía: todas las consultas van a la base principal
+    DB_REPLICA_URL: str = os.getenv("DB_REPLICA_URL", "")
+    DB_REPLICA_MAX_LAG_S: float = float(os.getenv("DB_REPLICA_MAX_LAG_S", "5")) # Con más retraso se lee de la principal
+    DB_REPLICA_CHECK_INTERVAL_S: float = float(os.getenv("DB_REPLICA_CHECK_INTERVAL_S", "2")) # Segundos entre mediciones del retraso
+    DB_READ_YOUR_WRITES_S: float = float(os.getenv("DB_READ_YOUR_WRITES_S", "2")) # Tras escribir, la sesión lee de la principal
+
     # Construye la URL completa de la base de datos para SQLAlchemy
     @property
     def DATABASE_URL(self) -> str:
         """Retorna la URL de conexión de la base de datos."""
+        if self.DB_URL:
+            return self.DB_URL
         # Escapa la contraseña para asegurar que los caracteres especiales se manejen correctamente
         # en la URL de conexión.
         encoded_password = quote_plus(self.DB_PASSWORD)
@@ -37,13 +55,17 @@ class Config:
 
     # Configuración de la aplicación Flet
     FLET_PORT: int = int(os.getenv("FLET_PORT", "8500"))
+    FLET_HOST: str = os.getenv("FLET_HOST", "0.0.0.0") # Dirección del balanceador cuando hay varios workers
+    WORKERS: int = int(os.getenv("WORKERS", "1")) # Procesos de la aplicación (ver --workers en main.py)
+    WORKER_PORT_BASE: int = int(os.getenv("WORKER_PORT_BASE", str(FLET_PORT + 1))) # Puerto del primer worker (solo localhost)
     
     @property
-    def FLET_VIEW(self) -> ft.AppView:
+    def FLET_VIEW(self):
         """
-        Retorna la vista de Flet basada en la variable de entorno FLET_VIEW.
+        Retorna la vista de Flet (ft.AppView) basada en la variable de entorno FLET_VIEW.
         Soporta "WEB_BROWSER", "FLET_APP", "FLET_APP_WEB".
         """
+        import flet as ft # Importación diferida: los scripts que solo usan la configuración no cargan Flet
         view_mapping = {
             "WEB_BROWSER": ft.AppView.WEB_BROWSER,
             "FLET_APP": ft.AppView.FLET_APP,
@@ -52,8 +74,51 @@ class Config:
         # Usa .get() para proporcionar un valor por defecto seguro
         return view_mapping.get(os.getenv("FLET_VIEW", "WEB_BROWSER"), ft.AppView.WEB_BROWSER)
 
+    # Búsqueda de clientes (pg_trgm) en el panel de administración
+    CLIENTES_BUSQUEDA_LIMITE: int = int(os.getenv("CLIENTES_BUSQUEDA_LIMITE", "50")) # Máximo de resultados (top-k)
+    CLIENTES_BUSQUEDA_UMBRAL: float = float(os.getenv("CLIENTES_BUSQUEDA_UMBRAL", "0.3")) # Similitud mínima (0 a 1)
+
     # Configuración de autenticación (ejemplo)
     SESSION_TIMEOUT: int = int(os.getenv("SESSION_TIMEOUT", "3600"))  # 1 hora en segundos
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memoria") # 'memoria' (un proceso) o 'postgres' (varios procesos)
+    SESSION_MAX_ACTIVAS: int = int(os.getenv("SESSION_MAX_ACTIVAS", "1000")) # Máximo de sesiones en memoria (se descartan las menos usadas)
+    SESSION_SWEEP_INTERVAL: int = int(os.getenv("SESSION_SWEEP_INTERVAL", "60")) # Segundos entre limpiezas de sesiones expiradas
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12")) # Costo de bcrypt; los hashes con menor costo se actualizan al iniciar sesión
+    LOGIN_WORKERS: int = int(os.getenv("LOGIN_WORKERS", str(os.cpu_count() or 2))) # Hilos dedicados a verificar contraseñas
+    LOGIN_MAX_PENDIENTES: int = int(os.getenv("LOGIN_MAX_PENDIENTES", "16")) # Verificaciones en cola antes de rechazar nuevos intentos
+    LOGIN_INTENTOS_POR_USUARIO: int = int(os.getenv("LOGIN_INTENTOS_POR_USUARIO", "5")) # Intentos por usuario en cada ventana
+    LOGIN_INTENTOS_POR_IP: int = int(os.getenv("LOGIN_INTENTOS_POR_IP", "20")) # Intentos por IP en cada ventana
+    LOGIN_VENTANA_SEGUNDOS: int = int(os.getenv("LOGIN_VENTANA_SEGUNDOS", "300")) # Ventana de recarga de los intentos
+
+    # Arranque: conexiones que se abren al iniciar el proceso para que la primera sesión no espere
+    DB_POOL_WARM: int = int(os.getenv("DB_POOL_WARM", "2"))
+    STARTUP_RETRY_BACKOFF_S: float = float(os.getenv("STARTUP_RETRY_BACKOFF_S", "10")) # Tras un fallo al iniciar, segundos antes de reintentar
+    STARTUP_REPORT: bool = os.getenv("STARTUP_REPORT", "false").lower() in ("1", "true", "yes") # Equivale a --startup-report
+
+    # Dashboard de administración
+    DASHBOARD_WORKERS: int = int(os.getenv("DASHBOARD_WORKERS", "4")) # Hilos para cargar en paralelo las tarjetas del dashboard
+
+    # Refresco automático de las tablas de pedidos y finanzas (consultas incrementales por fecha_actualizacion)
+    ADMIN_REFRESH_INTERVAL: int = int(os.getenv("ADMIN_REFRESH_INTERVAL", "5")) # Segundos entre consultas (0 lo desactiva)
+    ADMIN_REFRESH_LIMIT: int = int(os.getenv("ADMIN_REFRESH_LIMIT", "200")) # Cambios por consulta; si se alcanza se recarga la tabla
+    ADMIN_REFRESH_MARGEN_SEGUNDOS: int = int(os.getenv("ADMIN_REFRESH_MARGEN_SEGUNDOS", "2")) # Solape del cursor para transacciones largas
+
+    # Métricas en formato de Prometheus (http://METRICS_HOST:METRICS_PORT/metrics). 0 desactiva el endpoint.
+    # Con varios workers el balanceador usa METRICS_PORT y cada worker los puertos siguientes.
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9464"))
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1") # Solo localhost por defecto
+
+    # Medición de memoria por sesión (tracemalloc). Desactivada por defecto: tracemalloc ralentiza las asignaciones
+    MEMORY_REPORT: bool = os.getenv("MEMORY_REPORT", "false").lower() in ("1", "true", "yes")
+    MEMORY_REPORT_INTERVAL: int = int(os.getenv("MEMORY_REPORT_INTERVAL", "300")) # Segundos entre reportes en el log
+    SESSION_MEMORY_BUDGET_KB: int = int(os.getenv("SESSION_MEMORY_BUDGET_KB", "512")) # Presupuesto de memoria por sesión conectada
+
+    # Perfilado de acciones de la interfaz bajo demanda (también se activa desde el dashboard de administración)
+    PROFILE_ACTIONS: bool = os.getenv("PROFILE_ACTIONS", "false").lower() in ("1", "true", "yes")
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "perfiles") # Carpeta de los perfiles (.folded, .txt y .prof)
+    PROFILE_MODE: str = os.getenv("PROFILE_MODE", "muestreo") # "muestreo" (bajo costo) o "cprofile" (tiempo exacto por función)
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2")) # Intervalo entre muestras de la pila
+    PROFILE_MIN_MS: float = float(os.getenv("PROFILE_MIN_MS", "10")) # Las acciones más rápidas no se guardan
 
     # Rutas de la aplicación (ejemplo, puedes ajustarlas según tu estructura)
     BASE_DIR: Path = Path(__file__).resolve().parent.parent
@@ -63,6 +128,9 @@ class Config:
     # Configuración de logging (ejemplo)
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE: str = os.getenv("LOG_FILE", "pizzeria.log")
+    LOG_JSON: bool = os.getenv("LOG_JSON", "true").lower() in ("1", "true", "yes") # Archivo de log en JSON (la consola sigue en texto)
+    LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))) # Tamaño a partir del cual se rota el archivo
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", "5")) # Archivos rotados que se conservan
 
     @classmethod
     def get_database_config(cls) -> Dict[str, Any]:
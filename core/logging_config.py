@@ -0,0 +1,95 @@
+# core/logging_config.py
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime
+
+# Formato de la consola (y del archivo si LOG_JSON está desactivado)
+FORMATO_TEXTO = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class FormateadorJSON(logging.Formatter):
+    """Un objeto JSON por línea, para que el archivo de log se pueda procesar con herramientas de logs."""
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            datos["exception"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+class QueueHandlerDiferido(logging.handlers.QueueHandler):
+    """
+    Encola el registro sin formatearlo: el mensaje (msg % args) se arma en el hilo de escritura,
+    así el hilo que registra el log solo crea el registro y lo pone en la cola.
+    Los argumentos de los logs deben ser valores (str, números, excepciones), no objetos que
+    puedan cambiar antes de que se escriba el registro.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+# Escritor en segundo plano del proceso (QueueListener)
+_listener = None
+
+def configurar_logging(nivel: str, archivo: str, formato_json: bool = True, max_bytes: int = 10 * 1024 * 1024,
+                       copias: int = 5, consola: bool = True) -> logging.handlers.QueueListener:
+    """
+    Configura el logging del proceso: los loggers solo encolan el registro (QueueHandler) y un hilo
+    en segundo plano (QueueListener) lo formatea y lo escribe en el archivo con rotación y en la consola.
+    Así los manejadores de eventos no esperan el formateo ni la escritura en disco. Llamadas repetidas no hacen nada.
+
+    Args:
+        nivel (str): Nivel de log (ej. INFO, DEBUG).
+        archivo (str): Ruta del archivo de log.
+        formato_json (bool, optional): Escribir el archivo en JSON (una línea por registro). Defaults to True.
+        max_bytes (int, optional): Tamaño a partir del cual se rota el archivo. Defaults to 10 MB.
+        copias (int, optional): Archivos rotados que se conservan. Defaults to 5.
+        consola (bool, optional): Mostrar también los logs en la consola. Defaults to True.
+
+    Returns:
+        logging.handlers.QueueListener: El escritor en segundo plano (ya iniciado).
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    handler_archivo = logging.handlers.RotatingFileHandler(
+        archivo, maxBytes=max_bytes, backupCount=copias, encoding="utf-8", delay=True)
+    handler_archivo.setFormatter(FormateadorJSON() if formato_json else logging.Formatter(FORMATO_TEXTO))
+    handlers = [handler_archivo]
+    if consola:
+        handler_consola = logging.StreamHandler()
+        handler_consola.setFormatter(logging.Formatter(FORMATO_TEXTO))
+        handlers.append(handler_consola)
+
+    cola = queue.SimpleQueue() # Sin límite: registrar un log nunca bloquea al hilo que lo emite
+    _listener = logging.handlers.QueueListener(cola, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(QueueHandlerDiferido(cola))
+    raiz.setLevel(nivel)
+    atexit.register(detener_logging) # Escribe lo que quede en la cola al terminar el proceso
+    return _listener
+
+def detener_logging():
+    """Detiene el escritor en segundo plano después de escribir los registros pendientes."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            raiz.removeHandler(handler)
+    for handler in listener.handlers:
+        handler.close()
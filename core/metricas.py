@@ -0,0 +1,278 @@
+# core/metricas.py
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+# Límites (en segundos) de los histogramas de latencia por defecto
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _formatear_etiquetas(nombres: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{nombre}="{str(valor)}"'.replace("\n", " ") for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+class _Metrica:
+    """
+    Base de las métricas: nombre, ayuda, etiquetas y las series hijas por valores de etiquetas.
+    Las actualizaciones (inc, dec, observe) toman un lock propio de la serie y cuestan menos de 1 µs;
+    el texto de Prometheus solo se genera cuando se consulta el endpoint.
+    """
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._hijos = {} # (valores de etiquetas) -> serie
+        self._lock = threading.Lock()
+
+    def labels(self, *valores):
+        """
+        Obtiene la serie para los valores de etiquetas dados (se crea la primera vez).
+        En rutas calientes conviene guardar la serie y no llamar a labels() en cada incremento.
+        """
+        hijo = self._hijos.get(valores)
+        if hijo is None:
+            if len(valores) != len(self.etiquetas):
+                raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+            with self._lock:
+                hijo = self._hijos.setdefault(valores, self._crear_hijo())
+        return hijo
+
+    def _crear_hijo(self):
+        raise NotImplementedError
+
+    def _series(self):
+        if not self.etiquetas:
+            return [((), self)]
+        return list(self._hijos.items())
+
+    def exponer(self) -> list[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for valores, serie in self._series():
+            lineas.extend(serie._muestras(self.nombre, self.etiquetas, valores))
+        return lineas
+
+class Counter(_Metrica):
+    """Contador monótono."""
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.valor = 0.0
+        self._lock_valor = threading.Lock()
+
+    def _crear_hijo(self):
+        return Counter(self.nombre, self.ayuda)
+
+    def inc(self, cantidad: float = 1.0):
+        self._lock_valor.acquire() # acquire/release directos: más baratos que 'with' en rutas calientes
+        try:
+            self.valor += cantidad
+        finally:
+            self._lock_valor.release()
+
+    def _muestras(self, nombre, etiquetas, valores):
+        return [f"{nombre}{_formatear_etiquetas(etiquetas, valores)} {self.valor}"]
+
+class Gauge(_Metrica):
+    """
+    Valor que sube y baja. Si se indica 'funcion', el valor se calcula al exponer las métricas
+    (ej. estado del pool de conexiones) y no cuesta nada en las rutas calientes.
+    """
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), funcion=None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.valor = 0.0
+        self.funcion = funcion
+        self._lock_valor = threading.Lock()
+
+    def _crear_hijo(self):
+        return Gauge(self.nombre, self.ayuda)
+
+    def set(self, valor: float):
+        self.valor = valor
+
+    def inc(self, cantidad: float = 1.0):
+        self._lock_valor.acquire()
+        try:
+            self.valor += cantidad
+        finally:
+            self._lock_valor.release()
+
+    def dec(self, cantidad: float = 1.0):
+        self._lock_valor.acquire()
+        try:
+            self.valor -= cantidad
+        finally:
+            self._lock_valor.release()
+
+    def _muestras(self, nombre, etiquetas, valores):
+        valor = self.valor
+        if self.funcion is not None:
+            try:
+                valor = self.funcion()
+            except Exception as e:
+                logger.error("Error al calcular la métrica %s: %s", nombre, e)
+                return []
+        return [f"{nombre}{_formatear_etiquetas(etiquetas, valores)} {valor}"]
+
+class Histogram(_Metrica):
+    """Distribución de valores (ej. latencias) en buckets acumulativos, con suma y cantidad."""
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self._conteos = [0] * (len(self.buckets) + 1) # El último es +Inf
+        self.suma = 0.0
+        self._lock_valor = threading.Lock()
+
+    def _crear_hijo(self):
+        return Histogram(self.nombre, self.ayuda, buckets=self.buckets)
+
+    def observe(self, valor: float):
+        indice = bisect.bisect_left(self.buckets, valor)
+        self._lock_valor.acquire()
+        try:
+            self._conteos[indice] += 1
+            self.suma += valor
+        finally:
+            self._lock_valor.release()
+
+    @contextmanager
+    def time(self):
+        """Observa la duración (en segundos) del bloque 'with'."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio)
+
+    def _muestras(self, nombre, etiquetas, valores):
+        with self._lock_valor:
+            conteos = list(self._conteos)
+            suma = self.suma
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+            acumulado += conteo
+            le = 'le="+Inf"' if limite == float("inf") else f'le="{limite!r}"'
+            lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, valores, le)} {acumulado}")
+        lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas, valores)} {suma}")
+        lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas, valores)} {acumulado}")
+        return lineas
+
+class MetricsRegistry:
+    """Registro de las métricas del proceso, expuestas en formato de texto de Prometheus."""
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                return existente # Registrar dos veces (ej. al recargar un módulo) devuelve la misma métrica
+            self._metricas[metrica.nombre] = metrica
+            return metrica
+
+    def counter(self, nombre: str, ayuda: str, etiquetas: tuple = ()) -> Counter:
+        return self._registrar(Counter(nombre, ayuda, etiquetas))
+
+    def gauge(self, nombre: str, ayuda: str, etiquetas: tuple = (), funcion=None) -> Gauge:
+        return self._registrar(Gauge(nombre, ayuda, etiquetas, funcion))
+
+    def histogram(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_LATENCIA) -> Histogram:
+        return self._registrar(Histogram(nombre, ayuda, etiquetas, buckets))
+
+    def texto_prometheus(self) -> str:
+        """Todas las métricas en el formato de exposición de texto de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+# Registro compartido por todo el proceso
+registro_metricas = MetricsRegistry()
+
+_servidor_metricas = None
+
+def iniciar_servidor_metricas(host: str, puerto: int):
+    """
+    Sirve /metrics en un hilo en segundo plano (una sola vez por proceso). Con puerto 0 no hace nada.
+
+    Args:
+        host (str): Dirección en la que escucha (por defecto solo localhost).
+        puerto (int): Puerto del endpoint de métricas.
+    """
+    global _servidor_metricas
+    if puerto <= 0 or _servidor_metricas is not None:
+        return
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # Solo si se sirven las métricas
+
+    class _ManejadorMetricas(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            cuerpo = registro_metricas.texto_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, format, *args):
+            pass # Las consultas de Prometheus no se escriben en el log
+
+    try:
+        _servidor_metricas = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    except OSError as e:
+        logger.error("No se pudo iniciar el endpoint de métricas en %s:%s: %s", host, puerto, e)
+        return
+    _servidor_metricas.daemon_threads = True
+    threading.Thread(target=_servidor_metricas.serve_forever, name="metricas", daemon=True).start()
+    logger.info("Métricas disponibles en http://%s:%s/metrics", host, puerto)
+
+def instrumentar_engine(engine):
+    """
+    Registra la latencia de las consultas SQL y el estado del pool de conexiones de un motor.
+
+    Args:
+        engine (Engine): Motor de SQLAlchemy.
+    """
+    from sqlalchemy import event
+
+    latencia_consultas = registro_metricas.histogram(
+        "pizzeria_db_query_seconds", "Duración de las consultas SQL.")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get("metricas_inicio")
+        if inicios:
+            latencia_consultas.observe(time.perf_counter() - inicios.pop())
+
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return # Pools sin estadísticas (ej. NullPool)
+    for nombre, ayuda, funcion in (
+        ("pizzeria_db_pool_checked_out", "Conexiones del pool en uso.", pool.checkedout),
+        ("pizzeria_db_pool_checked_in", "Conexiones libres en el pool.", pool.checkedin),
+        ("pizzeria_db_pool_overflow", "Conexiones abiertas por encima del tamaño del pool.", pool.overflow),
+        ("pizzeria_db_pool_size", "Tamaño configurado del pool.", pool.size),
+    ):
+        # Si se vuelve a crear el motor (reintento de inicialización) la métrica pasa a leer el pool nuevo
+        registro_metricas.gauge(nombre, ayuda).funcion = funcion
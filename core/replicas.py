@@ -0,0 +1,199 @@
+# core/replicas.py
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from core.metricas import registro_metricas
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+# Destino de las consultas del contexto actual: lo fija BaseService para sus métodos de solo lectura
+# (REPLICA) y para los demás, que pueden escribir (ESCRITURA), y WriteThroughCache al cargar un valor
+# compartido (PRIMARIA). Todo lo que no es REPLICA va a la base principal; con SQLite, ESCRITURA
+# además abre la transacción tomando el bloqueo de escritura (ver core/base_datos.py).
+PRIMARIA = "primaria"
+REPLICA = "replica"
+ESCRITURA = "escritura"
+destino_consultas: ContextVar = ContextVar("destino_consultas", default=None)
+
+# Sesión de la interfaz (page.session_id) que ejecuta el código actual, para leer sus propias escrituras
+_sesion_usuario: ContextVar = ContextVar("sesion_usuario", default=None)
+
+# Retraso de la réplica en segundos, con PostgreSQL como réplica en streaming. 0 si está al día con lo
+# recibido o si no es una réplica (ej. la misma base); NULL si nunca aplicó una transacción.
+_CONSULTA_RETRASO = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+# Escrituras recordadas antes de descartar las que ya salieron de la ventana
+_MAX_ESCRITURAS = 1000
+
+_retraso_replica = registro_metricas.gauge(
+    "pizzeria_db_replica_lag_seconds", "Retraso medido de la réplica de lectura.")
+_replica_disponible = registro_metricas.gauge(
+    "pizzeria_db_replica_available", "1 si las lecturas se envían a la réplica, 0 si van a la base principal.")
+
+@contextmanager
+def en_primaria():
+    """Las sesiones usadas dentro del bloque consultan la base principal (ej. al cargar una caché compartida)."""
+    token = destino_consultas.set(PRIMARIA)
+    try:
+        yield
+    finally:
+        destino_consultas.reset(token)
+
+@contextmanager
+def sesion_usuario(clave):
+    """
+    Asocia el código del bloque a una sesión de la interfaz: tras una escritura, sus lecturas van
+    a la base principal durante DB_READ_YOUR_WRITES_S aunque se ejecuten en otro hilo.
+
+    Args:
+        clave: Identificador de la sesión (ej. page.session_id).
+    """
+    token = _sesion_usuario.set(clave)
+    try:
+        yield
+    finally:
+        _sesion_usuario.reset(token)
+
+def _clave_sesion():
+    # Sin sesión de la interfaz (ej. tareas en segundo plano o scripts) la ventana es por hilo
+    clave = _sesion_usuario.get()
+    return clave if clave is not None else threading.get_ident()
+
+class EnrutadorReplica:
+    """
+    Decide a qué base van las lecturas cuando hay una réplica configurada (DB_REPLICA_URL).
+    Las lecturas van a la réplica salvo que:
+      - La réplica no responda o su retraso supere 'retraso_max_s' (se mide cada 'intervalo_s'
+        en un hilo en segundo plano; un error de conexión la descarta al instante).
+      - La sesión de la interfaz haya escrito hace menos de 'ventana_s' segundos (o del retraso
+        medido, si es mayor): así ve sus propias escrituras.
+    """
+    def __init__(self, primaria, replica, retraso_max_s: float, ventana_s: float, intervalo_s: float):
+        """
+        Args:
+            primaria (Engine): Motor de la base principal (todas las escrituras).
+            replica (Engine): Motor de la réplica de lectura.
+            retraso_max_s (float): Retraso a partir del cual se lee de la base principal.
+            ventana_s (float): Segundos tras una escritura en los que la sesión lee de la base principal.
+            intervalo_s (float): Segundos entre mediciones del retraso.
+        """
+        self.primaria = primaria
+        self.replica = replica
+        self.retraso_max_s = retraso_max_s
+        self.ventana_s = ventana_s
+        self.intervalo_s = intervalo_s
+        self.disponible = None # Desconocido hasta la primera medición (las lecturas van a la base principal)
+        self.retraso_s = 0.0
+        self._escrituras = {} # clave de sesión -> time.monotonic() de su última escritura
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = threading.Event()
+        _retraso_replica.funcion = lambda: self.retraso_s
+        _replica_disponible.funcion = lambda: 1 if self.disponible else 0
+
+        @event.listens_for(replica, "handle_error")
+        def _al_fallar(contexto):
+            if contexto.is_disconnect:
+                self._marcar(False, f"conexión perdida: {contexto.original_exception}")
+
+    def usar_replica(self) -> bool:
+        """Indica si una lectura de la sesión actual puede ir a la réplica."""
+        if not self.disponible:
+            return False
+        ultima = self._escrituras.get(_clave_sesion())
+        return ultima is None or time.monotonic() - ultima >= max(self.ventana_s, self.retraso_s)
+
+    def registrar_escritura(self):
+        """Abre la ventana de lectura de las propias escrituras para la sesión actual."""
+        ahora = time.monotonic()
+        with self._lock:
+            if len(self._escrituras) >= _MAX_ESCRITURAS:
+                limite = ahora - max(self.ventana_s, self.retraso_max_s)
+                self._escrituras = {clave: ts for clave, ts in self._escrituras.items() if ts > limite}
+            self._escrituras[_clave_sesion()] = ahora
+
+    def comprobar(self):
+        """Mide el retraso de la réplica y actualiza si las lecturas pueden ir a ella."""
+        try:
+            with self.replica.connect() as conexion:
+                if self.replica.dialect.name == "postgresql":
+                    valor = conexion.execute(_CONSULTA_RETRASO).scalar()
+                else:
+                    valor = conexion.execute(text("SELECT 0")).scalar()
+        except SQLAlchemyError as e:
+            self._marcar(False, f"sin conexión: {e}")
+            return
+        self.retraso_s = float("inf") if valor is None else max(float(valor), 0.0)
+        if self.retraso_s > self.retraso_max_s:
+            self._marcar(False, f"retraso de {self.retraso_s:.1f} s")
+        else:
+            self._marcar(True)
+
+    def _marcar(self, disponible: bool, motivo: str = None):
+        if disponible == self.disponible:
+            return
+        self.disponible = disponible
+        if disponible:
+            logger.info("Réplica de lectura disponible (retraso %.1f s): las lecturas vuelven a la réplica.", self.retraso_s)
+        else:
+            logger.warning("Réplica de lectura no disponible (%s): las lecturas van a la base principal.", motivo)
+
+    def iniciar(self):
+        """Mide el retraso una vez y arranca el hilo que lo vuelve a medir cada 'intervalo_s'."""
+        self.comprobar()
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._vigilar, name="replica-lag", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo de medición."""
+        self._detener.set()
+
+    def _vigilar(self):
+        while not self._detener.wait(self.intervalo_s):
+            self.comprobar()
+
+class SesionEnrutada(Session):
+    """
+    Sesión que envía las consultas de los métodos de solo lectura a la réplica y todo lo demás a la
+    base principal. Las escrituras (flush e INSERT/UPDATE/DELETE) siempre van a la principal; desde
+    que la sesión usa la principal se queda en ella, y su commit registra la escritura en el enrutador.
+    Se crea con sessionmaker(class_=SesionEnrutada, enrutador=...).
+    """
+    def __init__(self, *args, enrutador: EnrutadorReplica, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._enrutador = enrutador
+        self._usa_primaria = False
+        self._escribio = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        enrutador = self._enrutador
+        lectura = destino_consultas.get() == REPLICA
+        escritura = self._flushing or isinstance(clause, UpdateBase)
+        if not self._usa_primaria:
+            if lectura and not escritura and enrutador.usar_replica():
+                return enrutador.replica
+            self._usa_primaria = True
+        if escritura or not lectura:
+            self._escribio = True
+        return enrutador.primaria
+
+@event.listens_for(SesionEnrutada, "after_commit")
+def _al_confirmar(session):
+    if session._escribio:
+        session._escribio = False
+        session._enrutador.registrar_escritura()
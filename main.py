@@ -1,112 +1,252 @@
 # main.py - Archivo principal para iniciar la aplicación web de la pizzería con Flet
 
-import flet as ft
+import sys
+import threading
+import time
 import logging # Importa el módulo logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
+
+# Reporte de tiempos del arranque (--startup-report). Se importa primero para medir el resto.
+from core.arranque import reporte_arranque
 
 # Importa la configuración de la base de datos
-from core.config import settings # Importamos la instancia 'settings' directamente
+with reporte_arranque.fase("import core.config"):
+    from core.config import settings # Importamos la instancia 'settings' directamente
+
+# Flet y SQLAlchemy son las importaciones más costosas; los servicios y las vistas se importan
+# en inicializar_proceso() y AdminView solo cuando una sesión abre el panel de administración.
+ft = reporte_arranque.importar("flet")
+with reporte_arranque.fase("import sqlalchemy"):
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.exc import SQLAlchemyError
 
 # Importa el modelo base para la creación de tablas
 #from core.models import Base
 
-# Importa todas las clases de servicios para la interacción con la base de datos
-from services.cliente_service import ClienteService
-from services.menu_service import MenuService
-from services.pedido_service import PedidoService
-from services.financiero_service import FinancieroService
-from services.pizzeria_info_service import PizzeriaInfoService
-from services.administrador_service import AdministradorService
-
-# Importa las vistas de la aplicación
-from views.main_view import MainView
-from views.admin_view import AdminView
-
 # 1. Configuración del Logger
-# Define el formato de los mensajes de log
-LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-# Configura el logger básico para escribir en un archivo y en la consola
-logging.basicConfig(
-    level=settings.LOG_LEVEL, # Usa el nivel de log definido en config.py (ej. INFO, DEBUG)
-    format=LOG_FORMAT,
-    handlers=[
-        logging.FileHandler(settings.LOG_FILE), # Escribe los logs en el archivo especificado en config.py
-        logging.StreamHandler() # Muestra los logs también en la consola
-    ]
-)
+# Los logs se encolan y un hilo en segundo plano los escribe en el archivo (JSON, con rotación)
+# y en la consola: los manejadores de eventos no esperan la escritura en disco.
+from core.logging_config import configurar_logging
+configurar_logging(settings.LOG_LEVEL, settings.LOG_FILE, settings.LOG_JSON, settings.LOG_MAX_BYTES,
+                   settings.LOG_BACKUP_COUNT)
 # Obtiene una instancia del logger para este módulo
 logger = logging.getLogger(__name__)
 
-def main(page: ft.Page):
+# Métricas de las sesiones (ver core/metricas.py; se sirven en settings.METRICS_PORT)
+from core.metricas import registro_metricas, instrumentar_engine, iniciar_servidor_metricas
+cambios_de_ruta = registro_metricas.counter("pizzeria_route_changes_total", "Cambios de ruta por ruta destino.", ("route",))
+sesiones_conectadas = registro_metricas.gauge("pizzeria_sessions_connected", "Sesiones de Flet conectadas.")
+sesiones_iniciadas = registro_metricas.counter("pizzeria_sessions_started_total", "Sesiones de Flet iniciadas.")
+
+class RecursosProceso:
     """
-    Función principal de la aplicación Flet.
-    Configura la base de datos, los servicios y las rutas de la aplicación.
+    Recursos creados una sola vez por proceso y compartidos por todas las sesiones:
+    el motor de base de datos (con el pool ya abierto), los servicios (no guardan estado
+    de la sesión) y el almacén de sesiones de administrador.
     """
-    logger.info("Iniciando la aplicación Flet...")
+    def __init__(self, engine, Session):
+        from services.cliente_service import ClienteService
+        from services.menu_service import MenuService
+        from services.pedido_service import PedidoService
+        from services.financiero_service import FinancieroService
+        from services.pizzeria_info_service import PizzeriaInfoService
+        from services.administrador_service import AdministradorService
+        from services.metricas_cliente_service import MetricasClienteService
+        from services.session_store import crear_session_store
 
-    # 2. Configuración de la base de datos con SQLAlchemy
+        self.engine = engine
+        self.Session = Session
+        self.cliente_service = ClienteService(Session)
+        self.menu_service = MenuService(Session) # Instancia el MenuService
+        self.pedido_service = PedidoService(Session)
+        self.financiero_service = FinancieroService(Session)
+        self.pizzeria_info_service = PizzeriaInfoService(Session)
+        self.administrador_service = AdministradorService(Session)
+        self.metricas_cliente_service = MetricasClienteService(Session)
+        self.session_store = crear_session_store(Session) # Sesiones de administrador con expiración (SESSION_TIMEOUT)
+
+_recursos = None
+_recursos_lock = threading.Lock()
+_ultimo_error = None # (error, time.monotonic()) del último intento fallido de inicialización
+
+def _calentar_pool(engine, conexiones: int):
+    """Abre 'conexiones' conexiones y las devuelve al pool, para que la primera sesión no espere el handshake."""
+    abiertas = []
     try:
-        # Crea un motor de base de datos usando la URL de conexión de config.py
-        engine = create_engine(settings.DATABASE_URL)
-        
-        # Crea todas las tablas en la base de datos si no existen.
-        #Base.metadata.create_all(engine) # Descomenta si necesitas crear tablas automáticamente (considera migraciones en producción)
-        logger.info("Tablas de la base de datos verificadas/creadas con éxito.")
-        
+        for _ in range(conexiones):
+            abiertas.append(engine.connect())
+    finally:
+        for conexion in abiertas:
+            conexion.close()
+
+def _crear_recursos() -> RecursosProceso:
+    """Crea el motor, los servicios y las cachés compartidas (ver inicializar_proceso)."""
+    # 2. Configuración de la base de datos con SQLAlchemy
+    with reporte_arranque.fase("motor y pool de conexiones"):
+        # Crea un motor de base de datos usando la URL de conexión de config.py (PostgreSQL o SQLite)
+        from core.base_datos import crear_engine
+        engine = crear_engine(settings.DATABASE_URL)
+        if engine.dialect.name == "sqlite":
+            # Modo de un solo nodo: las tablas se crean al iniciar (en PostgreSQL las crean core/backup.sql y cambios.sql)
+            from models.models import Base
+            Base.metadata.create_all(engine)
+        instrumentar_engine(engine) # Latencia de consultas y estado del pool
+        _calentar_pool(engine, settings.DB_POOL_WARM)
         # Crea una fábrica de sesiones, que será utilizada por los servicios.
         Session = sessionmaker(bind=engine)
-        logger.info("Fábrica de sesiones de SQLAlchemy creada.")
+        if settings.DB_REPLICA_URL and engine.dialect.name == "sqlite":
+            logger.warning("DB_REPLICA_URL se ignora con SQLite: todas las consultas van a la base principal.")
+        elif settings.DB_REPLICA_URL:
+            # Las lecturas de los servicios van a la réplica mientras esté al día (ver core/replicas.py)
+            from core.replicas import EnrutadorReplica, SesionEnrutada
+            replica = crear_engine(settings.DB_REPLICA_URL)
+            enrutador = EnrutadorReplica(engine, replica, settings.DB_REPLICA_MAX_LAG_S,
+                                         settings.DB_READ_YOUR_WRITES_S, settings.DB_REPLICA_CHECK_INTERVAL_S)
+            enrutador.iniciar()
+            Session = sessionmaker(class_=SesionEnrutada, enrutador=enrutador)
+    logger.info("Motor de base de datos y fábrica de sesiones creados.")
+
+    # 3. Instanciar todos los servicios (una vez por proceso)
+    with reporte_arranque.fase("import y creación de servicios"):
+        recursos = RecursosProceso(engine, Session)
+
+    iniciar_servidor_metricas(settings.METRICS_HOST, settings.METRICS_PORT)
+
+    # Escuchar las invalidaciones de caché de otros procesos
+    from services.cache import bus_invalidacion
+    bus_invalidacion.iniciar(engine)
+
+    # Cargar las cachés compartidas: la primera sesión ya no consulta la base de datos
+    with reporte_arranque.fase("cachés (información y catálogo)"):
+        recursos.pizzeria_info_service.get_pizzeria_info()
+        recursos.menu_service.get_catalogo()
+
+    with reporte_arranque.fase("import views.main_view"):
+        import views.main_view # noqa: F401 (la primera sesión no paga la importación)
+    return recursos
+
+def _error_reciente():
+    """Devuelve el error del último intento de inicialización si ocurrió hace menos de STARTUP_RETRY_BACKOFF_S."""
+    if _ultimo_error is None:
+        return None
+    error, instante = _ultimo_error
+    return error if time.monotonic() - instante < settings.STARTUP_RETRY_BACKOFF_S else None
+
+def inicializar_proceso() -> RecursosProceso:
+    """
+    Inicialización única del proceso: motor de base de datos, pool precalentado, servicios,
+    escucha de invalidaciones y cachés compartidas (información de la pizzería y catálogo del menú).
+    Se ejecuta antes de ft.app(); si falla (ej. la base de datos no está disponible) se reintenta
+    con una sesión posterior. Durante STARTUP_RETRY_BACKOFF_S tras un fallo las sesiones reciben el
+    mismo error al instante, sin esperar en cola el timeout de conexión de cada reintento.
+
+    Returns:
+        RecursosProceso: Los recursos compartidos.
+
+    Raises:
+        SQLAlchemyError: Si no se puede conectar con la base de datos.
+    """
+    global _recursos, _ultimo_error
+    if _recursos is not None:
+        return _recursos
+    error = _error_reciente()
+    if error is not None:
+        raise error
+    with _recursos_lock:
+        if _recursos is not None:
+            return _recursos
+        # Las sesiones que esperaban el lock detrás de un intento fallido no lo repiten
+        error = _error_reciente()
+        if error is not None:
+            raise error
+        try:
+            recursos = _crear_recursos()
+        except SQLAlchemyError as e:
+            _ultimo_error = (e, time.monotonic())
+            raise
+        _ultimo_error = None
+        _recursos = recursos
+        logger.info("Inicialización del proceso completada.")
+        return _recursos
+
+# Se imprime el tiempo de la primera sesión junto al reporte de arranque (solo una vez)
+_primera_sesion_reportada = threading.Event()
 
+def main(page: ft.Page):
+    """
+    Función principal de la aplicación Flet.
+    Configura la base de datos, los servicios y las rutas de la aplicación.
+    """
+    logger.info("Iniciando sesión de la aplicación Flet...")
+    inicio_sesion = time.perf_counter()
+    sesiones_iniciadas.inc()
+
+    # Medición opcional de la memoria que ocupa cada sesión (settings.MEMORY_REPORT)
+    from utils.memoria_sesiones import obtener_monitor_memoria
+    monitor = obtener_monitor_memoria()
+    memoria_inicial = monitor.medir() if monitor else 0
+
+    # Recursos compartidos del proceso (normalmente ya creados antes de ft.app)
+    try:
+        recursos = inicializar_proceso()
     except SQLAlchemyError as e:
-        logger.critical(f"Error crítico al conectar o inicializar la base de datos: {e}")
+        logger.critical("Error crítico al conectar o inicializar la base de datos: %s", e)
         # En una aplicación real, podrías mostrar un mensaje de error al usuario
         page.add(ft.Text(f"Error crítico de base de datos: {e}. Por favor, contacta a soporte."))
         page.update()
         return # Detiene la ejecución si hay un error crítico de DB
 
-    # 3. Instanciar todos los servicios
-    logger.info("Instanciando servicios de la aplicación...")
-    cliente_service = ClienteService(Session)
-    menu_service = MenuService(Session) # Instancia el MenuService
-    pedido_service = PedidoService(Session)
-    financiero_service = FinancieroService(Session)
-    pizzeria_info_service = PizzeriaInfoService(Session)
-    administrador_service = AdministradorService(Session)
-    logger.info("Servicios instanciados correctamente.")
-
-    # 4. Crear instancias de las vistas
-    logger.info("Creando instancias de las vistas...")
-    
-    # Primero instanciamos AdminView
-    admin_view_instance = AdminView(
-        page,
-        cliente_service,
-        menu_service, # Pasa el menu_service
-        pedido_service,
-        financiero_service,
-        pizzeria_info_service,
-        administrador_service
-    )
-    
-    # Obtener el nombre de la pizzería para pasarlo a MainView
-    pizzeria_info = pizzeria_info_service.get_pizzeria_info()
-    pizzeria_name = pizzeria_info.nombre_pizzeria if pizzeria_info else "Pizzería Acme"
+    # 4. Crear las vistas de la sesión (inicialización por sesión: solo controles, sin consultas)
+    from views.main_view import MainView
 
-    # Luego instanciamos MainView, pasándole ahora el pizzeria_info_service, el nombre de la pizzería y menu_service
-    # CORRECCIÓN AQUÍ: Pasar cliente_service, pedido_service y financiero_service
-    main_view_instance = MainView(page, administrador_service, admin_view_instance, pizzeria_info_service, menu_service, cliente_service, pedido_service, financiero_service)
-    
-    logger.info("Vistas creadas correctamente.")
+    # AdminView se crea solo cuando la sesión la necesita (ruta /admin o login): la mayoría de las
+    # sesiones son de clientes y no deben cargar con su árbol de controles ni importar su módulo.
+    admin_view_holder = []
+
+    def obtener_admin_view():
+        if not admin_view_holder:
+            logger.debug("Creando AdminView para la sesión.")
+            from views.admin_view import AdminView
+            admin_view_holder.append(AdminView(
+                page,
+                recursos.cliente_service,
+                recursos.menu_service, # Pasa el menu_service
+                recursos.pedido_service,
+                recursos.financiero_service,
+                recursos.pizzeria_info_service,
+                recursos.administrador_service,
+                recursos.metricas_cliente_service,
+                recursos.session_store
+            ))
+        return admin_view_holder[0]
+
+    main_view_instance = MainView(page, recursos.administrador_service, obtener_admin_view, recursos.pizzeria_info_service,
+                                  recursos.menu_service, recursos.cliente_service, recursos.pedido_service, recursos.financiero_service)
+    logger.debug("Vistas de la sesión creadas en %.1f ms.", (time.perf_counter() - inicio_sesion) * 1000)
+
+    if monitor:
+        monitor.registrar(page.session_id, memoria_inicial)
+    sesiones_conectadas.inc()
+
+    def on_disconnect(e):
+        """Libera los recursos de la sesión al desconectarse el cliente."""
+        sesiones_conectadas.dec()
+        if admin_view_holder:
+            admin_view_holder[0].detener_tareas() # Refresco de tablas en segundo plano
+        if monitor:
+            monitor.eliminar(page.session_id)
+
+    page.on_disconnect = on_disconnect
 
     # 5. Gestión de Rutas y Navegación
+    from utils.perfilado import perfilador_acciones # Perfilado opcional de los cambios de ruta
+    from core.replicas import sesion_usuario
+
     def view_pop(view: ft.View):
         """
         Maneja el evento de 'pop' de una vista.
         Elimina la vista superior de la pila y navega a la anterior.
         """
-        logger.info(f"Pop de vista: {view.route}. Volviendo a la vista anterior.")
+        logger.info("Pop de vista: %s. Volviendo a la vista anterior.", view.route)
         page.views.pop()
         top_view = page.views[-1]
         page.go(top_view.route)
@@ -116,24 +256,28 @@ def main(page: ft.Page):
         Maneja el cambio de ruta de la aplicación.
         Limpia las vistas existentes y añade la vista correspondiente a la nueva ruta.
         """
-        logger.info(f"Cambio de ruta detectado: {route_event.route}")
-        page.views.clear() # Limpia la pila de vistas actual
-
-        # Verifica la ruta y añade la vista correspondiente
-        if page.route == "/":
-            page.views.append(main_view_instance)
-            logger.debug("Cargando MainView para la ruta '/'")
-        elif page.route == "/admin":
-            # La lógica de estado de login ahora se maneja directamente en AdminView
-            # a través de la comunicación de MainView.
-            page.views.append(admin_view_instance)
-            logger.debug("Cargando AdminView para la ruta '/admin'")
-        else:
-            # Manejar rutas no encontradas o redirigir a una página de error
-            page.views.append(main_view_instance) # Por defecto, vuelve a la vista principal
-            logger.warning(f"Ruta no reconocida: {page.route}. Redirigiendo a la vista principal.")
-        
-        page.update() # Actualiza la página para mostrar la nueva vista
+        # Perfilado solo si está activo; las consultas de la vista se asocian a la sesión (réplica de lectura)
+        with perfilador_acciones.perfilar("main.route_change"), sesion_usuario(page.session_id):
+            logger.info("Cambio de ruta detectado: %s", route_event.route)
+            page.views.clear() # Limpia la pila de vistas actual
+
+            # Verifica la ruta y añade la vista correspondiente
+            # Las rutas no reconocidas comparten una serie (no se crea una por cada URL)
+            cambios_de_ruta.labels(page.route if page.route in ("/", "/admin") else "otra").inc()
+            if page.route == "/":
+                page.views.append(main_view_instance)
+                logger.debug("Cargando MainView para la ruta '/'")
+            elif page.route == "/admin":
+                # La lógica de estado de login ahora se maneja directamente en AdminView
+                # a través de la comunicación de MainView.
+                page.views.append(obtener_admin_view())
+                logger.debug("Cargando AdminView para la ruta '/admin'")
+            else:
+                # Manejar rutas no encontradas o redirigir a una página de error
+                page.views.append(main_view_instance) # Por defecto, vuelve a la vista principal
+                logger.warning("Ruta no reconocida: %s. Redirigiendo a la vista principal.", page.route)
+
+            page.update() # Actualiza la página para mostrar la nueva vista
 
     # Asigna las funciones de manejo de eventos de navegación a la página
     page.on_route_change = route_change
@@ -141,15 +285,53 @@ def main(page: ft.Page):
     
     # Inicia la navegación a la ruta actual de la página.
     # Esto asegura que la vista correcta se muestre al inicio de la aplicación.
-    logger.info(f"Navegando a la ruta inicial: {page.route}")
+    logger.info("Navegando a la ruta inicial: %s", page.route)
     page.go(page.route)
 
+    if settings.STARTUP_REPORT and not _primera_sesion_reportada.is_set():
+        _primera_sesion_reportada.set()
+        reporte_arranque.registrar("primera sesión (vistas y primer render)", time.perf_counter() - inicio_sesion)
+        print(reporte_arranque.texto())
+
 # 6. Iniciar la aplicación Flet
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Aplicación web de la pizzería.")
+    parser.add_argument("--startup-report", action="store_true", help="Imprime el tiempo de cada fase del arranque.")
+    parser.add_argument("--workers", type=int, default=settings.WORKERS,
+                        help="Procesos de la aplicación detrás de un balanceador local con sesiones sticky.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS) # Proceso hijo iniciado por el clúster
+    parser.add_argument("--port", type=int, default=settings.FLET_PORT, help="Puerto en el que se sirve la aplicación.")
+    args = parser.parse_args()
+    from core.base_datos import es_sqlite
+    if args.startup_report:
+        settings.STARTUP_REPORT = True
+
+    if args.workers > 1 and not args.worker and es_sqlite(settings.DATABASE_URL):
+        # Las cachés se invalidan entre procesos con LISTEN/NOTIFY, que SQLite no tiene
+        logger.warning("Con SQLite la aplicación usa un solo proceso: se ignora --workers %s.", args.workers)
+        args.workers = 1
+    if args.workers > 1 and not args.worker:
+        # Varios procesos (un GIL cada uno): el balanceador escucha en --port y reparte por IP de cliente
+        from core.cluster import ejecutar_cluster
+        logger.info("Iniciando %s workers detrás del balanceador en el puerto %s.", args.workers, args.port)
+        ejecutar_cluster(__file__, args.workers, settings.FLET_HOST, args.port, settings.WORKER_PORT_BASE,
+                         ["--startup-report"] if settings.STARTUP_REPORT else [], settings.METRICS_PORT)
+        sys.exit(0)
+
     logger.info("Flet app configurada para iniciar.")
+    try:
+        inicializar_proceso()
+    except SQLAlchemyError as e:
+        # Cada sesión volverá a intentarlo y mostrará el error si la base de datos sigue sin responder
+        logger.critical("Error al inicializar el proceso: %s", e)
+    if settings.STARTUP_REPORT:
+        print(reporte_arranque.texto())
     # Para ejecutar la aplicación como una aplicación web en el navegador,
     # Flet necesita la vista y el puerto.
     # Asegúrate de que FLET_VIEW en core/config.py esté configurado como ft.AppView.WEB_BROWSER
     # y FLET_PORT tenga el puerto deseado (ej. 8550).
-    ft.app(target=main, view=settings.FLET_VIEW, port=settings.FLET_PORT)
+    # Los workers del clúster solo sirven la aplicación (view=None: no abren el navegador).
+    ft.app(target=main, view=None if args.worker else settings.FLET_VIEW, port=args.port,
+           host="127.0.0.1" if args.worker else None)
     logger.info("Flet app iniciada. Puedes acceder a ella a través del navegador.")
@@ -1,8 +1,9 @@
 # Importa los módulos necesarios de SQLAlchemy
 from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, validates
 from datetime import datetime
+from utils.normalizacion import normalizar_telefono, normalizar_email
 
 # Define la base declarativa para tus modelos.
 # Todos tus modelos de base de datos heredarán de esta clase.
@@ -18,18 +19,57 @@ class Cliente(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True) # Identificador único del cliente
     nombre = Column(String(100), nullable=False) # Nombre completo del cliente
-    email = Column(String(120), unique=True, nullable=False) # Correo electrónico, debe ser único
+    email = Column(String(120), unique=True, nullable=True) # Correo electrónico, debe ser único (opcional en el checkout)
     telefono = Column(String(20), nullable=True) # Número de teléfono del cliente
     direccion = Column(Text, nullable=False) # Dirección completa para el delivery
     fecha_registro = Column(DateTime, default=datetime.now) # Fecha y hora de registro del cliente
+    # Columnas normalizadas para búsquedas exactas e indexadas (ver core/cambios.sql)
+    telefono_normalizado = Column(String(20), unique=True, nullable=True, index=True) # Solo dígitos con prefijo '+', ej: +584121234567
+    email_normalizado = Column(String(120), unique=True, nullable=True, index=True) # Email en minúsculas
+    # Última modificación (índice para las consultas incrementales del panel de administración).
+    # Un trigger la actualiza también en escrituras fuera del ORM (ver core/cambios.sql)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False, index=True)
 
     # Relación uno a muchos con Pedido (un cliente puede tener muchos pedidos)
     # Al eliminar un cliente, todos sus pedidos asociados también se eliminarán en cascada.
     pedidos = relationship("Pedido", back_populates="cliente", cascade="all, delete-orphan")
 
+    # Relación uno a uno con las métricas precalculadas del cliente (recencia, frecuencia, valor)
+    metricas = relationship("ClienteMetrica", back_populates="cliente", uselist=False, cascade="all, delete-orphan")
+
+    @validates('telefono')
+    def _validar_telefono(self, key, telefono):
+        # Mantiene sincronizada la columna normalizada en cualquier escritura vía ORM
+        self.telefono_normalizado = normalizar_telefono(telefono)
+        return telefono
+
+    @validates('email')
+    def _validar_email(self, key, email):
+        self.email_normalizado = normalizar_email(email)
+        return email
+
     def __repr__(self):
         return f"<Cliente(id={self.id}, nombre='{self.nombre}', email='{self.email}')>"
 
+class ClienteMetrica(Base):
+    """
+    Métricas acumuladas por cliente (RFM: recencia, frecuencia y valor monetario).
+    Se actualizan de forma incremental al registrar cada pedido y pueden reconstruirse
+    por completo con MetricasClienteService.reconstruir_metricas().
+    """
+    __tablename__ = 'cliente_metricas'
+
+    cliente_id = Column(Integer, ForeignKey('clientes.id', ondelete='CASCADE'), primary_key=True)
+    ultima_compra = Column(DateTime, nullable=True, index=True) # Fecha y hora del último pedido (recencia)
+    num_pedidos = Column(Integer, nullable=False, default=0) # Cantidad de pedidos (frecuencia)
+    total_gastado = Column(Float, nullable=False, default=0.0) # Suma de los totales de sus pedidos (valor monetario)
+    ticket_promedio = Column(Float, nullable=False, default=0.0) # total_gastado / num_pedidos
+
+    cliente = relationship("Cliente", back_populates="metricas")
+
+    def __repr__(self):
+        return f"<ClienteMetrica(cliente_id={self.cliente_id}, num_pedidos={self.num_pedidos}, total_gastado={self.total_gastado})>"
+
 class CategoriaMenu(Base):
     """
     Modelo para categorizar los ítems del menú (ej: Pizzas, Bebidas, Postres).
@@ -60,6 +100,9 @@ class ItemMenu(Base):
     precio = Column(Float, nullable=False) # Precio del ítem
     imagen_url = Column(String(255), nullable=True) # URL de la imagen del ítem (opcional)
     disponible = Column(Boolean, default=True) # Indica si el ítem está disponible actualmente
+    # Última modificación (índice para las consultas incrementales del panel de administración).
+    # Un trigger la actualiza también en escrituras fuera del ORM (ver core/cambios.sql)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False, index=True)
 
     # Clave foránea para la categoría a la que pertenece este ítem
     categoria_id = Column(Integer, ForeignKey('categorias_menu.id'), nullable=False)
@@ -87,6 +130,9 @@ class Pedido(Base):
     estado = Column(String(50), default="Pendiente", nullable=False) # Estado del pedido (ej: "Pendiente", "En preparación", "En camino", "Entregado", "Cancelado")
     direccion_delivery = Column(Text, nullable=False) # Dirección final de entrega para este pedido
     metodo_pago = Column(String(50), nullable=True) # Nuevo campo: Método de pago ('Efectivo', 'Pago Móvil')
+    # Última modificación (índice para las consultas incrementales del panel de administración).
+    # Un trigger la actualiza también en escrituras fuera del ORM (ver core/cambios.sql)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False, index=True)
 
     # Relación muchos a uno con Cliente
     cliente = relationship("Cliente", back_populates="pedidos")
@@ -174,6 +220,21 @@ class Administrador(Base):
     def __repr__(self):
         return f"<Administrador(id={self.id}, usuario='{self.usuario}')>"
 
+class SesionAdmin(Base):
+    """
+    Modelo para las sesiones de administrador activas cuando se usa el almacén de sesiones
+    en PostgreSQL (SESSION_BACKEND=postgres), compartido entre varios procesos de la aplicación.
+    """
+    __tablename__ = 'sesiones_admin'
+
+    token = Column(String(64), primary_key=True) # Token aleatorio de la sesión
+    administrador_id = Column(Integer, ForeignKey('administradores.id', ondelete='CASCADE'), nullable=False)
+    usuario = Column(String(50), nullable=False) # Nombre de usuario (evita consultar administradores al validar)
+    expira_en = Column(DateTime, nullable=False, index=True) # Fecha y hora de expiración de la sesión
+
+    def __repr__(self):
+        return f"<SesionAdmin(usuario='{self.usuario}', expira_en='{self.expira_en}')>"
+
 class RegistroFinanciero(Base):
     """
     Modelo para registrar ingresos y gastos de la pizzería.
@@ -189,6 +250,9 @@ class RegistroFinanciero(Base):
     # ON DELETE SET NULL es una opción si quieres mantener el registro financiero pero desvincularlo del pedido.
     # Si quieres eliminarlo en cascada cuando se elimina el pedido, la relación en Pedido es la que debe tener 'cascade'.
     pedido_id = Column(Integer, ForeignKey('pedidos.id', ondelete='SET NULL'), nullable=True)
+    # Última modificación (índice para las consultas incrementales del panel de administración).
+    # Un trigger la actualiza también en escrituras fuera del ORM (ver core/cambios.sql)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False, index=True)
 
     # Relación muchos a uno con Pedido (un registro financiero puede estar vinculado a un pedido)
     pedido = relationship("Pedido", back_populates="registro_financiero")
@@ -3,17 +3,47 @@ from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from models.models import Administrador # Asegúrate que models.py esté en el directorio 'core'
 from services.base_service import BaseService
-import bcrypt # Necesitarás instalar bcrypt: pip install bcrypt
+from core.config import settings
+from utils.throttling import LoginThrottler
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import threading
 import logging # Importa el módulo logging
 
 logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
 
+# Pool acotado para bcrypt: la verificación (~250 ms de CPU con costo 12) no se ejecuta en el hilo
+# del manejador de Flet, y como máximo LOGIN_WORKERS verificaciones compiten por CPU a la vez.
+# bcrypt libera el GIL mientras calcula el hash, así que el resto de las sesiones sigue respondiendo.
+_bcrypt_executor = ThreadPoolExecutor(max_workers=settings.LOGIN_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_pendientes = threading.BoundedSemaphore(settings.LOGIN_WORKERS + settings.LOGIN_MAX_PENDIENTES)
+
+# Límite de intentos de login compartido por todas las sesiones del proceso
+_login_throttler = LoginThrottler(
+    user_capacity=settings.LOGIN_INTENTOS_POR_USUARIO,
+    ip_capacity=settings.LOGIN_INTENTOS_POR_IP,
+    window_seconds=settings.LOGIN_VENTANA_SEGUNDOS
+)
+
+@dataclass(frozen=True)
+class ResultadoAutenticacion:
+    """
+    Resultado de AdministradorService.autenticar.
+    'admin' es None si las credenciales no son válidas o si el intento fue bloqueado.
+    """
+    admin: Administrador = None
+    bloqueado: bool = False # True si se superó el límite de intentos o el servidor está saturado
+    reintentar_en: float = 0.0 # Segundos a esperar antes de reintentar (si bloqueado)
+
 class AdministradorService(BaseService):
     """
     Servicio para gestionar operaciones CRUD y de búsqueda para el modelo Administrador.
     """
     def __init__(self, Session: sessionmaker):
         super().__init__(Session)
+        # Hash usado para igualar tiempos cuando el usuario no existe. Se calcula una sola vez en el pool
+        # de bcrypt al crear el servicio, así ningún login paga ese costo extra (sería una señal de tiempo)
+        self._dummy_hash = _bcrypt_executor.submit(self.hash_password, "usuario-inexistente")
 
     def hash_password(self, password: str) -> str:
         """
@@ -25,13 +55,14 @@ class AdministradorService(BaseService):
         Returns:
             str: El hash de la contraseña codificado.
         """
+        import bcrypt # Necesitarás instalar bcrypt: pip install bcrypt. Se importa al primer uso (login/alta de administradores)
         try:
-            # Generar un salt y hashear la contraseña
-            hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+            # Generar un salt (con el costo configurado) y hashear la contraseña
+            hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS))
             logger.debug("Contraseña hasheada con éxito.")
             return hashed.decode('utf-8')
         except Exception as e:
-            logger.error(f"Error al hashear la contraseña: {e}")
+            logger.error("Error al hashear la contraseña: %s", e)
             raise
 
     def check_password(self, password: str, hashed_password: str) -> bool:
@@ -45,6 +76,7 @@ class AdministradorService(BaseService):
         Returns:
             bool: True si la contraseña coincide, False en caso contrario.
         """
+        import bcrypt # Importación diferida (ver hash_password)
         try:
             result = bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
             if result:
@@ -53,13 +85,90 @@ class AdministradorService(BaseService):
                 logger.debug("Contraseña verificada: no coincide.")
             return result
         except ValueError as e:
-            logger.error(f"Error al verificar la contraseña (hash inválido?): {e}")
+            logger.error("Error al verificar la contraseña (hash inválido?): %s", e)
             # Manejar el caso donde el hash no es válido (ej. corrupto o formato incorrecto)
             return False
         except Exception as e:
-            logger.error(f"Error inesperado al verificar la contraseña: {e}")
+            logger.error("Error inesperado al verificar la contraseña: %s", e)
             return False
 
+    @staticmethod
+    def _rondas_hash(hashed_password: str) -> int:
+        """Obtiene el costo (log2 de rondas) de un hash bcrypt, ej. '$2b$12$...' -> 12."""
+        try:
+            return int(hashed_password.split('$')[2])
+        except (IndexError, ValueError, AttributeError):
+            return 0
+
+    def _ejecutar_en_pool(self, funcion, *args):
+        """
+        Ejecuta una operación de bcrypt en el pool acotado y espera el resultado.
+
+        Returns:
+            El resultado de la función, o None si el pool está saturado.
+        """
+        if not _bcrypt_pendientes.acquire(blocking=False):
+            return None
+        try:
+            return _bcrypt_executor.submit(funcion, *args).result()
+        finally:
+            _bcrypt_pendientes.release()
+
+    def autenticar(self, usuario: str, password: str, ip: str = None) -> ResultadoAutenticacion:
+        """
+        Verifica las credenciales de un administrador con límite de intentos por usuario e IP.
+        La verificación bcrypt se ejecuta en un pool de hilos acotado y, si el hash almacenado
+        usa un costo menor que settings.BCRYPT_ROUNDS, se vuelve a hashear tras un login exitoso.
+
+        Args:
+            usuario (str): Nombre de usuario.
+            password (str): Contraseña en texto plano.
+            ip (str, optional): IP del cliente (ej. page.client_ip). Defaults to None.
+
+        Returns:
+            ResultadoAutenticacion: El resultado del intento.
+        """
+        espera = _login_throttler.try_acquire(usuario, ip)
+        if espera > 0:
+            logger.warning("Intento de login bloqueado para '%s' (IP: %s). Reintentar en %.0f s.", usuario, ip, espera)
+            return ResultadoAutenticacion(bloqueado=True, reintentar_en=espera)
+
+        admin = self.get_administrador_by_usuario(usuario)
+        if admin:
+            hashed_password = admin.contrasena_hash
+        else:
+            # Se verifica contra un hash ficticio para no revelar por tiempo si el usuario existe
+            hashed_password = self._dummy_hash.result()
+
+        coincide = self._ejecutar_en_pool(self.check_password, password, hashed_password)
+        if coincide is None:
+            logger.warning("Pool de verificación saturado; se rechaza el login de '%s'.", usuario)
+            return ResultadoAutenticacion(bloqueado=True, reintentar_en=1.0)
+        if not admin or not coincide:
+            return ResultadoAutenticacion()
+
+        _login_throttler.reset(usuario)
+        if self._rondas_hash(admin.contrasena_hash) < settings.BCRYPT_ROUNDS:
+            self._actualizar_hash(admin, password)
+        return ResultadoAutenticacion(admin=admin)
+
+    def _actualizar_hash(self, admin: Administrador, password: str):
+        """Vuelve a hashear la contraseña con el costo configurado (rehash-on-login)."""
+        nuevo_hash = self._ejecutar_en_pool(self.hash_password, password)
+        if nuevo_hash is None:
+            return # Pool saturado: se actualizará en el próximo login
+        session: Session = self.Session()
+        try:
+            session.query(Administrador).filter_by(id=admin.id).update({'contrasena_hash': nuevo_hash})
+            session.commit()
+            admin.contrasena_hash = nuevo_hash
+            logger.info("Hash de contraseña actualizado al costo %s para '%s'.", settings.BCRYPT_ROUNDS, admin.usuario)
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error("Error al actualizar el hash de contraseña de '%s': %s", admin.usuario, e)
+        finally:
+            session.close()
+
     def add_administrador(self, usuario: str, contrasena: str, email: str = None, super_admin: bool = False):
         """
         Añade un nuevo administrador, hasheando la contraseña.
@@ -74,7 +183,7 @@ class AdministradorService(BaseService):
             Administrador: La instancia del administrador añadida.
             None: Si ocurre un error.
         """
-        logger.info(f"Intentando añadir nuevo administrador: {usuario}")
+        logger.info("Intentando añadir nuevo administrador: %s", usuario)
         try:
             hashed_contrasena = self.hash_password(contrasena)
             nuevo_admin = Administrador(
@@ -85,18 +194,18 @@ class AdministradorService(BaseService):
             )
             admin_added = self.add(nuevo_admin)
             if admin_added:
-                logger.info(f"Administrador '{usuario}' añadido con éxito (ID: {admin_added.id}).")
+                logger.info("Administrador '%s' añadido con éxito (ID: %s).", usuario, admin_added.id)
             return admin_added
         except SQLAlchemyError as e:
-            logger.error(f"Error de DB al añadir administrador '{usuario}': {e}")
+            logger.error("Error de DB al añadir administrador '%s': %s", usuario, e)
             return None
         except Exception as e:
-            logger.error(f"Error inesperado al añadir administrador '{usuario}': {e}")
+            logger.error("Error inesperado al añadir administrador '%s': %s", usuario, e)
             return None
 
     def get_administrador_by_id(self, admin_id: int):
         """Obtiene un administrador por su ID."""
-        logger.debug(f"Buscando administrador por ID: {admin_id}")
+        logger.debug("Buscando administrador por ID: %s", admin_id)
         return self.get_by_id(Administrador, admin_id)
 
     def get_administrador_by_usuario(self, usuario: str):
@@ -113,12 +222,12 @@ class AdministradorService(BaseService):
         try:
             admin = session.query(Administrador).filter_by(usuario=usuario).first()
             if admin:
-                logger.debug(f"Administrador encontrado por usuario: {usuario}")
+                logger.debug("Administrador encontrado por usuario: %s", usuario)
             else:
-                logger.debug(f"No se encontró administrador con usuario: {usuario}")
+                logger.debug("No se encontró administrador con usuario: %s", usuario)
             return admin
         except SQLAlchemyError as e:
-            logger.error(f"Error de DB al buscar administrador por usuario '{usuario}': {e}")
+            logger.error("Error de DB al buscar administrador por usuario '%s': %s", usuario, e)
             return None
         finally:
             session.close()
@@ -137,25 +246,25 @@ class AdministradorService(BaseService):
         try:
             admin = session.query(Administrador).filter_by(email=email).first()
             if admin:
-                logger.debug(f"Administrador encontrado por email: {email}")
+                logger.debug("Administrador encontrado por email: %s", email)
             else:
-                logger.debug(f"No se encontró administrador con email: {email}")
+                logger.debug("No se encontró administrador con email: %s", email)
             return admin
         except SQLAlchemyError as e:
-            logger.error(f"Error de DB al buscar administrador por email '{email}': {e}")
+            logger.error("Error de DB al buscar administrador por email '%s': %s", email, e)
             return None
         finally:
             session.close()
 
     def update_administrador(self, admin_instance: Administrador):
         """Actualiza un administrador existente."""
-        logger.info(f"Intentando actualizar administrador: {admin_instance.usuario} (ID: {admin_instance.id})")
+        logger.info("Intentando actualizar administrador: %s (ID: %s)", admin_instance.usuario, admin_instance.id)
         # Nota: Si la contraseña necesita ser actualizada, se debe hashear antes de pasar la instancia.
         return self.update(admin_instance)
 
     def delete_administrador(self, admin_instance: Administrador):
         """Elimina un administrador."""
-        logger.info(f"Intentando eliminar administrador: {admin_instance.usuario} (ID: {admin_instance.id})")
+        logger.info("Intentando eliminar administrador: %s (ID: %s)", admin_instance.usuario, admin_instance.id)
         return self.delete(admin_instance)
 
     def get_all_administradores(self):
@@ -1,12 +1,58 @@
 # services/base_service.py
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func
+import functools
+import inspect
+from time import perf_counter
+from core.metricas import registro_metricas
+from core.replicas import ESCRITURA, REPLICA, destino_consultas
+
+_latencia_servicios = registro_metricas.histogram(
+    "pizzeria_service_seconds", "Duración de las llamadas a los métodos públicos de los servicios.", ("servicio", "metodo"))
+
+# Métodos de solo lectura por su nombre: con una réplica configurada sus consultas van a ella (ver core/replicas.py)
+# y con SQLite no toman el bloqueo de escritura (ver core/base_datos.py)
+_PREFIJOS_LECTURA = ("get_", "search_", "count", "changed_since", "exportar_")
+
+def _medir_latencia(servicio: str, metodo: str, funcion):
+    latencia = None # Serie de la métrica: se crea en la primera llamada (no se exponen métodos nunca usados)
+    destino = REPLICA if metodo.startswith(_PREFIJOS_LECTURA) else ESCRITURA
+
+    @functools.wraps(funcion)
+    def wrapper(*args, **kwargs):
+        nonlocal latencia
+        inicio = perf_counter()
+        # Un método llamado desde otro conserva el destino del exterior (ej. una lectura dentro de una escritura)
+        token = destino_consultas.set(destino) if destino_consultas.get() is None else None
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            if token is not None:
+                destino_consultas.reset(token)
+            if latencia is None:
+                latencia = _latencia_servicios.labels(servicio, metodo)
+            latencia.observe(perf_counter() - inicio)
+    return wrapper
+
+def _instrumentar_metodos(cls):
+    # Envuelve los métodos públicos definidos en 'cls' (no los heredados, que ya lo están)
+    for nombre, valor in list(vars(cls).items()):
+        if not nombre.startswith("_") and inspect.isfunction(valor):
+            setattr(cls, nombre, _medir_latencia(cls.__name__, nombre, valor))
 
 class BaseService:
     """
     Clase base para los servicios de base de datos.
     Gestiona las operaciones CRUD básicas y el manejo de sesiones.
+    La latencia de cada método público (también los de las subclases) se registra
+    en la métrica pizzeria_service_seconds. Los métodos de solo lectura (get_*, search_*,
+    count*, changed_since, exportar_*) consultan la réplica de lectura si hay una configurada.
     """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _instrumentar_metodos(cls)
+
     def __init__(self, Session: sessionmaker):
         """
         Inicializa el servicio con una fábrica de sesiones de SQLAlchemy.
@@ -128,3 +174,100 @@ class BaseService:
             return None
         finally:
             session.close()
+
+    def count(self, model_class, filters: list = None):
+        """
+        Cuenta las instancias de un modelo en la base de datos (sin cargarlas).
+
+        Args:
+            model_class: La clase del modelo.
+            filters (list, optional): Expresiones de filtro de SQLAlchemy. Defaults to None.
+
+        Returns:
+            int: La cantidad de filas.
+            None: Si ocurre un error.
+        """
+        session: Session = self.Session()
+        try:
+            q = session.query(func.count(model_class.id))
+            for condition in filters or ():
+                q = q.filter(condition)
+            return q.scalar()
+        except SQLAlchemyError as e:
+            print(f"Error al contar {model_class.__name__}: {e}")
+            return None
+        finally:
+            session.close()
+
+    def changed_since(self, model_class, ts, limit: int, options: list = None):
+        """
+        Obtiene las instancias modificadas después de 'ts' (columna indexada fecha_actualizacion),
+        de la más antigua a la más reciente. El costo depende de la cantidad de cambios y no del
+        tamaño de la tabla. Las filas eliminadas no aparecen.
+
+        Args:
+            model_class: La clase del modelo (debe tener fecha_actualizacion).
+            ts (datetime): Cursor devuelto por la llamada anterior. Si es None no se devuelven
+                           filas, solo el cursor inicial (la última modificación actual).
+            limit (int): Cantidad máxima de instancias a devolver.
+            options (list, optional): Opciones de carga (ej. joinedload). Defaults to None.
+
+        Returns:
+            tuple[list, datetime]: Las instancias modificadas y el nuevo cursor.
+            tuple[None, datetime]: Si ocurre un error (se conserva el cursor recibido).
+        """
+        session: Session = self.Session()
+        try:
+            if ts is None:
+                return [], session.query(func.max(model_class.fecha_actualizacion)).scalar()
+            q = session.query(model_class).filter(model_class.fecha_actualizacion > ts)
+            if options:
+                q = q.options(*options)
+            filas = q.order_by(model_class.fecha_actualizacion.asc(), model_class.id.asc()).limit(limit).all()
+            return filas, (filas[-1].fecha_actualizacion if filas else ts)
+        except SQLAlchemyError as e:
+            print(f"Error al obtener cambios de {model_class.__name__} desde {ts}: {e}")
+            return None, ts
+        finally:
+            session.close()
+
+    def get_page(self, model_class, offset: int, limit: int, order_by=None, descending: bool = False,
+                 filters: list = None, options: list = None, with_total: bool = True):
+        """
+        Obtiene una página de instancias de un modelo, ordenada y filtrada en la base de datos.
+        Pensado como fuente de datos de las tablas virtualizadas (ver utils.widgets.VirtualDataTable).
+
+        Args:
+            model_class: La clase del modelo.
+            offset (int): Cantidad de filas a saltar.
+            limit (int): Cantidad máxima de filas a devolver.
+            order_by (optional): Columna por la que ordenar. Defaults to None (orden por ID).
+            descending (bool, optional): Orden descendente. Defaults to False.
+            filters (list, optional): Expresiones de filtro de SQLAlchemy. Defaults to None.
+            options (list, optional): Opciones de carga (ej. joinedload). Defaults to None.
+            with_total (bool, optional): Si también se cuenta el total de filas filtradas. Defaults to True.
+
+        Returns:
+            tuple[list, int]: Las instancias de la página y el total de filas (None si with_total es False).
+            tuple[None, None]: Si ocurre un error.
+        """
+        session: Session = self.Session()
+        try:
+            q = session.query(model_class)
+            for condition in filters or ():
+                q = q.filter(condition)
+            total = q.count() if with_total else None
+            if options:
+                q = q.options(*options)
+            order_column = order_by if order_by is not None else model_class.id
+            # El ID desempata para que la paginación sea estable
+            q = q.order_by(order_column.desc() if descending else order_column.asc(),
+                           model_class.id.desc() if descending else model_class.id.asc())
+            return q.offset(offset).limit(limit).all(), total
+        except SQLAlchemyError as e:
+            print(f"Error al obtener página de {model_class.__name__} (offset {offset}, limit {limit}): {e}")
+            return None, None
+        finally:
+            session.close()
+
+_instrumentar_metodos(BaseService)
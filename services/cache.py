@@ -0,0 +1,206 @@
+# services/cache.py
+import os
+import select
+import socket
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from core.metricas import registro_metricas
+from core.replicas import en_primaria
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+# Canal de PostgreSQL usado para avisar a los demás procesos que un dato en caché cambió
+CANAL_INVALIDACION = "cache_invalidacion"
+
+# Identifica a este proceso en las notificaciones, para ignorar las que él mismo envió
+ORIGEN_PROCESO = f"{socket.gethostname()}:{os.getpid()}"
+
+_aciertos_cache = registro_metricas.counter(
+    "pizzeria_cache_hits_total", "Lecturas servidas desde la caché.", ("cache",))
+_fallos_cache = registro_metricas.counter(
+    "pizzeria_cache_misses_total", "Lecturas que tuvieron que cargar el valor de la base de datos.", ("cache",))
+
+class WriteThroughCache:
+    """
+    Caché de un único valor compartido por todas las sesiones del proceso.
+    Las lecturas no consultan la base de datos mientras el valor esté cargado; las escrituras
+    del servicio dueño del dato lo reemplazan (write-through) y los demás procesos lo invalidan
+    al recibir una notificación del InvalidationBus.
+    Los valores almacenados deben tratarse como de solo lectura.
+    """
+    def __init__(self, clave: str):
+        """
+        Args:
+            clave (str): Nombre del dato en caché (se usa como payload de las notificaciones).
+        """
+        self.clave = clave
+        self._valor = None
+        self._cargado = False
+        self._version = 0 # Aumenta en cada escritura/invalidación para descartar cargas obsoletas
+        self._lock = threading.Lock()
+        # Series de métricas resueltas una vez: en get() solo se incrementan
+        self._aciertos = _aciertos_cache.labels(clave)
+        self._fallos = _fallos_cache.labels(clave)
+
+    def get(self, cargar):
+        """
+        Obtiene el valor en caché, cargándolo con 'cargar()' si no está disponible.
+        Si 'cargar()' retorna None (ej. error de base de datos) el valor no se guarda.
+
+        Args:
+            cargar (callable): Función sin argumentos que obtiene el valor de la base de datos.
+        """
+        with self._lock:
+            cargado = self._cargado
+            valor = self._valor
+            version = self._version
+        if cargado:
+            self._aciertos.inc()
+            return valor
+        self._fallos.inc()
+        # El valor se comparte hasta la próxima invalidación: se carga de la base principal, no de una réplica atrasada
+        with en_primaria():
+            valor = cargar()
+        with self._lock:
+            # Si hubo una escritura mientras se cargaba, se conserva la escritura
+            if valor is not None and version == self._version:
+                self._valor = valor
+                self._cargado = True
+        return valor
+
+    def set(self, valor):
+        """Reemplaza el valor en caché (llamar después de confirmar la escritura en la base de datos)."""
+        with self._lock:
+            self._valor = valor
+            self._cargado = valor is not None
+            self._version += 1
+
+    def invalidate(self):
+        """Descarta el valor en caché; la próxima lectura lo vuelve a cargar."""
+        with self._lock:
+            self._valor = None
+            self._cargado = False
+            self._version += 1
+
+class InvalidationBus:
+    """
+    Propaga invalidaciones de caché entre procesos con LISTEN/NOTIFY de PostgreSQL.
+    Las notificaciones se envían dentro de la transacción que modifica el dato, por lo que
+    solo se entregan si esta se confirma. Un hilo en segundo plano escucha el canal con una
+    conexión dedicada. Con otros motores de base de datos el bus no hace nada.
+    """
+    def __init__(self, canal: str = CANAL_INVALIDACION):
+        self.canal = canal
+        self._suscriptores = {} # clave -> lista de callbacks
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def suscribir(self, clave: str, callback):
+        """Registra 'callback()' para ejecutarse cuando otro proceso invalide 'clave'."""
+        with self._lock:
+            self._suscriptores.setdefault(clave, []).append(callback)
+
+    def notificar(self, session: Session, clave: str):
+        """
+        Encola una notificación de invalidación en la transacción de 'session'.
+        Se entrega a los demás procesos cuando la transacción hace commit.
+        """
+        if session.get_bind().dialect.name != "postgresql":
+            return
+        session.execute(
+            text("SELECT pg_notify(:canal, :payload)"),
+            {"canal": self.canal, "payload": f"{clave}|{ORIGEN_PROCESO}"}
+        )
+
+    def publicar(self, Session, clave: str):
+        """
+        Envía una notificación de invalidación en su propia transacción. Para escrituras que ya
+        hicieron commit (ej. las de BaseService.add/update/delete) y no pueden usar notificar().
+
+        Args:
+            Session (sessionmaker): Fábrica de sesiones de SQLAlchemy.
+            clave (str): Dato en caché que cambió.
+        """
+        session: Session = Session()
+        try:
+            self.notificar(session, clave)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error("Error al publicar la invalidación de la caché '%s': %s", clave, e)
+        finally:
+            session.close()
+
+    def iniciar(self, engine):
+        """
+        Inicia el hilo que escucha las notificaciones (una sola vez por proceso).
+
+        Args:
+            engine (Engine): Motor de SQLAlchemy del que se obtiene la conexión dedicada.
+        """
+        if engine.dialect.name != "postgresql":
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._escuchar, args=(engine,), name="cache-listener", daemon=True)
+            self._hilo.start()
+        logger.info("Escuchando invalidaciones de caché en el canal '%s'.", self.canal)
+
+    def detener(self):
+        """Detiene el hilo de escucha."""
+        self._detener.set()
+
+    def _despachar(self, clave: str):
+        with self._lock:
+            callbacks = list(self._suscriptores.get(clave, ()))
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Error al invalidar la caché '%s': %s", clave, e)
+
+    def _invalidar_todo(self):
+        # Tras perder la conexión pudieron perderse notificaciones: se invalida todo por seguridad
+        with self._lock:
+            claves = list(self._suscriptores)
+        for clave in claves:
+            self._despachar(clave)
+
+    def _escuchar(self, engine):
+        while not self._detener.is_set():
+            conexion = None
+            try:
+                conexion = engine.raw_connection()
+                dbapi_conn = conexion.driver_connection
+                dbapi_conn.autocommit = True
+                with dbapi_conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.canal}"')
+                while not self._detener.is_set():
+                    if select.select([dbapi_conn], [], [], 5.0) == ([], [], []):
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        notificacion = dbapi_conn.notifies.pop(0)
+                        clave, _, origen = notificacion.payload.partition("|")
+                        if origen == ORIGEN_PROCESO:
+                            continue # Este proceso ya actualizó su caché al escribir
+                        logger.debug("Invalidación de caché recibida: '%s' (origen %s).", clave, origen)
+                        self._despachar(clave)
+            except Exception as e:
+                logger.error("Error en el hilo de invalidación de caché: %s. Reintentando en 5 s.", e)
+                self._invalidar_todo()
+                time.sleep(5)
+            finally:
+                if conexion is not None:
+                    try:
+                        conexion.invalidate() # No devolver al pool una conexión en modo LISTEN
+                    except Exception:
+                        pass
+
+# Bus compartido por todas las cachés del proceso
+bus_invalidacion = InvalidationBus()
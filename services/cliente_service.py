@@ -1,9 +1,13 @@
 # services/cliente_service.py
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy import or_, func, literal, text, case
 from models.models import Cliente # Asegúrate que models.py esté en el directorio 'core'
 from services.base_service import BaseService
+from utils.normalizacion import normalizar_telefono, normalizar_email
+from core.config import settings
+from core.base_datos import insert_con_conflicto
+from datetime import datetime
 
 class ClienteService(BaseService):
     """
@@ -31,31 +35,66 @@ class ClienteService(BaseService):
         """Obtiene un cliente por su ID."""
         return self.get_by_id(Cliente, cliente_id)
 
-    def search_clientes(self, query: str):
+    def search_clientes(self, query: str, limit: int = None, umbral: float = None):
         """
-        Busca clientes por nombre, email o teléfono.
+        Búsqueda difusa de clientes por nombre, email o teléfono, ordenada por relevancia.
+        Usa la similitud de trigramas de pg_trgm (operador <%), respaldada por índices GIN
+        (ver core/cambios.sql), y devuelve como máximo 'limit' resultados. En SQLite se usa
+        una búsqueda por subcadena (ver _search_clientes_like).
+        Con una consulta vacía devuelve los clientes registrados más recientemente.
 
         Args:
             query (str): El término de búsqueda.
+            limit (int, optional): Máximo de resultados (top-k). Defaults to settings.CLIENTES_BUSQUEDA_LIMITE.
+            umbral (float, optional): Similitud mínima (0 a 1). Defaults to settings.CLIENTES_BUSQUEDA_UMBRAL.
 
         Returns:
-            list[Cliente]: Una lista de clientes que coinciden con la búsqueda.
+            list[Cliente]: Una lista de clientes que coinciden con la búsqueda, del más al menos relevante.
         """
+        limit = limit or settings.CLIENTES_BUSQUEDA_LIMITE
+        umbral = settings.CLIENTES_BUSQUEDA_UMBRAL if umbral is None else umbral
+        query = (query or "").strip()
         session: Session = self.Session()
         try:
+            if not query:
+                return session.query(Cliente).order_by(Cliente.fecha_registro.desc(), Cliente.id.desc()).limit(limit).all()
+            if session.get_bind().dialect.name != "postgresql":
+                return self._search_clientes_like(session, query, limit)
+
+            # El umbral solo aplica a esta transacción (set_config con is_local = true)
+            session.execute(
+                text("SELECT set_config('pg_trgm.word_similarity_threshold', :umbral, true)"),
+                {'umbral': str(umbral)}
+            )
+            termino = literal(query)
+            columnas = [Cliente.nombre, Cliente.email, Cliente.telefono]
+            relevancia = func.greatest(*[func.word_similarity(termino, func.coalesce(col, '')) for col in columnas])
             return session.query(Cliente).filter(
-                or_(
-                    Cliente.nombre.ilike(f'%{query}%'),
-                    Cliente.email.ilike(f'%{query}%'),
-                    Cliente.telefono.ilike(f'%{query}%')
-                )
-            ).all()
+                or_(*[termino.op('<%')(col) for col in columnas]) # '<%' puede usar los índices GIN
+            ).order_by(relevancia.desc(), Cliente.id.desc()).limit(limit).all()
         except SQLAlchemyError as e:
             print(f"Error al buscar clientes con query '{query}': {e}")
             return None
         finally:
             session.close()
 
+    @staticmethod
+    def _search_clientes_like(session: Session, query: str, limit: int):
+        """
+        Búsqueda sin pg_trgm (SQLite): clientes cuyo nombre, email o teléfono contienen el término
+        (sin distinguir mayúsculas; en SQLite solo las letras sin acento), primero los que empiezan
+        por él. A diferencia de pg_trgm no tolera errores de tipeo.
+        """
+        termino = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        columnas = [Cliente.nombre, Cliente.email, Cliente.telefono]
+        relevancia = sum(
+            case((col.ilike(f"{termino}%", escape="\\"), 2), (col.ilike(f"%{termino}%", escape="\\"), 1), else_=0)
+            for col in columnas
+        )
+        return session.query(Cliente).filter(
+            or_(*[col.ilike(f"%{termino}%", escape="\\") for col in columnas])
+        ).order_by(relevancia.desc(), Cliente.id.desc()).limit(limit).all()
+
     def get_cliente_by_email(self, email: str):
         """
         Obtiene un cliente por su dirección de correo electrónico.
@@ -75,6 +114,118 @@ class ClienteService(BaseService):
         finally:
             session.close()
 
+    def find_for_checkout(self, telefono: str, email: str = None, nombre: str = None):
+        """
+        Busca el cliente del checkout por coincidencia exacta de teléfono o email normalizados.
+        Ambas columnas tienen índice único, por lo que la consulta devuelve como máximo dos filas.
+
+        Args:
+            telefono (str): Teléfono tal como lo escribió el cliente.
+            email (str, optional): Correo electrónico. Defaults to None.
+            nombre (str, optional): Nombre del cliente, usado para desempatar. Defaults to None.
+
+        Returns:
+            Cliente: El cliente encontrado (se prefiere el que coincide en nombre, luego por teléfono).
+            None: Si no se encuentra o ocurre un error.
+        """
+        telefono_normalizado = normalizar_telefono(telefono)
+        email_normalizado = normalizar_email(email)
+        condiciones = []
+        if telefono_normalizado:
+            condiciones.append(Cliente.telefono_normalizado == telefono_normalizado)
+        if email_normalizado:
+            condiciones.append(Cliente.email_normalizado == email_normalizado)
+        if not condiciones:
+            return None
+
+        session: Session = self.Session()
+        try:
+            candidatos = session.query(Cliente).filter(or_(*condiciones)).all()
+            if not candidatos:
+                return None
+            if nombre:
+                nombre_normalizado = nombre.strip().lower()
+                for cliente in candidatos:
+                    if cliente.nombre and cliente.nombre.strip().lower() == nombre_normalizado:
+                        return cliente
+            for cliente in candidatos:
+                if telefono_normalizado and cliente.telefono_normalizado == telefono_normalizado:
+                    return cliente
+            return candidatos[0]
+        except SQLAlchemyError as e:
+            print(f"Error al buscar cliente para el checkout (teléfono '{telefono}', email '{email}'): {e}")
+            return None
+        finally:
+            session.close()
+
+    def upsert_cliente(self, cliente_data: dict):
+        """
+        Crea o actualiza un cliente en una sola sentencia
+        (INSERT ... ON CONFLICT (telefono_normalizado) DO UPDATE ... RETURNING id).
+        Es seguro ante checkouts concurrentes del mismo cliente desde distintas sesiones:
+        la base de datos resuelve el conflicto de forma atómica.
+
+        Args:
+            cliente_data (dict): Diccionario con los datos del cliente.
+            Ej: {'nombre': 'Juan Perez', 'telefono': '0412-1234567', 'direccion': 'Calle Falsa 123', 'email': 'juan@example.com'}
+
+        Returns:
+            int: El ID del cliente insertado o actualizado.
+            None: Si ocurre un error.
+        """
+        telefono_normalizado = normalizar_telefono(cliente_data.get('telefono'))
+        email_normalizado = normalizar_email(cliente_data.get('email'))
+        if telefono_normalizado:
+            columna_conflicto = Cliente.telefono_normalizado
+        elif email_normalizado:
+            columna_conflicto = Cliente.email_normalizado
+        else:
+            # Sin clave natural no hay upsert posible: se inserta como cliente nuevo
+            cliente = self.add_cliente(cliente_data)
+            return cliente.id if cliente else None
+
+        valores = {
+            'nombre': cliente_data['nombre'],
+            'direccion': cliente_data['direccion'],
+            'telefono': cliente_data.get('telefono'),
+            'email': cliente_data.get('email') or None,
+            'telefono_normalizado': telefono_normalizado,
+            'email_normalizado': email_normalizado,
+        }
+        session: Session = self.Session()
+        stmt = insert_con_conflicto(session, Cliente).values(**valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[columna_conflicto],
+            set_={
+                # En PostgreSQL la mantiene un trigger; en SQLite el upsert no aplica el onupdate del modelo
+                'fecha_actualizacion': datetime.now(),
+                'nombre': stmt.excluded.nombre,
+                'direccion': stmt.excluded.direccion,
+                'telefono': func.coalesce(stmt.excluded.telefono, Cliente.telefono),
+                'telefono_normalizado': func.coalesce(stmt.excluded.telefono_normalizado, Cliente.telefono_normalizado),
+                # Un checkout sin email no borra el email ya registrado
+                'email': func.coalesce(stmt.excluded.email, Cliente.email),
+                'email_normalizado': func.coalesce(stmt.excluded.email_normalizado, Cliente.email_normalizado),
+            }
+        ).returning(Cliente.id)
+
+        try:
+            cliente_id = session.execute(stmt).scalar_one()
+            session.commit()
+            return cliente_id
+        except IntegrityError as e:
+            # El email ya pertenece a otro cliente (con otro teléfono): se reutiliza ese cliente
+            session.rollback()
+            print(f"Conflicto al registrar cliente '{cliente_data.get('nombre')}', se usará el cliente existente: {e.orig}")
+            cliente = self.find_for_checkout(cliente_data.get('telefono'), cliente_data.get('email'), cliente_data.get('nombre'))
+            return cliente.id if cliente else None
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"Error al registrar (upsert) cliente '{cliente_data.get('nombre')}': {e}")
+            return None
+        finally:
+            session.close()
+
     def update_cliente(self, cliente_instance: Cliente):
         """Actualiza un cliente existente."""
         return self.update(cliente_instance)
@@ -83,6 +234,46 @@ class ClienteService(BaseService):
         """Elimina un cliente."""
         return self.delete(cliente_instance)
 
+    # Columnas por las que se puede ordenar la tabla de clientes (clave usada por la vista -> columna)
+    COLUMNAS_ORDEN = {
+        'id': Cliente.id,
+        'nombre': Cliente.nombre,
+        'email': Cliente.email,
+        'registro': Cliente.fecha_registro,
+    }
+
+    def get_clientes_page(self, offset: int, limit: int, sort_by: str = 'registro', descending: bool = True,
+                          with_total: bool = True):
+        """
+        Obtiene una página de clientes ordenada en la base de datos (para búsquedas usar search_clientes).
+
+        Args:
+            offset (int): Cantidad de clientes a saltar.
+            limit (int): Cantidad máxima de clientes a devolver.
+            sort_by (str, optional): Clave de COLUMNAS_ORDEN. Defaults to 'registro'.
+            descending (bool, optional): Orden descendente. Defaults to True.
+            with_total (bool, optional): Si también se cuenta el total de clientes. Defaults to True.
+
+        Returns:
+            tuple[list[Cliente], int]: Los clientes de la página y el total (None si with_total es False).
+        """
+        return self.get_page(Cliente, offset, limit,
+                             order_by=self.COLUMNAS_ORDEN.get(sort_by, Cliente.fecha_registro),
+                             descending=descending, with_total=with_total)
+
+    def get_clientes_changed_since(self, desde: datetime, limit: int = 200):
+        """
+        Obtiene los clientes modificados después de 'desde'. Ver BaseService.changed_since.
+
+        Returns:
+            tuple[list[Cliente], datetime]: Los clientes modificados y el nuevo cursor.
+        """
+        return self.changed_since(Cliente, desde, limit)
+
+    def count_clientes(self):
+        """Cuenta los clientes registrados (None si ocurre un error)."""
+        return self.count(Cliente)
+
     def get_all_clientes(self):
         """Obtiene todos los clientes."""
         return self.get_all(Cliente)
@@ -1,8 +1,8 @@
 # services/financiero_service.py
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import and_, func # 'func' ha sido añadido aquí
-from datetime import datetime, date, time
+from sqlalchemy import and_, or_, func # 'func' ha sido añadido aquí
+from datetime import datetime, date, time, timedelta
 from models.models import RegistroFinanciero, Pedido # Asegúrate que models.py esté en el directorio 'core'
 from services.base_service import BaseService
 
@@ -131,6 +131,111 @@ class FinancieroService(BaseService):
         finally:
             session.close()
 
+    def get_totales_por_tipo(self, fecha_inicio: date = None, fecha_fin: date = None) -> dict:
+        """
+        Calcula el total de ingresos y de gastos en un rango de fechas con una sola consulta.
+
+        Args:
+            fecha_inicio (date, optional): Fecha de inicio. Defaults to None.
+            fecha_fin (date, optional): Fecha de fin. Defaults to None.
+
+        Returns:
+            dict: {'Ingreso': total, 'Gasto': total}.
+            None: Si ocurre un error.
+        """
+        session: Session = self.Session()
+        try:
+            q = session.query(RegistroFinanciero.tipo, func.sum(RegistroFinanciero.monto))
+            if fecha_inicio:
+                q = q.filter(RegistroFinanciero.fecha >= datetime.combine(fecha_inicio, time.min))
+            if fecha_fin:
+                q = q.filter(RegistroFinanciero.fecha <= datetime.combine(fecha_fin, time.max))
+            totales = {'Ingreso': 0.0, 'Gasto': 0.0}
+            for tipo, total in q.group_by(RegistroFinanciero.tipo).all():
+                totales[tipo] = total or 0.0
+            return totales
+        except SQLAlchemyError as e:
+            print(f"Error al calcular totales por tipo: {e}")
+            return None
+        finally:
+            session.close()
+
+    def get_ingresos_por_dia(self, fecha_inicio: date, fecha_fin: date) -> dict:
+        """
+        Calcula los ingresos de cada día de un rango de fechas (agrupados en la base de datos).
+
+        Args:
+            fecha_inicio (date): Primer día del rango.
+            fecha_fin (date): Último día del rango.
+
+        Returns:
+            dict: {date: total} con todos los días del rango (0.0 si no hubo ingresos).
+            None: Si ocurre un error.
+        """
+        session: Session = self.Session()
+        try:
+            dia = func.date(RegistroFinanciero.fecha)
+            filas = session.query(dia, func.sum(RegistroFinanciero.monto)).filter(
+                RegistroFinanciero.tipo == 'Ingreso',
+                RegistroFinanciero.fecha >= datetime.combine(fecha_inicio, time.min),
+                RegistroFinanciero.fecha <= datetime.combine(fecha_fin, time.max)
+            ).group_by(dia).all()
+            ingresos = {fecha_inicio + timedelta(days=i): 0.0 for i in range((fecha_fin - fecha_inicio).days + 1)}
+            for fecha, total in filas:
+                if isinstance(fecha, str): # Algunos motores devuelven la fecha como texto
+                    fecha = date.fromisoformat(fecha)
+                ingresos[fecha] = total or 0.0
+            return ingresos
+        except SQLAlchemyError as e:
+            print(f"Error al calcular ingresos por día: {e}")
+            return None
+        finally:
+            session.close()
+
+    # Columnas por las que se puede ordenar la tabla de finanzas (clave usada por la vista -> columna)
+    COLUMNAS_ORDEN = {
+        'id': RegistroFinanciero.id,
+        'fecha': RegistroFinanciero.fecha,
+        'tipo': RegistroFinanciero.tipo,
+        'monto': RegistroFinanciero.monto,
+    }
+
+    def get_registros_page(self, offset: int, limit: int, sort_by: str = 'fecha', descending: bool = True,
+                           filtro: str = None, with_total: bool = True):
+        """
+        Obtiene una página de registros financieros ordenada y filtrada en la base de datos.
+
+        Args:
+            offset (int): Cantidad de registros a saltar.
+            limit (int): Cantidad máxima de registros a devolver.
+            sort_by (str, optional): Clave de COLUMNAS_ORDEN. Defaults to 'fecha'.
+            descending (bool, optional): Orden descendente. Defaults to True.
+            filtro (str, optional): Número de pedido asociado, o texto a buscar en tipo o descripción. Defaults to None.
+            with_total (bool, optional): Si también se cuenta el total de registros filtrados. Defaults to True.
+
+        Returns:
+            tuple[list[RegistroFinanciero], int]: Los registros de la página y el total (None si with_total es False).
+        """
+        filters = []
+        filtro = (filtro or "").strip()
+        if filtro.isdigit():
+            filters.append(or_(RegistroFinanciero.id == int(filtro), RegistroFinanciero.pedido_id == int(filtro)))
+        elif filtro:
+            patron = f'%{filtro}%'
+            filters.append(or_(RegistroFinanciero.tipo.ilike(patron), RegistroFinanciero.descripcion.ilike(patron)))
+        return self.get_page(RegistroFinanciero, offset, limit,
+                             order_by=self.COLUMNAS_ORDEN.get(sort_by, RegistroFinanciero.fecha),
+                             descending=descending, filters=filters, with_total=with_total)
+
+    def get_registros_changed_since(self, desde: datetime, limit: int = 200):
+        """
+        Obtiene los registros financieros modificados después de 'desde'. Ver BaseService.changed_since.
+
+        Returns:
+            tuple[list[RegistroFinanciero], datetime]: Los registros modificados y el nuevo cursor.
+        """
+        return self.changed_since(RegistroFinanciero, desde, limit)
+
     def get_all_registros_financieros(self):
         """Obtiene todos los registros financieros."""
         return self.get_all(RegistroFinanciero)
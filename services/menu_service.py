@@ -4,10 +4,38 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import or_
 from models.models import CategoriaMenu, ItemMenu # Asegúrate que models.py esté en el directorio 'core'
 from services.base_service import BaseService
+from services.cache import WriteThroughCache, bus_invalidacion
+from dataclasses import dataclass
+from datetime import datetime
 import logging # Importa el módulo logging
 
 logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
 
+@dataclass(frozen=True)
+class ItemCatalogo:
+    """Copia inmutable de un ítem del menú, compartida por todas las sesiones."""
+    __slots__ = ("id", "nombre", "descripcion", "precio", "imagen_url", "disponible", "categoria_nombre")
+    id: int
+    nombre: str
+    descripcion: str
+    precio: float
+    imagen_url: str
+    disponible: bool
+    categoria_nombre: str
+
+@dataclass(frozen=True)
+class CatalogoMenu:
+    """
+    Catálogo del menú para los clientes: ítems disponibles, en total y agrupados por categoría.
+    Es inmutable, así que una sola instancia se comparte entre todas las sesiones del proceso.
+    """
+    items: tuple # tuple[ItemCatalogo, ...] disponibles
+    por_categoria: tuple # tuple[(nombre_categoria, tuple[ItemCatalogo, ...]), ...] incluidas las categorías vacías
+
+# Catálogo compartido por el proceso; se invalida al modificar categorías o ítems (aquí o en otro proceso)
+_catalogo_cache = WriteThroughCache("catalogo_menu")
+bus_invalidacion.suscribir(_catalogo_cache.clave, _catalogo_cache.invalidate)
+
 class MenuService(BaseService):
     """
     Servicio para gestionar operaciones CRUD y de búsqueda para los modelos
@@ -16,6 +44,46 @@ class MenuService(BaseService):
     def __init__(self, Session: sessionmaker):
         super().__init__(Session)
 
+    # --- Catálogo compartido ---
+
+    def get_catalogo(self) -> CatalogoMenu:
+        """
+        Obtiene el catálogo del menú desde la caché del proceso (solo consulta la base de datos
+        la primera vez o tras una modificación del menú).
+
+        Returns:
+            CatalogoMenu: El catálogo compartido.
+            None: Si ocurre un error al cargarlo.
+        """
+        return _catalogo_cache.get(self._cargar_catalogo)
+
+    def _cargar_catalogo(self):
+        """Construye el catálogo con una consulta de categorías y otra de ítems (con su categoría)."""
+        categorias = self.get_all_categorias()
+        items = self.get_all_items_menu()
+        if categorias is None or items is None:
+            return None
+        por_categoria = {categoria.nombre: [] for categoria in categorias}
+        disponibles = []
+        for item in items:
+            if not item.disponible: # Solo se muestran ítems disponibles
+                continue
+            categoria_nombre = item.categoria.nombre if item.categoria else "Sin Categoría"
+            snapshot = ItemCatalogo(item.id, item.nombre, item.descripcion, item.precio,
+                                    item.imagen_url, item.disponible, categoria_nombre)
+            disponibles.append(snapshot)
+            por_categoria.setdefault(categoria_nombre, []).append(snapshot)
+        logger.info("Catálogo del menú cargado: %s ítems disponibles en %s categorías.", len(disponibles), len(por_categoria))
+        return CatalogoMenu(
+            items=tuple(disponibles),
+            por_categoria=tuple((nombre, tuple(items)) for nombre, items in por_categoria.items())
+        )
+
+    def _invalidar_catalogo(self):
+        """Descarta el catálogo en caché y avisa a los demás procesos."""
+        _catalogo_cache.invalidate()
+        bus_invalidacion.publicar(self.Session, _catalogo_cache.clave)
+
     # --- Métodos para CategoriaMenu ---
 
     def add_categoria(self, nombre: str, descripcion: str = None):
@@ -23,10 +91,11 @@ class MenuService(BaseService):
         try:
             nueva_categoria = CategoriaMenu(nombre=nombre, descripcion=descripcion)
             result = self.add(nueva_categoria)
-            logger.info(f"Categoría '{nombre}' añadida con éxito (ID: {result.id if result else 'N/A'}).")
+            logger.info("Categoría '%s' añadida con éxito (ID: %s).", nombre, (result.id if result else 'N/A'))
+            self._invalidar_catalogo()
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al añadir categoría '{nombre}': {e}")
+            logger.error("Error al añadir categoría '%s': %s", nombre, e)
             return None
 
     def get_categoria_by_id(self, categoria_id: int):
@@ -34,12 +103,12 @@ class MenuService(BaseService):
         try:
             result = self.get_by_id(CategoriaMenu, categoria_id)
             if result:
-                logger.debug(f"Categoría encontrada por ID {categoria_id}: {result.nombre}")
+                logger.debug("Categoría encontrada por ID %s: %s", categoria_id, result.nombre)
             else:
-                logger.debug(f"No se encontró categoría con ID {categoria_id}.")
+                logger.debug("No se encontró categoría con ID %s.", categoria_id)
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al obtener categoría por ID {categoria_id}: {e}")
+            logger.error("Error al obtener categoría por ID %s: %s", categoria_id, e)
             return None
 
     def get_categoria_by_nombre(self, nombre: str):
@@ -48,12 +117,12 @@ class MenuService(BaseService):
         try:
             result = session.query(CategoriaMenu).filter_by(nombre=nombre).first()
             if result:
-                logger.debug(f"Categoría encontrada por nombre '{nombre}': {result.id}")
+                logger.debug("Categoría encontrada por nombre '%s': %s", nombre, result.id)
             else:
-                logger.debug(f"No se encontró categoría con nombre '{nombre}'.")
+                logger.debug("No se encontró categoría con nombre '%s'.", nombre)
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al buscar categoría por nombre '{nombre}': {e}")
+            logger.error("Error al buscar categoría por nombre '%s': %s", nombre, e)
             return None
         finally:
             session.close()
@@ -62,30 +131,32 @@ class MenuService(BaseService):
         """Actualiza una categoría existente."""
         try:
             result = self.update(categoria_instance)
-            logger.info(f"Categoría '{categoria_instance.nombre}' (ID: {categoria_instance.id}) actualizada con éxito.")
+            logger.info("Categoría '%s' (ID: %s) actualizada con éxito.", categoria_instance.nombre, categoria_instance.id)
+            self._invalidar_catalogo()
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al actualizar categoría '{categoria_instance.nombre}' (ID: {categoria_instance.id}): {e}")
+            logger.error("Error al actualizar categoría '%s' (ID: %s): %s", categoria_instance.nombre, categoria_instance.id, e)
             return None
 
     def delete_categoria(self, categoria_instance: CategoriaMenu):
         """Elimina una categoría."""
         try:
             self.delete(categoria_instance)
-            logger.info(f"Categoría '{categoria_instance.nombre}' (ID: {categoria_instance.id}) eliminada con éxito.")
+            logger.info("Categoría '%s' (ID: %s) eliminada con éxito.", categoria_instance.nombre, categoria_instance.id)
+            self._invalidar_catalogo()
             return True
         except SQLAlchemyError as e:
-            logger.error(f"Error al eliminar categoría '{categoria_instance.nombre}' (ID: {categoria_instance.id}): {e}")
+            logger.error("Error al eliminar categoría '%s' (ID: %s): %s", categoria_instance.nombre, categoria_instance.id, e)
             return False
 
     def get_all_categorias(self):
         """Obtiene todas las categorías de menú."""
         try:
             result = self.get_all(CategoriaMenu)
-            logger.debug(f"Obtenidas {len(result)} categorías.")
+            logger.debug("Obtenidas %s categorías.", len(result))
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al obtener todas las categorías: {e}")
+            logger.error("Error al obtener todas las categorías: %s", e)
             return None
 
     # --- Métodos para ItemMenu ---
@@ -103,10 +174,11 @@ class MenuService(BaseService):
                 categoria_id=categoria_id
             )
             result = self.add(nuevo_item)
-            logger.info(f"Ítem de menú '{nombre}' añadido con éxito (ID: {result.id if result else 'N/A'}).")
+            logger.info("Ítem de menú '%s' añadido con éxito (ID: %s).", nombre, (result.id if result else 'N/A'))
+            self._invalidar_catalogo()
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al añadir ítem de menú '{nombre}': {e}")
+            logger.error("Error al añadir ítem de menú '%s': %s", nombre, e)
             return None
 
     def get_item_menu_by_id(self, item_id: int):
@@ -116,17 +188,41 @@ class MenuService(BaseService):
             # Usar joinedload para cargar la categoría junto con el ítem
             result = session.query(ItemMenu).options(joinedload(ItemMenu.categoria)).filter_by(id=item_id).first()
             if result:
-                logger.debug(f"Ítem de menú encontrado por ID {item_id}: {result.nombre}")
+                logger.debug("Ítem de menú encontrado por ID %s: %s", item_id, result.nombre)
             else:
-                logger.debug(f"No se encontró ítem de menú con ID {item_id}.")
+                logger.debug("No se encontró ítem de menú con ID %s.", item_id)
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al obtener ítem de menú por ID {item_id}: {e}")
+            logger.error("Error al obtener ítem de menú por ID %s: %s", item_id, e)
             return None
         finally:
             session.close() # Asegurarse de cerrar la sesión
 
 
+    def get_items_menu_by_ids(self, item_ids: list[int]):
+        """
+        Obtiene varios ítems del menú con una sola consulta.
+
+        Args:
+            item_ids (list[int]): IDs de los ítems.
+
+        Returns:
+            list[ItemMenu]: Los ítems encontrados (los IDs inexistentes se omiten).
+            None: Si ocurre un error.
+        """
+        if not item_ids:
+            return []
+        session: Session = self.Session()
+        try:
+            result = session.query(ItemMenu).filter(ItemMenu.id.in_(item_ids)).all()
+            logger.debug("Obtenidos %s de %s ítems del menú por ID.", len(result), len(item_ids))
+            return result
+        except SQLAlchemyError as e:
+            logger.error("Error al obtener ítems del menú por IDs %s: %s", item_ids, e)
+            return None
+        finally:
+            session.close()
+
     def search_items_menu(self, query: str = None, categoria_id: int = None, disponible: bool = None):
         """
         Busca ítems del menú por nombre, descripción, categoría y disponibilidad.
@@ -152,10 +248,10 @@ class MenuService(BaseService):
             if disponible is not None:
                 q = q.filter(ItemMenu.disponible == disponible)
             result = q.all()
-            logger.debug(f"Búsqueda de ítems del menú para '{query}', categoría {categoria_id}, disponible {disponible}: {len(result)} resultados.")
+            logger.debug("Búsqueda de ítems del menú para '%s', categoría %s, disponible %s: %s resultados.", query, categoria_id, disponible, len(result))
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al buscar ítems del menú: {e}")
+            logger.error("Error al buscar ítems del menú: %s", e)
             return None
         finally:
             session.close()
@@ -164,32 +260,43 @@ class MenuService(BaseService):
         """Actualiza un ítem del menú existente."""
         try:
             result = self.update(item_instance)
-            logger.info(f"Ítem de menú '{item_instance.nombre}' (ID: {item_instance.id}) actualizado con éxito.")
+            logger.info("Ítem de menú '%s' (ID: %s) actualizado con éxito.", item_instance.nombre, item_instance.id)
+            self._invalidar_catalogo()
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al actualizar ítem de menú '{item_instance.nombre}' (ID: {item_instance.id}): {e}")
+            logger.error("Error al actualizar ítem de menú '%s' (ID: %s): %s", item_instance.nombre, item_instance.id, e)
             return None
 
     def delete_item_menu(self, item_instance: ItemMenu):
         """Elimina un ítem del menú."""
         try:
             self.delete(item_instance)
-            logger.info(f"Ítem de menú '{item_instance.nombre}' (ID: {item_instance.id}) eliminado con éxito.")
+            logger.info("Ítem de menú '%s' (ID: %s) eliminado con éxito.", item_instance.nombre, item_instance.id)
+            self._invalidar_catalogo()
             return True
         except SQLAlchemyError as e:
-            logger.error(f"Error al eliminar ítem de menú '{item_instance.nombre}' (ID: {item_instance.id}): {e}")
+            logger.error("Error al eliminar ítem de menú '%s' (ID: %s): %s", item_instance.nombre, item_instance.id, e)
             return False
 
+    def get_items_menu_changed_since(self, desde: datetime, limit: int = 200):
+        """
+        Obtiene los ítems del menú modificados después de 'desde'. Ver BaseService.changed_since.
+
+        Returns:
+            tuple[list[ItemMenu], datetime]: Los ítems modificados y el nuevo cursor.
+        """
+        return self.changed_since(ItemMenu, desde, limit)
+
     def get_all_items_menu(self):
         """Obtiene todos los ítems del menú, cargando ansiosamente su categoría."""
         session: Session = self.Session() # Abrir sesión para la consulta
         try:
             # Usar joinedload para cargar la categoría junto con el ítem
             result = session.query(ItemMenu).options(joinedload(ItemMenu.categoria)).all()
-            logger.debug(f"Obtenidos {len(result)} ítems del menú con categorías cargadas ansiosamente.")
+            logger.debug("Obtenidos %s ítems del menú con categorías cargadas ansiosamente.", len(result))
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Error al obtener todos los ítems del menú con carga ansiosa: {e}")
+            logger.error("Error al obtener todos los ítems del menú con carga ansiosa: %s", e)
             return None
         finally:
             session.close() # Asegurarse de cerrar la sesión
@@ -0,0 +1,162 @@
+# services/metricas_cliente_service.py
+import csv
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select, delete, func
+from models.models import ClienteMetrica, Cliente, Pedido # Asegúrate que models.py esté en el directorio 'core'
+from services.base_service import BaseService
+from core.base_datos import insert_con_conflicto, mayor
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+# Los pedidos cancelados no cuentan para las métricas del cliente
+ESTADOS_EXCLUIDOS = ('Cancelado',)
+
+class MetricasClienteService(BaseService):
+    """
+    Servicio para las métricas precalculadas por cliente (tabla cliente_metricas):
+    fecha de la última compra, cantidad de pedidos, total gastado y ticket promedio.
+    Las vistas y exportaciones leen de esta tabla en lugar de agregar los pedidos en vivo.
+    """
+    def __init__(self, Session: sessionmaker):
+        super().__init__(Session)
+
+    @staticmethod
+    def registrar_pedido(session: Session, cliente_id: int, total: float, fecha_hora: datetime):
+        """
+        Actualiza de forma incremental las métricas de un cliente dentro de la sesión recibida.
+        No hace commit: está pensado para ejecutarse en la misma transacción que registra el pedido
+        (ver PedidoService.place_order).
+
+        Args:
+            session (Session): Sesión de SQLAlchemy con la transacción en curso.
+            cliente_id (int): ID del cliente.
+            total (float): Total del pedido registrado.
+            fecha_hora (datetime): Fecha y hora del pedido.
+        """
+        stmt = insert_con_conflicto(session, ClienteMetrica).values(
+            cliente_id=cliente_id,
+            ultima_compra=fecha_hora,
+            num_pedidos=1,
+            total_gastado=total,
+            ticket_promedio=total
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ClienteMetrica.cliente_id],
+            set_={
+                'ultima_compra': mayor(ClienteMetrica.ultima_compra, stmt.excluded.ultima_compra),
+                'num_pedidos': ClienteMetrica.num_pedidos + 1,
+                'total_gastado': ClienteMetrica.total_gastado + stmt.excluded.total_gastado,
+                'ticket_promedio': (ClienteMetrica.total_gastado + stmt.excluded.total_gastado) / (ClienteMetrica.num_pedidos + 1),
+            }
+        )
+        session.execute(stmt)
+
+    def reconstruir_metricas(self):
+        """
+        Reconstruye por completo la tabla cliente_metricas a partir de los pedidos,
+        con una única pasada agregada en SQL (INSERT ... SELECT ... GROUP BY) dentro de una transacción.
+
+        Returns:
+            int: Cantidad de clientes con métricas tras la reconstrucción.
+            None: Si ocurre un error.
+        """
+        agregados = select(
+            Pedido.cliente_id,
+            func.max(Pedido.fecha_hora),
+            func.count(Pedido.id),
+            func.sum(Pedido.total),
+            func.avg(Pedido.total)
+        ).where(Pedido.estado.notin_(ESTADOS_EXCLUIDOS)).group_by(Pedido.cliente_id)
+
+        session: Session = self.Session()
+        try:
+            session.execute(delete(ClienteMetrica))
+            result = session.execute(
+                ClienteMetrica.__table__.insert().from_select(
+                    ['cliente_id', 'ultima_compra', 'num_pedidos', 'total_gastado', 'ticket_promedio'],
+                    agregados
+                )
+            )
+            session.commit()
+            logger.info("Métricas de clientes reconstruidas: %s clientes.", result.rowcount)
+            return result.rowcount
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error("Error al reconstruir las métricas de clientes: %s", e)
+            return None
+        finally:
+            session.close()
+
+    def get_metricas_por_clientes(self, cliente_ids: list[int]) -> dict:
+        """
+        Obtiene las métricas de varios clientes con una sola consulta.
+
+        Args:
+            cliente_ids (list[int]): IDs de los clientes.
+
+        Returns:
+            dict: {cliente_id: ClienteMetrica}. Los clientes sin pedidos no aparecen.
+        """
+        if not cliente_ids:
+            return {}
+        session: Session = self.Session()
+        try:
+            metricas = session.query(ClienteMetrica).filter(ClienteMetrica.cliente_id.in_(cliente_ids)).all()
+            return {m.cliente_id: m for m in metricas}
+        except SQLAlchemyError as e:
+            logger.error("Error al obtener métricas de clientes: %s", e)
+            return {}
+        finally:
+            session.close()
+
+    def get_segmentacion_rfm(self, grupos: int = 5) -> list[dict]:
+        """
+        Calcula la segmentación RFM leyendo solo de cliente_metricas (sin agregar pedidos).
+        Cada dimensión se puntúa de 1 a 'grupos' con NTILE (mayor puntuación = mejor cliente).
+
+        Args:
+            grupos (int, optional): Cantidad de grupos por dimensión. Defaults to 5.
+
+        Returns:
+            list[dict]: Una fila por cliente con sus métricas y puntuaciones r, f, m.
+        """
+        session: Session = self.Session()
+        try:
+            filas = session.query(
+                Cliente.id, Cliente.nombre, Cliente.email, Cliente.telefono,
+                ClienteMetrica.ultima_compra, ClienteMetrica.num_pedidos,
+                ClienteMetrica.total_gastado, ClienteMetrica.ticket_promedio,
+                func.ntile(grupos).over(order_by=ClienteMetrica.ultima_compra.asc()).label('r'),
+                func.ntile(grupos).over(order_by=ClienteMetrica.num_pedidos.asc()).label('f'),
+                func.ntile(grupos).over(order_by=ClienteMetrica.total_gastado.asc()).label('m'),
+            ).join(ClienteMetrica, ClienteMetrica.cliente_id == Cliente.id).all()
+            return [dict(fila._mapping) for fila in filas]
+        except SQLAlchemyError as e:
+            logger.error("Error al calcular la segmentación RFM: %s", e)
+            return []
+        finally:
+            session.close()
+
+    def exportar_segmentacion_csv(self, ruta: str, grupos: int = 5):
+        """
+        Exporta la segmentación RFM a un archivo CSV (para campañas de marketing).
+
+        Args:
+            ruta (str): Ruta del archivo CSV a escribir.
+            grupos (int, optional): Cantidad de grupos por dimensión. Defaults to 5.
+
+        Returns:
+            int: Cantidad de filas exportadas.
+        """
+        filas = self.get_segmentacion_rfm(grupos)
+        columnas = ['id', 'nombre', 'email', 'telefono', 'ultima_compra', 'num_pedidos',
+                    'total_gastado', 'ticket_promedio', 'r', 'f', 'm']
+        with open(ruta, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columnas)
+            writer.writeheader()
+            writer.writerows(filas)
+        logger.info("Segmentación RFM exportada a '%s': %s clientes.", ruta, len(filas))
+        return len(filas)
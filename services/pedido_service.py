@@ -1,10 +1,33 @@
 # services/pedido_service.py
 from sqlalchemy.orm import sessionmaker, Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import and_, func
+from sqlalchemy import and_, or_, func
+from dataclasses import dataclass
 from datetime import datetime, date, time
-from models.models import Pedido, DetallePedido, Cliente, ItemMenu # Asegúrate que models.py esté en el directorio 'core'
+from models.models import Pedido, DetallePedido, Cliente, ItemMenu, RegistroFinanciero # Asegúrate que models.py esté en el directorio 'core'
 from services.base_service import BaseService
+from services.metricas_cliente_service import MetricasClienteService
+from services.cache import WriteThroughCache, bus_invalidacion
+
+# Conteo de pedidos por estado (tarjetas del dashboard), compartido por todas las sesiones.
+# Cada escritura de pedidos lo invalida en este proceso y, vía el bus, en los demás.
+_estadisticas_cache = WriteThroughCache("estadisticas_pedidos")
+bus_invalidacion.suscribir(_estadisticas_cache.clave, _estadisticas_cache.invalidate)
+
+@dataclass(frozen=True)
+class ReciboPedido:
+    """
+    Resumen compacto de un pedido confirmado, devuelto por PedidoService.place_order.
+    No está ligado a ninguna sesión de SQLAlchemy, por lo que puede usarse libremente en las vistas.
+    """
+    pedido_id: int
+    registro_id: int
+    cliente_id: int
+    cliente_nombre: str
+    total: float
+    metodo_pago: str
+    fecha_hora: datetime
+    num_items: int
 
 class PedidoService(BaseService):
     """
@@ -64,7 +87,9 @@ class PedidoService(BaseService):
                 )
                 session.add(detalle)
 
+            bus_invalidacion.notificar(session, _estadisticas_cache.clave)
             session.commit()
+            _estadisticas_cache.invalidate()
             session.refresh(nuevo_pedido)
             return nuevo_pedido
         except SQLAlchemyError as e:
@@ -74,6 +99,102 @@ class PedidoService(BaseService):
         finally:
             session.close()
 
+    def place_order(self, cliente_id: int, direccion_delivery: str,
+                    items_con_cantidad: list[dict], metodo_pago: str = None):
+        """
+        Registra un pedido completo en una sola transacción: el Pedido, sus DetallePedido
+        y el RegistroFinanciero de ingreso asociado se escriben con un único commit.
+        El total se calcula aquí con los precios actuales del menú (no se confía en el cliente).
+
+        Args:
+            cliente_id (int): ID del cliente que realiza el pedido.
+            direccion_delivery (str): Dirección de entrega del pedido.
+            items_con_cantidad (list[dict]): Lista de diccionarios con 'item_id' y 'cantidad'.
+                                              Ej: [{'item_id': 1, 'cantidad': 2}, ...].
+            metodo_pago (str, optional): El método de pago ('Efectivo', 'Pago Móvil'). Defaults to None.
+
+        Returns:
+            ReciboPedido: El recibo del pedido registrado.
+            None: Si ocurre un error o el pedido no tiene ítems válidos.
+        """
+        session: Session = self.Session()
+        try:
+            cliente = session.query(Cliente).get(cliente_id)
+            if not cliente:
+                print(f"Error: Cliente con ID {cliente_id} no encontrado.")
+                return None
+
+            # Una sola consulta para todos los ítems del carrito
+            item_ids = {item_data['item_id'] for item_data in items_con_cantidad}
+            items_menu = {
+                item.id: item
+                for item in session.query(ItemMenu).filter(ItemMenu.id.in_(item_ids)).all()
+            } if item_ids else {}
+
+            nuevo_pedido = Pedido(
+                cliente_id=cliente.id,
+                direccion_delivery=direccion_delivery,
+                total=0.0,
+                metodo_pago=metodo_pago
+            )
+            total = 0.0
+            num_items = 0
+            for item_data in items_con_cantidad:
+                item_menu = items_menu.get(item_data['item_id'])
+                if not item_menu:
+                    print(f"Advertencia: Ítem de menú con ID {item_data['item_id']} no encontrado. Se omitirá.")
+                    continue
+                cantidad = item_data['cantidad']
+                nuevo_pedido.detalles.append(DetallePedido(
+                    item_menu_id=item_menu.id,
+                    cantidad=cantidad,
+                    precio_unitario=item_menu.precio # Usa el precio actual del ítem del menú
+                ))
+                total += item_menu.precio * cantidad
+                num_items += cantidad
+
+            if not nuevo_pedido.detalles:
+                print("Error: El pedido no contiene ítems válidos.")
+                return None
+
+            nuevo_pedido.total = total
+            session.add(nuevo_pedido)
+            session.flush() # Obtiene el ID del pedido para la descripción del ingreso (sin commit)
+
+            registro = RegistroFinanciero(
+                monto=total,
+                tipo='Ingreso',
+                descripcion=f"Venta de pedido #{nuevo_pedido.id} ({metodo_pago}) a {cliente.nombre}",
+                pedido=nuevo_pedido
+            )
+            session.add(registro)
+            session.flush()
+
+            # Métricas del cliente (RFM) actualizadas en la misma transacción
+            MetricasClienteService.registrar_pedido(session, cliente.id, total, nuevo_pedido.fecha_hora)
+
+            # Se arma el recibo antes del commit para no tener que recargar las instancias después
+            recibo = ReciboPedido(
+                pedido_id=nuevo_pedido.id,
+                registro_id=registro.id,
+                cliente_id=cliente.id,
+                cliente_nombre=cliente.nombre,
+                total=total,
+                metodo_pago=metodo_pago,
+                fecha_hora=nuevo_pedido.fecha_hora,
+                num_items=num_items
+            )
+            bus_invalidacion.notificar(session, _estadisticas_cache.clave) # Se entrega a otros procesos al confirmar
+            session.commit()
+            _estadisticas_cache.invalidate()
+            return recibo
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"Error al registrar el pedido: {e}")
+            return None
+        finally:
+            session.close()
+
     def get_pedido_by_id(self, pedido_id: int):
         """Obtiene un pedido por su ID, cargando también el cliente y los detalles."""
         session: Session = self.Session()
@@ -91,11 +212,20 @@ class PedidoService(BaseService):
 
     def update_pedido(self, pedido_instance: Pedido):
         """Actualiza un pedido existente."""
-        return self.update(pedido_instance)
+        result = self.update(pedido_instance)
+        self._invalidar_estadisticas()
+        return result
 
     def delete_pedido(self, pedido_instance: Pedido):
         """Elimina un pedido y sus detalles asociados."""
-        return self.delete(pedido_instance)
+        result = self.delete(pedido_instance)
+        self._invalidar_estadisticas()
+        return result
+
+    def _invalidar_estadisticas(self):
+        # BaseService.update/delete ya hicieron commit: se notifica en una transacción aparte
+        _estadisticas_cache.invalidate()
+        bus_invalidacion.publicar(self.Session, _estadisticas_cache.clave)
 
     def search_pedidos(self, cliente_id: int = None, estado: str = None,
                        fecha_inicio: date = None, fecha_fin: date = None) -> list[Pedido]:
@@ -129,6 +259,88 @@ class PedidoService(BaseService):
         finally:
             session.close()
 
+    # Columnas por las que se puede ordenar la tabla de pedidos (clave usada por la vista -> columna)
+    COLUMNAS_ORDEN = {
+        'id': Pedido.id,
+        'fecha': Pedido.fecha_hora,
+        'total': Pedido.total,
+        'estado': Pedido.estado,
+        'metodo_pago': Pedido.metodo_pago,
+    }
+
+    def get_pedidos_page(self, offset: int, limit: int, sort_by: str = 'fecha', descending: bool = True,
+                         filtro: str = None, with_total: bool = True):
+        """
+        Obtiene una página de pedidos (con su cliente) ordenada y filtrada en la base de datos.
+
+        Args:
+            offset (int): Cantidad de pedidos a saltar.
+            limit (int): Cantidad máxima de pedidos a devolver.
+            sort_by (str, optional): Clave de COLUMNAS_ORDEN. Defaults to 'fecha'.
+            descending (bool, optional): Orden descendente. Defaults to True.
+            filtro (str, optional): Número de pedido, o texto a buscar en estado, método de pago,
+                                    dirección o nombre del cliente. Defaults to None.
+            with_total (bool, optional): Si también se cuenta el total de pedidos filtrados. Defaults to True.
+
+        Returns:
+            tuple[list[Pedido], int]: Los pedidos de la página y el total (None si with_total es False).
+        """
+        filters = []
+        filtro = (filtro or "").strip()
+        if filtro.isdigit():
+            filters.append(Pedido.id == int(filtro))
+        elif filtro:
+            patron = f'%{filtro}%'
+            filters.append(or_(
+                Pedido.estado.ilike(patron),
+                Pedido.metodo_pago.ilike(patron),
+                Pedido.direccion_delivery.ilike(patron),
+                Pedido.cliente.has(Cliente.nombre.ilike(patron))
+            ))
+        return self.get_page(Pedido, offset, limit,
+                             order_by=self.COLUMNAS_ORDEN.get(sort_by, Pedido.fecha_hora),
+                             descending=descending, filters=filters,
+                             options=[joinedload(Pedido.cliente)], with_total=with_total)
+
+    def get_pedidos_changed_since(self, desde: datetime, limit: int = 200):
+        """
+        Obtiene los pedidos modificados después de 'desde' (con su cliente), para refrescar
+        la tabla de pedidos sin volver a cargarla. Ver BaseService.changed_since.
+
+        Returns:
+            tuple[list[Pedido], datetime]: Los pedidos modificados y el nuevo cursor.
+        """
+        return self.changed_since(Pedido, desde, limit, options=[joinedload(Pedido.cliente)])
+
+    def count_pedidos_por_estado(self):
+        """
+        Cuenta los pedidos agrupados por estado (en caché hasta la próxima escritura de pedidos).
+        Retorna un diccionario compartido: no debe modificarse.
+
+        Returns:
+            dict: {estado: cantidad} (los estados sin pedidos no aparecen).
+            None: Si ocurre un error.
+        """
+        return _estadisticas_cache.get(self._contar_pedidos_por_estado)
+
+    def _contar_pedidos_por_estado(self):
+        """
+        Cuenta los pedidos agrupados por estado con una sola consulta.
+
+        Returns:
+            dict: {estado: cantidad} (los estados sin pedidos no aparecen).
+            None: Si ocurre un error.
+        """
+        session: Session = self.Session()
+        try:
+            filas = session.query(Pedido.estado, func.count(Pedido.id)).group_by(Pedido.estado).all()
+            return {estado: cantidad for estado, cantidad in filas}
+        except SQLAlchemyError as e:
+            print(f"Error al contar pedidos por estado: {e}")
+            return None
+        finally:
+            session.close()
+
     def get_all_pedidos(self):
         """Obtiene todos los pedidos, cargando también el cliente asociado."""
         session: Session = self.Session()
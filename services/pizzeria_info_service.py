@@ -3,6 +3,13 @@ from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from models.models import InformacionPizzeria # Asegúrate que models.py esté en el directorio 'core'
 from services.base_service import BaseService
+from services.cache import WriteThroughCache, bus_invalidacion
+
+# Copia de la información de la pizzería compartida por todo el proceso: es una sola fila que casi
+# nunca cambia, así que las vistas la leen de memoria. Este servicio la actualiza al escribir y los
+# demás procesos la invalidan al recibir la notificación correspondiente.
+_info_cache = WriteThroughCache("informacion_pizzeria")
+bus_invalidacion.suscribir(_info_cache.clave, _info_cache.invalidate)
 
 class PizzeriaInfoService(BaseService):
     """
@@ -14,13 +21,18 @@ class PizzeriaInfoService(BaseService):
 
     def get_pizzeria_info(self):
         """
-        Obtiene la única instancia de información de la pizzería.
-        Si no existe, se puede inicializar.
+        Obtiene la única instancia de información de la pizzería desde la caché del proceso
+        (solo consulta la base de datos la primera vez o tras una invalidación).
+        La instancia retornada es compartida: debe tratarse como de solo lectura.
 
         Returns:
             InformacionPizzeria: La instancia de información de la pizzería.
-            None: Si ocurre un error.
+            None: Si no existe o si ocurre un error.
         """
+        return _info_cache.get(self._cargar_pizzeria_info)
+
+    def _cargar_pizzeria_info(self):
+        """Lee la información de la pizzería de la base de datos."""
         session: Session = self.Session()
         try:
             info = session.query(InformacionPizzeria).first()
@@ -104,8 +116,10 @@ class PizzeriaInfoService(BaseService):
                 info.whatsapp_chat_link = whatsapp_chat_link
 
             session.add(info) # Reasocia el objeto con la sesión (aunque ya esté si fue cargado aquí)
+            bus_invalidacion.notificar(session, _info_cache.clave) # Se entrega a otros procesos al confirmar
             session.commit()
             session.refresh(info)
+            _info_cache.set(info) # Write-through: este proceso no necesita volver a consultar
             return info
         except SQLAlchemyError as e:
             session.rollback() # Revierte los cambios si hay un error
@@ -149,8 +163,10 @@ class PizzeriaInfoService(BaseService):
                 whatsapp_chat_link=whatsapp_chat_link
             )
             session.add(new_info)
+            bus_invalidacion.notificar(session, _info_cache.clave)
             session.commit()
             session.refresh(new_info)
+            _info_cache.set(new_info)
             return new_info
         except SQLAlchemyError as e:
             session.rollback()
@@ -172,7 +188,9 @@ class PizzeriaInfoService(BaseService):
         try:
             # Reasociar la instancia con la sesión actual
             session.delete(session.merge(info_instance))
+            bus_invalidacion.notificar(session, _info_cache.clave)
             session.commit()
+            _info_cache.invalidate()
             return True
         except SQLAlchemyError as e:
             session.rollback()
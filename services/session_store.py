@@ -0,0 +1,246 @@
+# services/session_store.py
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.exc import SQLAlchemyError
+from models.models import SesionAdmin # Asegúrate que models.py esté en el directorio 'core'
+from core.config import settings
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+@dataclass
+class SesionActiva:
+    """Datos de una sesión de administrador válida."""
+    token: str
+    administrador_id: int
+    usuario: str
+    expira_en: float # Marca de tiempo (time.time()) de expiración
+
+class InMemorySessionStore:
+    """
+    Almacén de sesiones en memoria para un solo proceso.
+    Validar un token es una búsqueda en un diccionario (O(1)); la expiración es deslizante
+    (cada validación renueva el TTL), el número de sesiones está acotado (LRU) y las sesiones
+    expiradas se limpian periódicamente.
+    """
+    def __init__(self, ttl: int, max_sesiones: int = 1000, intervalo_limpieza: int = 60):
+        """
+        Args:
+            ttl (int): Segundos de inactividad tras los que expira una sesión.
+            max_sesiones (int, optional): Máximo de sesiones activas. Defaults to 1000.
+            intervalo_limpieza (int, optional): Segundos entre limpiezas de sesiones expiradas. Defaults to 60.
+        """
+        self.ttl = ttl
+        self.max_sesiones = max_sesiones
+        self.intervalo_limpieza = intervalo_limpieza
+        self._sesiones = OrderedDict() # token -> SesionActiva, de la menos a la más usada
+        self._lock = threading.Lock()
+        self._ultima_limpieza = time.monotonic()
+
+    def crear(self, administrador_id: int, usuario: str) -> str:
+        """
+        Crea una sesión nueva para el administrador.
+
+        Returns:
+            str: El token de la sesión.
+        """
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sesiones[token] = SesionActiva(token, administrador_id, usuario, time.time() + self.ttl)
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False) # Descarta la sesión usada hace más tiempo
+        self._limpiar_si_corresponde()
+        return token
+
+    def validar(self, token: str):
+        """
+        Valida un token y renueva su expiración.
+
+        Returns:
+            SesionActiva: La sesión, si el token existe y no ha expirado.
+            None: Si el token no es válido o expiró.
+        """
+        if not token:
+            return None
+        ahora = time.time()
+        with self._lock:
+            sesion = self._sesiones.get(token)
+            if sesion is None:
+                return None
+            if sesion.expira_en <= ahora:
+                del self._sesiones[token]
+                return None
+            sesion.expira_en = ahora + self.ttl
+            self._sesiones.move_to_end(token)
+        self._limpiar_si_corresponde()
+        return sesion
+
+    def revocar(self, token: str):
+        """Elimina una sesión (ej. al cerrar sesión)."""
+        if not token:
+            return
+        with self._lock:
+            self._sesiones.pop(token, None)
+
+    def limpiar_expiradas(self) -> int:
+        """
+        Elimina las sesiones expiradas.
+
+        Returns:
+            int: Cantidad de sesiones eliminadas.
+        """
+        ahora = time.time()
+        with self._lock:
+            expiradas = [token for token, sesion in self._sesiones.items() if sesion.expira_en <= ahora]
+            for token in expiradas:
+                del self._sesiones[token]
+            self._ultima_limpieza = time.monotonic()
+        if expiradas:
+            logger.debug("Limpieza de sesiones: %s sesiones expiradas eliminadas.", len(expiradas))
+        return len(expiradas)
+
+    def _limpiar_si_corresponde(self):
+        # La limpieza se amortiza entre las operaciones en lugar de usar un hilo dedicado
+        if time.monotonic() - self._ultima_limpieza >= self.intervalo_limpieza:
+            self.limpiar_expiradas()
+
+class PostgresSessionStore:
+    """
+    Almacén de sesiones en la tabla sesiones_admin, compartido entre varios procesos.
+    Validar un token es una búsqueda por clave primaria; la expiración solo se escribe
+    cuando ha transcurrido más de la mitad del TTL, para no hacer un UPDATE en cada navegación.
+    """
+    def __init__(self, Session: sessionmaker, ttl: int, intervalo_limpieza: int = 60):
+        """
+        Args:
+            Session (sessionmaker): Fábrica de sesiones de SQLAlchemy.
+            ttl (int): Segundos de inactividad tras los que expira una sesión.
+            intervalo_limpieza (int, optional): Segundos entre limpiezas de sesiones expiradas. Defaults to 60.
+        """
+        self.Session = Session
+        self.ttl = ttl
+        self.intervalo_limpieza = intervalo_limpieza
+        self._ultima_limpieza = time.monotonic()
+
+    def crear(self, administrador_id: int, usuario: str) -> str:
+        """
+        Crea una sesión nueva para el administrador.
+
+        Returns:
+            str: El token de la sesión.
+            None: Si ocurre un error.
+        """
+        token = secrets.token_urlsafe(32)
+        session: Session = self.Session()
+        try:
+            session.add(SesionAdmin(
+                token=token,
+                administrador_id=administrador_id,
+                usuario=usuario,
+                expira_en=datetime.now() + timedelta(seconds=self.ttl)
+            ))
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error("Error al crear la sesión del administrador '%s': %s", usuario, e)
+            return None
+        finally:
+            session.close()
+        self._limpiar_si_corresponde()
+        return token
+
+    def validar(self, token: str):
+        """
+        Valida un token y renueva su expiración si es necesario.
+
+        Returns:
+            SesionActiva: La sesión, si el token existe y no ha expirado.
+            None: Si el token no es válido, expiró o hubo un error.
+        """
+        if not token:
+            return None
+        ahora = datetime.now()
+        session: Session = self.Session()
+        try:
+            sesion = session.get(SesionAdmin, token)
+            if sesion is None or sesion.expira_en <= ahora:
+                return None
+            if (sesion.expira_en - ahora).total_seconds() < self.ttl / 2:
+                sesion.expira_en = ahora + timedelta(seconds=self.ttl)
+                session.commit()
+            return SesionActiva(sesion.token, sesion.administrador_id, sesion.usuario, sesion.expira_en.timestamp())
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error("Error al validar la sesión de administrador: %s", e)
+            return None
+        finally:
+            session.close()
+
+    def revocar(self, token: str):
+        """Elimina una sesión (ej. al cerrar sesión)."""
+        if not token:
+            return
+        session: Session = self.Session()
+        try:
+            session.query(SesionAdmin).filter_by(token=token).delete()
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error("Error al revocar la sesión de administrador: %s", e)
+        finally:
+            session.close()
+
+    def limpiar_expiradas(self) -> int:
+        """
+        Elimina las sesiones expiradas (usa el índice sobre expira_en).
+
+        Returns:
+            int: Cantidad de sesiones eliminadas.
+        """
+        session: Session = self.Session()
+        try:
+            eliminadas = session.query(SesionAdmin).filter(SesionAdmin.expira_en <= datetime.now()).delete()
+            session.commit()
+            if eliminadas:
+                logger.debug("Limpieza de sesiones: %s sesiones expiradas eliminadas.", eliminadas)
+            return eliminadas
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error("Error al limpiar sesiones expiradas: %s", e)
+            return 0
+        finally:
+            session.close()
+            self._ultima_limpieza = time.monotonic()
+
+    def _limpiar_si_corresponde(self):
+        if time.monotonic() - self._ultima_limpieza >= self.intervalo_limpieza:
+            self.limpiar_expiradas()
+
+# Almacén en memoria compartido por todas las sesiones de Flet del proceso
+_store_memoria = None
+_store_lock = threading.Lock()
+
+def crear_session_store(Session: sessionmaker):
+    """
+    Obtiene el almacén de sesiones configurado en settings.SESSION_BACKEND.
+
+    Args:
+        Session (sessionmaker): Fábrica de sesiones de SQLAlchemy (usada por el almacén en PostgreSQL).
+
+    Returns:
+        InMemorySessionStore | PostgresSessionStore: El almacén de sesiones.
+    """
+    global _store_memoria
+    if settings.SESSION_BACKEND == "postgres":
+        return PostgresSessionStore(Session, settings.SESSION_TIMEOUT, settings.SESSION_SWEEP_INTERVAL)
+    with _store_lock:
+        if _store_memoria is None:
+            _store_memoria = InMemorySessionStore(
+                settings.SESSION_TIMEOUT, settings.SESSION_MAX_ACTIVAS, settings.SESSION_SWEEP_INTERVAL
+            )
+        return _store_memoria
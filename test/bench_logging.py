@@ -0,0 +1,100 @@
+# bench_logging.py
+# Benchmark del costo del logging por clic: ejecuta los manejadores de MainView de añadir y quitar
+# ítems del carrito (cada clic escribe un log INFO y varios DEBUG) sobre una página simulada y mide
+# el tiempo de CPU del hilo del manejador por clic con tres configuraciones:
+#   - desactivado: logging.disable(); es la referencia para calcular el costo del logging.
+#   - sincrono: FileHandler + StreamHandler en el hilo del manejador (configuración anterior de main.py).
+#   - cola: QueueHandler + QueueListener con formateo y escritura en segundo plano (core/logging_config.py).
+# Se alternan varias rondas y se toma la mejor de cada modo para reducir el ruido. La salida de consola
+# se descarta (os.devnull). El tiempo de CPU del hilo del manejador es lo que espera la interfaz; el
+# trabajo del hilo de escritura no se cuenta (con varios núcleos corre en paralelo).
+# Necesita la base de datos configurada en .env (carga el catálogo del menú como main.py).
+# Uso: python test/bench_logging.py [--clics 2000] [--rondas 15] [--nivel INFO]
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# Añadir el directorio raíz del proyecto al PATH de Python
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, os.pardir)) # Sube un nivel para llegar a pizzeria_web
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from bench_workers import PaginaSimulada
+
+MODOS = ("desactivado", "sincrono", "cola")
+
+def configurar(modo: str, nivel: str, archivo: str):
+    """Deja el logging del proceso en la configuración del modo indicado."""
+    from core.logging_config import configurar_logging, detener_logging, FORMATO_TEXTO
+    detener_logging()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+        handler.close()
+    logging.disable(logging.CRITICAL if modo == "desactivado" else logging.NOTSET)
+    if modo == "sincrono":
+        # Configuración anterior: los handlers escriben en el hilo que registra el log
+        formato = logging.Formatter(FORMATO_TEXTO)
+        for handler in (logging.FileHandler(archivo), logging.StreamHandler()):
+            handler.setFormatter(formato)
+            raiz.addHandler(handler)
+        raiz.setLevel(nivel)
+    elif modo == "cola":
+        configurar_logging(nivel, archivo)
+
+def medir_clics(vista, items: list, clics: int) -> float:
+    """
+    Returns:
+        float: Microsegundos de CPU del hilo del manejador por clic.
+    """
+    inicio = time.thread_time()
+    for i in range(clics):
+        item = items[(i // 2) % len(items)]
+        if i % 2 == 0:
+            vista._add_to_order(item)
+        else:
+            vista._remove_from_order(item.id)
+    return (time.thread_time() - inicio) / clics * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Costo del logging por clic: handlers síncronos contra la cola.")
+    parser.add_argument("--clics", type=int, default=2000, help="Clics simulados por medición.")
+    parser.add_argument("--rondas", type=int, default=15, help="Rondas alternando los modos (se toma la mejor).")
+    parser.add_argument("--nivel", default="INFO", help="Nivel de log durante la medición.")
+    args = parser.parse_args()
+
+    import main # Configura el logging y crea los recursos del proceso como la aplicación
+    recursos = main.inicializar_proceso()
+    from views.main_view import MainView
+    sys.stderr = open(os.devnull, "w") # Los StreamHandler creados a partir de aquí escriben en os.devnull
+
+    vista = MainView(PaginaSimulada("bench-logging"), recursos.administrador_service, lambda: None,
+                     recursos.pizzeria_info_service, recursos.menu_service, recursos.cliente_service,
+                     recursos.pedido_service, recursos.financiero_service)
+    vista._on_navigation_rail_change(1) # Sección del menú: carga los ítems y crea las tarjetas
+    items = list(vista.tab_items_list[0][0]) if vista.tab_items_list else []
+    if not items:
+        sys.exit("El menú no tiene ítems disponibles: no hay clics que medir.")
+
+    mejores = {modo: float("inf") for modo in MODOS}
+    with tempfile.TemporaryDirectory() as directorio:
+        for _ in range(args.rondas):
+            for modo in MODOS:
+                configurar(modo, args.nivel, os.path.join(directorio, f"{modo}.log"))
+                mejores[modo] = min(mejores[modo], medir_clics(vista, items, args.clics))
+        configurar("desactivado", args.nivel, "") # Vacía la cola y cierra los archivos antes de borrarlos
+
+    base = mejores["desactivado"]
+    print(f"Nivel: {args.nivel} | Clics por medición: {args.clics} | Rondas: {args.rondas}")
+    for modo in MODOS:
+        print(f"  {modo:<11} {mejores[modo]:>7.1f} µs por clic (logging: {mejores[modo] - base:>5.1f} µs)")
+    costo_sincrono = mejores["sincrono"] - base
+    costo_cola = mejores["cola"] - base
+    if costo_sincrono > 0:
+        print(f"Reducción del costo del logging por clic: {costo_sincrono - costo_cola:.1f} µs "
+              f"({(1 - costo_cola / costo_sincrono) * 100:.0f}%)")
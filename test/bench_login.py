@@ -0,0 +1,74 @@
+# bench_login.py
+# Benchmark de verificación de contraseñas: mide logins por segundo (y por núcleo) con el costo
+# de bcrypt configurado y el pool acotado de AdministradorService, a través de autenticar().
+# Usa una base SQLite temporal con un administrador por sesión simulada (cada una desde su propia IP,
+# para que el límite de intentos no intervenga).
+# Uso: python test/bench_login.py [--intentos 40] [--rondas 12]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Añadir el directorio raíz del proyecto al PATH de Python
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, os.pardir)) # Sube un nivel para llegar a pizzeria_web
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from sqlalchemy.orm import sessionmaker
+
+from core.base_datos import crear_engine
+from core.config import settings
+from models.models import Administrador, Base
+from services.administrador_service import AdministradorService
+
+def medir_logins(intentos: int, rondas: int):
+    """
+    Autentica 'intentos' administradores de forma concurrente (cada verificación pasa por el pool
+    de bcrypt) e imprime el rendimiento total y por núcleo.
+
+    Args:
+        intentos (int): Cantidad de verificaciones a realizar.
+        rondas (int): Costo de bcrypt del hash de prueba.
+    """
+    settings.BCRYPT_ROUNDS = rondas # Con el mismo costo que el hash de prueba no hay rehash tras el login
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = crear_engine(f"sqlite:///{os.path.join(directorio, 'bench_login.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        servicio = AdministradorService(Session)
+
+        # Un administrador por sesión simulada, todos con el mismo hash (se calcula una sola vez)
+        hashed = servicio.hash_password("contraseña-de-prueba")
+        with Session() as session:
+            session.add_all(Administrador(usuario=f"bench{i}", contrasena_hash=hashed) for i in range(intentos))
+            session.commit()
+
+        # Simula 'intentos' sesiones de Flet que intentan iniciar sesión a la vez
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=intentos) as sesiones:
+            resultados = list(sesiones.map(
+                lambda i: servicio.autenticar(f"bench{i}", "contraseña-de-prueba", ip=f"10.0.{i // 256}.{i % 256}"),
+                range(intentos)
+            ))
+        duracion = time.perf_counter() - inicio
+        engine.dispose()
+
+    nucleos = os.cpu_count() or 1
+    verificados = sum(1 for r in resultados if r.admin)
+    rechazados = sum(1 for r in resultados if r.bloqueado)
+    por_segundo = verificados / duracion if duracion else 0.0
+    print(f"Costo bcrypt: {rondas} | Hilos del pool: {settings.LOGIN_WORKERS} | Núcleos: {nucleos}")
+    print(f"Verificados: {verificados} | Rechazados por saturación: {rechazados} | Tiempo: {duracion:.2f} s")
+    print(f"Logins/s: {por_segundo:.2f} | Logins/s por núcleo: {por_segundo / nucleos:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de logins por segundo por núcleo.")
+    parser.add_argument("--intentos", type=int, default=settings.LOGIN_WORKERS + settings.LOGIN_MAX_PENDIENTES,
+                        help="Verificaciones concurrentes a realizar.")
+    parser.add_argument("--rondas", type=int, default=settings.BCRYPT_ROUNDS, help="Costo de bcrypt.")
+    args = parser.parse_args()
+    medir_logins(args.intentos, args.rondas)
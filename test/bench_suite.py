@@ -0,0 +1,274 @@
+# bench_suite.py
+# Suite de benchmarks de las operaciones críticas (registrar pedidos, cargar el menú, estadísticas del
+# dashboard, totales de finanzas, búsqueda de clientes y el render de la sección del menú con una página
+# simulada), comparada con baselines guardadas: termina con código 1 si alguna operación es más lenta
+# que su baseline por encima del umbral (ej. para usarla en CI) y con código 2 si alguna no tiene
+# baseline para el motor usado (se guardan en la máquina de referencia con --guardar-baseline).
+# Por defecto usa una base SQLite temporal (modo de un solo nodo, ver core/base_datos.py); con --db se
+# mide contra un PostgreSQL local. La base se crea con los modelos, el menú se carga desde core/backup1.sql (bloques COPY)
+# y se añaden clientes, pedidos y registros financieros sintéticos deterministas con test/generar_datos.py.
+# Los benchmarks escriben datos (ej. add_pedido): con PostgreSQL usa una base de datos dedicada.
+# Las baselines se guardan por motor de base de datos (sqlite, postgresql) en --baselines.
+# Uso: python test/bench_suite.py [--db postgresql://...] [--repeticiones 30] [--umbral 0.20]
+#                                [--guardar-baseline] [--solo add_pedido menu.catalogo]
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Añadir el directorio raíz del proyecto al PATH de Python
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, os.pardir)) # Sube un nivel para llegar a pizzeria_web
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.base_datos import crear_engine
+from models.models import Base, Cliente
+from bench_workers import PaginaSimulada
+from generar_datos import DOMINIO_SINTETICO, ParametrosDatos, poblar_base
+
+BASELINES_POR_DEFECTO = os.path.join(script_dir, "bench_baselines.json")
+
+# Los datos sintéticos se fechan respecto a un día fijo para que las consultas por rango sean reproducibles
+FECHA_REFERENCIA = date(2025, 1, 31)
+
+# Índices de la búsqueda de clientes que create_all no crea (ver core/cambios.sql)
+INDICES_TRGM = (
+    "CREATE INDEX IF NOT EXISTS ix_clientes_nombre_trgm ON clientes USING gin (nombre gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_clientes_email_trgm ON clientes USING gin (email gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_clientes_telefono_trgm ON clientes USING gin (telefono gin_trgm_ops)",
+)
+
+# --- Registro de benchmarks ---
+
+BENCHMARKS = [] # [(nombre, funcion, requiere)] en el orden de ejecución
+
+def benchmark(nombre: str, requiere: str = None):
+    """
+    Registra una función como benchmark. La función recibe el contexto (servicios y datos de la base)
+    y devuelve la operación a medir (sin argumentos); así la preparación no se cuenta en el tiempo.
+
+    Args:
+        nombre (str): Nombre del benchmark (clave de la baseline).
+        requiere (str, optional): Capacidad de la base necesaria (ej. "busqueda_clientes"); si falta
+                                  el benchmark se omite. Defaults to None.
+    """
+    def decorador(funcion):
+        BENCHMARKS.append((nombre, funcion, requiere))
+        return funcion
+    return decorador
+
+# --- Preparación de la base de datos ---
+
+def _preparar_pg_trgm(engine) -> bool:
+    """Instala pg_trgm y los índices de la búsqueda de clientes. Devuelve False si la extensión no está disponible."""
+    try:
+        with engine.begin() as conexion:
+            conexion.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for sentencia in INDICES_TRGM:
+                conexion.execute(text(sentencia))
+        return True
+    except SQLAlchemyError as e:
+        print(f"pg_trgm no disponible, se omite la búsqueda de clientes: {str(e).splitlines()[0]}")
+        return False
+
+def preparar_base(url: str, clientes: int, pedidos: int):
+    """
+    Crea las tablas y carga los datos que falten (el menú y los datos sintéticos se cargan una sola vez).
+
+    Returns:
+        tuple[Engine, sessionmaker, set]: El motor, la fábrica de sesiones y las capacidades de la base.
+    """
+    engine = crear_engine(url) # Con SQLite, la misma configuración (WAL y pragmas) que la aplicación
+    Base.metadata.create_all(engine)
+    capacidades = {engine.dialect.name}
+    if engine.dialect.name != "postgresql" or _preparar_pg_trgm(engine):
+        capacidades.add("busqueda_clientes")
+    with engine.connect() as conexion:
+        sinteticos = conexion.execute(
+            select(func.count(Cliente.id)).where(Cliente.email.like(f"%@{DOMINIO_SINTETICO}"))).scalar()
+    if not sinteticos: # Menú de core/backup1.sql y datos de test/generar_datos.py, con semilla y fechas fijas
+        poblar_base(engine, ParametrosDatos(clientes=clientes, pedidos=pedidos, dias=90, fecha_fin=FECHA_REFERENCIA))
+    return engine, sessionmaker(bind=engine), capacidades
+
+class ContextoBenchmark:
+    """Servicios y datos de referencia que usan los benchmarks."""
+    def __init__(self, Session):
+        from services.cliente_service import ClienteService
+        from services.menu_service import MenuService
+        from services.pedido_service import PedidoService
+        from services.financiero_service import FinancieroService
+        from services.pizzeria_info_service import PizzeriaInfoService
+        from services.administrador_service import AdministradorService
+
+        self.Session = Session
+        self.cliente_service = ClienteService(Session)
+        self.menu_service = MenuService(Session)
+        self.pedido_service = PedidoService(Session)
+        self.financiero_service = FinancieroService(Session)
+        self.pizzeria_info_service = PizzeriaInfoService(Session)
+        self.administrador_service = AdministradorService(Session)
+        with Session() as session:
+            self.cliente_id = session.query(func.min(Cliente.id)).filter(
+                Cliente.email.like(f"%@{DOMINIO_SINTETICO}")).scalar()
+        catalogo = self.menu_service.get_catalogo()
+        self.items_carrito = [{"item_id": item.id, "cantidad": 1 + i % 2} for i, item in enumerate(catalogo.items[:3])]
+
+# --- Benchmarks ---
+
+@benchmark("pedido.add_pedido")
+def bench_add_pedido(ctx):
+    return lambda: ctx.pedido_service.add_pedido(ctx.cliente_id, "Calle 1", ctx.items_carrito, 10.0, "Efectivo")
+
+@benchmark("pedido.place_order")
+def bench_place_order(ctx):
+    return lambda: ctx.pedido_service.place_order(ctx.cliente_id, "Calle 1", ctx.items_carrito, "Efectivo")
+
+@benchmark("menu.get_all_items_menu")
+def bench_items_menu(ctx):
+    return ctx.menu_service.get_all_items_menu
+
+@benchmark("menu.catalogo_sin_cache")
+def bench_catalogo(ctx):
+    from services.menu_service import _catalogo_cache
+    def cargar():
+        _catalogo_cache.invalidate() # Solo en este proceso: se mide la carga desde la base de datos
+        return ctx.menu_service.get_catalogo()
+    return cargar
+
+@benchmark("dashboard.estadisticas")
+def bench_dashboard(ctx):
+    def estadisticas(): # Los widgets del dashboard sin las cachés de estadísticas
+        return ctx.cliente_service.count_clientes(), ctx.pedido_service._contar_pedidos_por_estado()
+    return estadisticas
+
+@benchmark("finanzas.totales_por_tipo")
+def bench_totales(ctx):
+    return lambda: ctx.financiero_service.get_totales_por_tipo(FECHA_REFERENCIA - timedelta(days=29), FECHA_REFERENCIA)
+
+@benchmark("finanzas.ingresos_por_dia")
+def bench_ingresos_por_dia(ctx):
+    return lambda: ctx.financiero_service.get_ingresos_por_dia(FECHA_REFERENCIA - timedelta(days=6), FECHA_REFERENCIA)
+
+@benchmark("clientes.search_clientes", requiere="busqueda_clientes") # pg_trgm en PostgreSQL, LIKE en SQLite
+def bench_busqueda_clientes(ctx):
+    consultas = ("María", "gonzalez", "torres12", "+584127", "Altamira")
+    contador = iter(range(10 ** 9))
+    return lambda: ctx.cliente_service.search_clientes(consultas[next(contador) % len(consultas)])
+
+@benchmark("vista.load_menu_section")
+def bench_load_menu_section(ctx):
+    from views.main_view import MainView
+    vista = MainView(PaginaSimulada("bench-suite"), ctx.administrador_service, lambda: None,
+                     ctx.pizzeria_info_service, ctx.menu_service, ctx.cliente_service,
+                     ctx.pedido_service, ctx.financiero_service)
+    ctx.menu_service.get_catalogo() # Catálogo en caché como en una sesión normal: se mide la construcción de controles
+    return vista._load_menu_section
+
+# --- Medición y comparación ---
+
+def medir(operacion, repeticiones: int) -> dict:
+    """
+    Ejecuta la operación una vez para calentar y luego 'repeticiones' veces.
+
+    Returns:
+        dict: {'mediana_ms': float, 'min_ms': float}.
+    """
+    operacion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        operacion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {"mediana_ms": statistics.median(tiempos), "min_ms": min(tiempos)}
+
+def cargar_baselines(ruta: str) -> dict:
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+def guardar_baselines(ruta: str, baselines: dict):
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(baselines, archivo, indent=2, sort_keys=True, ensure_ascii=False)
+        archivo.write("\n")
+
+def comparar(resultados: dict, baseline: dict, umbral: float) -> list[str]:
+    """
+    Imprime cada resultado junto a su baseline (se compara la mediana).
+
+    Returns:
+        tuple[list[str], list[str]]: Los benchmarks más lentos que su baseline por encima del umbral
+                                     y los que no tienen baseline.
+    """
+    regresiones, sin_baseline = [], []
+    print(f"{'Benchmark':<28} {'mediana ms':>11} {'mín ms':>9} {'baseline':>10} {'cambio':>8}")
+    for nombre, resultado in resultados.items():
+        referencia = baseline.get(nombre)
+        if referencia is None:
+            sin_baseline.append(nombre)
+            estado = "sin baseline"
+            print(f"{nombre:<28} {resultado['mediana_ms']:>11.3f} {resultado['min_ms']:>9.3f} {'-':>10} {'-':>8}  {estado}")
+            continue
+        cambio = resultado["mediana_ms"] / referencia["mediana_ms"] - 1
+        estado = "REGRESIÓN" if cambio > umbral else "ok"
+        if cambio > umbral:
+            regresiones.append(nombre)
+        print(f"{nombre:<28} {resultado['mediana_ms']:>11.3f} {resultado['min_ms']:>9.3f} "
+              f"{referencia['mediana_ms']:>10.3f} {cambio * 100:>+7.1f}%  {estado}")
+    return regresiones, sin_baseline
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de las operaciones críticas comparados con baselines.")
+    parser.add_argument("--db", help="URL de la base de datos (por defecto, SQLite temporal).")
+    parser.add_argument("--repeticiones", type=int, default=30, help="Ejecuciones medidas por benchmark.")
+    parser.add_argument("--umbral", type=float, default=0.20, help="Aumento de la mediana tolerado (0.20 = 20%%).")
+    parser.add_argument("--baselines", default=BASELINES_POR_DEFECTO, help="Archivo JSON de baselines.")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Guardar los resultados como baseline.")
+    parser.add_argument("--solo", nargs="+", help="Ejecutar solo estos benchmarks.")
+    parser.add_argument("--clientes", type=int, default=2000, help="Clientes sintéticos (solo al crear los datos).")
+    parser.add_argument("--pedidos", type=int, default=5000, help="Pedidos sintéticos (solo al crear los datos).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING) # Los logs INFO de los servicios alterarían las mediciones
+    with tempfile.TemporaryDirectory() as directorio:
+        url = args.db or f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+        engine, Session, capacidades = preparar_base(url, args.clientes, args.pedidos)
+        dialecto = engine.dialect.name
+        contexto = ContextoBenchmark(Session)
+
+        resultados = {}
+        for nombre, funcion, requiere in BENCHMARKS:
+            if args.solo and nombre not in args.solo:
+                continue
+            if requiere and requiere not in capacidades:
+                print(f"{nombre}: omitido (requiere {requiere})")
+                continue
+            resultados[nombre] = medir(funcion(contexto), args.repeticiones)
+        engine.dispose()
+
+    baselines = cargar_baselines(args.baselines)
+    print(f"Motor: {dialecto} | Repeticiones: {args.repeticiones} | Umbral: {args.umbral:.0%}")
+    regresiones, sin_baseline = comparar(resultados, baselines.get(dialecto, {}), args.umbral)
+    if args.guardar_baseline:
+        baselines.setdefault(dialecto, {}).update(resultados)
+        guardar_baselines(args.baselines, baselines)
+        print(f"Baseline de {dialecto} guardada en {args.baselines}")
+    elif regresiones:
+        print(f"Regresiones por encima del {args.umbral:.0%}: {', '.join(regresiones)}")
+        sys.exit(1)
+    elif sin_baseline:
+        # Sin baseline no hay comparación posible: no se da por bueno el resultado
+        print(f"Sin baseline de {dialecto} en {args.baselines}: {', '.join(sin_baseline)}. "
+              "Guárdala con --guardar-baseline.")
+        sys.exit(2)
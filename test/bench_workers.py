@@ -0,0 +1,116 @@
+# bench_workers.py
+# Benchmark de escalabilidad con varios procesos: simula sesiones de clientes (inicio, menú con todas
+# sus pestañas, añadir ítems al carrito y ver el pedido) repartidas entre N procesos worker con la misma
+# afinidad por IP que el balanceador (core.cluster.elegir_backend) y mide sesiones por segundo.
+# Cada worker inicializa sus recursos como main.py (motor, servicios y cachés), así que necesita
+# la base de datos configurada en .env. La página de Flet se simula (no se mide la red).
+# Uso: python test/bench_workers.py [--workers 1 2 4] [--sesiones 200] [--clientes 64]
+
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+# Añadir el directorio raíz del proyecto al PATH de Python
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, os.pardir)) # Sube un nivel para llegar a pizzeria_web
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from core.cluster import elegir_backend
+
+class PaginaSimulada:
+    """Lo mínimo de ft.Page que usan las vistas; update() no envía nada."""
+    route = "/"
+    client_ip = None
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.overlay = []
+        self.views = []
+
+    def update(self, *controls):
+        pass
+
+    def open(self, control):
+        pass
+
+    def go(self, route):
+        self.route = route
+
+def simular_sesion(recursos, MainView, session_id: str):
+    """Una sesión de cliente: inicio, menú (todas las pestañas), 3 ítems al carrito y el pedido."""
+    vista = MainView(PaginaSimulada(session_id), recursos.administrador_service, lambda: None,
+                     recursos.pizzeria_info_service, recursos.menu_service, recursos.cliente_service,
+                     recursos.pedido_service, recursos.financiero_service)
+    vista._on_navigation_rail_change(0)
+    vista._on_navigation_rail_change(1)
+    for indice in range(len(vista.tab_items_list)):
+        vista._get_tab_content(indice)
+    items = vista.tab_items_list[0][0] if vista.tab_items_list else ()
+    for item in list(items)[:3]:
+        vista._add_to_order(item)
+    vista._on_navigation_rail_change(2)
+
+def _worker(tareas, resultados):
+    import main # Configura el logging e inicializa el proceso igual que un worker real
+    logging.getLogger().setLevel(logging.WARNING)
+    recursos = main.inicializar_proceso()
+    from views.main_view import MainView
+    resultados.put("listo")
+    while True:
+        session_id = tareas.get()
+        if session_id is None:
+            break
+        simular_sesion(recursos, MainView, session_id)
+        resultados.put(1)
+
+def medir(num_workers: int, sesiones: int, clientes: int) -> float:
+    """
+    Ejecuta 'sesiones' sesiones de 'clientes' IPs distintas repartidas entre 'num_workers' procesos.
+
+    Returns:
+        float: Sesiones por segundo.
+    """
+    contexto = multiprocessing.get_context("spawn")
+    resultados = contexto.Queue()
+    colas = [contexto.Queue() for _ in range(num_workers)]
+    procesos = [contexto.Process(target=_worker, args=(cola, resultados), daemon=True) for cola in colas]
+    for proceso in procesos:
+        proceso.start()
+    for _ in procesos:
+        resultados.get() # Esperar a que todos terminen de inicializarse (no se mide el arranque)
+
+    inicio = time.perf_counter()
+    por_worker = [0] * num_workers
+    for i in range(sesiones):
+        ip = f"10.0.{(i % clientes) // 256}.{(i % clientes) % 256}"
+        indice = elegir_backend(ip, num_workers)
+        por_worker[indice] += 1
+        colas[indice].put(f"{ip}-{i}")
+    for _ in range(sesiones):
+        resultados.get()
+    duracion = time.perf_counter() - inicio
+
+    for cola in colas:
+        cola.put(None)
+    for proceso in procesos:
+        proceso.join()
+    por_segundo = sesiones / duracion if duracion else 0.0
+    print(f"Workers: {num_workers} | Sesiones: {sesiones} | Tiempo: {duracion:.2f} s | "
+          f"Sesiones/s: {por_segundo:.1f} | Reparto: {por_worker}")
+    return por_segundo
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de sesiones por segundo según la cantidad de workers.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Cantidades de workers a medir.")
+    parser.add_argument("--sesiones", type=int, default=200, help="Sesiones simuladas por medición.")
+    parser.add_argument("--clientes", type=int, default=64, help="IPs de cliente distintas (afinidad del balanceador).")
+    args = parser.parse_args()
+    base = None
+    for num_workers in args.workers:
+        por_segundo = medir(num_workers, args.sesiones, args.clientes)
+        base = base or por_segundo
+        print(f"  Escalado respecto a {args.workers[0]} worker(s): {por_segundo / base:.2f}x")
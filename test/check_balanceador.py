@@ -0,0 +1,120 @@
+# check_balanceador.py
+# Comprobación de regresión del balanceador (core/cluster.py): ningún cliente puede hacer llegar al worker
+# una X-Forwarded-For falsificada (el límite de intentos de login por IP usa page.client_ip). Levanta un
+# worker HTTP simulado con keep-alive (responde 200 a las peticiones y 101 o 400 a los handshakes de websocket)
+# detrás de un BalanceadorSticky y envía secuencias de peticiones por una misma conexión. No necesita base de datos.
+# Termina con código 1 si alguna comprobación falla.
+# Uso: python test/check_balanceador.py
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+
+# Añadir el directorio raíz del proyecto al PATH de Python
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, os.pardir)) # Sube un nivel para llegar a pizzeria_web
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from core.cluster import BalanceadorSticky
+
+IP_FALSA = "6.6.6.6"
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _handshake(extra: str = "") -> bytes:
+    return (f"GET /ws HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n{extra}\r\n").encode("latin-1")
+
+class WorkerSimulado:
+    """Servidor HTTP/1.1 con keep-alive que guarda las cabeceras recibidas."""
+    def __init__(self, acepta_websocket: bool):
+        self.acepta_websocket = acepta_websocket
+        self.cabeceras = []
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                cabecera = await reader.readuntil(b"\r\n\r\n")
+                self.cabeceras.append(cabecera)
+                minusculas = cabecera.lower()
+                if b"upgrade: websocket" in minusculas and self.acepta_websocket:
+                    writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n\r\n")
+                    await writer.drain()
+                    while datos := await reader.read(1024): # Eco de lo que llegue por el websocket
+                        writer.write(datos)
+                        await writer.drain()
+                    break
+                estado = b"400 Bad Request" if b"upgrade: websocket" in minusculas else b"200 OK"
+                writer.write(b"HTTP/1.1 " + estado + b"\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+                await writer.drain()
+                if b"connection: close" in minusculas:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def ips_recibidas(self) -> list[str]:
+        return [linea.split(b":", 1)[1].strip().decode("latin-1")
+                for cabecera in self.cabeceras for linea in cabecera.split(b"\r\n")
+                if linea.lower().startswith(b"x-forwarded-for:")]
+
+async def _enviar(puerto: int, peticiones: list[bytes]) -> bytes:
+    """Envía las peticiones por una sola conexión y devuelve todo lo recibido hasta que se cierra."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", puerto)
+    recibido = b""
+    for peticion in peticiones:
+        try:
+            writer.write(peticion)
+            await writer.drain()
+        except ConnectionError:
+            break
+        try:
+            recibido += await asyncio.wait_for(reader.read(4096), 0.5)
+        except asyncio.TimeoutError:
+            pass
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0.1) # El balanceador y el worker terminan de cerrar sus conexiones
+    return recibido
+
+async def _comprobar(nombre: str, acepta_websocket: bool, peticiones: list[bytes], esperado: bytes = None) -> bool:
+    worker = WorkerSimulado(acepta_websocket)
+    servidor = await asyncio.start_server(worker.atender, "127.0.0.1", 0)
+    puerto_worker = servidor.sockets[0].getsockname()[1]
+    puerto = _puerto_libre()
+    balanceador = BalanceadorSticky("127.0.0.1", puerto, [("127.0.0.1", puerto_worker)])
+    await balanceador.iniciar()
+    try:
+        recibido = await _enviar(puerto, peticiones)
+    finally:
+        await balanceador.detener()
+        servidor.close()
+    ips = worker.ips_recibidas()
+    correcto = bool(ips) and all(ip == "127.0.0.1" for ip in ips) and (esperado is None or esperado in recibido)
+    print(f"{'OK   ' if correcto else 'FALLO'} {nombre}: X-Forwarded-For recibidas por el worker {ips}")
+    return correcto
+
+async def comprobar_todo() -> bool:
+    falsa = f"X-Forwarded-For: {IP_FALSA}\r\n"
+    resultados = [
+        await _comprobar("IP falsificada en la primera petición", False,
+                         [f"GET / HTTP/1.1\r\nHost: x\r\n{falsa}\r\n".encode("latin-1")]),
+        await _comprobar("'Upgrade: foo' y después un handshake en la misma conexión", True,
+                         [b"GET / HTTP/1.1\r\nHost: x\r\nUpgrade: foo\r\n\r\n", _handshake(falsa)]),
+        await _comprobar("handshake rechazado (400) y después otra petición", False,
+                         [_handshake(), f"GET / HTTP/1.1\r\nHost: x\r\n{falsa}\r\n".encode("latin-1")]),
+        await _comprobar("handshake aceptado (101) y datos del websocket", True,
+                         [_handshake(), b"datos-del-websocket"], esperado=b"datos-del-websocket"),
+    ]
+    return all(resultados)
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Comprueba que el balanceador no deja pasar IPs de origen falsificadas.").parse_args()
+    sys.exit(0 if asyncio.run(comprobar_todo()) else 1)
@@ -0,0 +1,65 @@
+# reconstruir_metricas_clientes.py
+# Script de utilidad para reconstruir por completo la tabla cliente_metricas (RFM) a partir de los pedidos.
+# Las métricas se mantienen al día de forma incremental al registrar pedidos; este script sirve para
+# la carga inicial, tras eliminar/cancelar pedidos o como tarea programada (ej. cron nocturno).
+# Uso: python test/reconstruir_metricas_clientes.py [--exportar segmentacion.csv]
+
+import argparse
+import logging
+import sys
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+
+# Añadir el directorio raíz del proyecto al PATH de Python
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, os.pardir)) # Sube un nivel para llegar a pizzeria_web
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from core.config import settings
+from services.metricas_cliente_service import MetricasClienteService
+
+# Configuración del Logger (similar a main.py)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(
+    level=settings.LOG_LEVEL,
+    format=LOG_FORMAT,
+    handlers=[
+        logging.FileHandler(settings.LOG_FILE),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+def reconstruir_metricas(ruta_exportacion: str = None):
+    """
+    Reconstruye la tabla cliente_metricas y, opcionalmente, exporta la segmentación RFM a CSV.
+
+    Args:
+        ruta_exportacion (str, optional): Ruta del CSV de segmentación a generar. Defaults to None.
+    """
+    try:
+        engine = create_engine(settings.DATABASE_URL)
+        Session = sessionmaker(bind=engine)
+        logger.info("Conexión a la base de datos establecida.")
+    except SQLAlchemyError as e:
+        logger.critical(f"Error crítico al conectar con la base de datos: {e}")
+        return
+
+    metricas_service = MetricasClienteService(Session)
+    num_clientes = metricas_service.reconstruir_metricas()
+    if num_clientes is None:
+        logger.error("Fallo al reconstruir las métricas de clientes. Consulta los logs para más detalles.")
+        return
+    logger.info(f"Métricas reconstruidas para {num_clientes} clientes.")
+
+    if ruta_exportacion:
+        metricas_service.exportar_segmentacion_csv(ruta_exportacion)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye la tabla cliente_metricas (RFM).")
+    parser.add_argument("--exportar", metavar="CSV", help="Exporta la segmentación RFM al archivo indicado.")
+    args = parser.parse_args()
+    reconstruir_metricas(args.exportar)
@@ -0,0 +1,127 @@
+# utils/carrito.py
+from dataclasses import dataclass
+
+@dataclass
+class LineaCarrito:
+    """Una línea del carrito: copia (snapshot) de los datos del ítem del menú y la cantidad."""
+    item_id: int
+    nombre: str
+    precio: float
+    cantidad: int = 0
+
+    @property
+    def subtotal(self) -> float:
+        return self.precio * self.cantidad
+
+class Carrito:
+    """
+    Carrito de compras de una sesión. Guarda una copia del nombre y precio de cada ítem al añadirlo,
+    así que mostrar el carrito y calcular el total no requiere consultas a la base de datos.
+    Los precios se revalidan con refrescar() (una sola consulta) y, al registrar el pedido,
+    PedidoService.place_order vuelve a calcular el total con los precios del servidor.
+    """
+    def __init__(self):
+        self._lineas = {} # item_id -> LineaCarrito, en orden de inserción
+
+    def __len__(self) -> int:
+        return len(self._lineas)
+
+    def __bool__(self) -> bool:
+        return bool(self._lineas)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._lineas
+
+    def agregar(self, item) -> int:
+        """
+        Añade una unidad de un ítem del menú.
+
+        Args:
+            item (ItemMenu): El ítem del menú (se copian su ID, nombre y precio).
+
+        Returns:
+            int: La nueva cantidad del ítem en el carrito.
+        """
+        linea = self._lineas.get(item.id)
+        if linea is None:
+            linea = LineaCarrito(item.id, item.nombre, item.precio)
+            self._lineas[item.id] = linea
+        linea.cantidad += 1
+        return linea.cantidad
+
+    def quitar(self, item_id: int):
+        """
+        Quita una unidad de un ítem. La línea se elimina cuando su cantidad llega a 0.
+
+        Returns:
+            LineaCarrito: La línea con la cantidad actualizada (cantidad 0 si se eliminó).
+            None: Si el ítem no estaba en el carrito.
+        """
+        linea = self._lineas.get(item_id)
+        if linea is None:
+            return None
+        linea.cantidad -= 1
+        if linea.cantidad <= 0:
+            del self._lineas[item_id]
+        return linea
+
+    def quitar_todo(self, item_id: int):
+        """
+        Elimina todas las unidades de un ítem.
+
+        Returns:
+            LineaCarrito: La línea eliminada.
+            None: Si el ítem no estaba en el carrito.
+        """
+        return self._lineas.pop(item_id, None)
+
+    def cantidad(self, item_id: int) -> int:
+        """Cantidad de un ítem en el carrito (0 si no está)."""
+        linea = self._lineas.get(item_id)
+        return linea.cantidad if linea else 0
+
+    def lineas(self) -> list[LineaCarrito]:
+        """Las líneas del carrito, en el orden en que se añadieron."""
+        return list(self._lineas.values())
+
+    def item_ids(self) -> list[int]:
+        return list(self._lineas)
+
+    @property
+    def total(self) -> float:
+        """Total del carrito calculado en memoria con los precios de las copias."""
+        return sum(linea.subtotal for linea in self._lineas.values())
+
+    def vaciar(self):
+        self._lineas.clear()
+
+    def items_para_pedido(self) -> list[dict]:
+        """Ítems en el formato de PedidoService.place_order: [{'item_id': ..., 'cantidad': ...}]."""
+        return [{'item_id': linea.item_id, 'cantidad': linea.cantidad} for linea in self._lineas.values()]
+
+    def refrescar(self, menu_service) -> list[LineaCarrito]:
+        """
+        Actualiza nombre y precio de todas las líneas con una sola consulta al menú y elimina
+        los ítems que ya no existen o no están disponibles.
+
+        Args:
+            menu_service (MenuService): Servicio del menú (usa get_items_menu_by_ids).
+
+        Returns:
+            list[LineaCarrito]: Las líneas eliminadas por no estar disponibles.
+        """
+        if not self._lineas:
+            return []
+        items = menu_service.get_items_menu_by_ids(self.item_ids())
+        if items is None:
+            return [] # Error de base de datos: se conservan las copias actuales
+        actuales = {item.id: item for item in items}
+        eliminadas = []
+        for item_id, linea in list(self._lineas.items()):
+            item = actuales.get(item_id)
+            if item is None or not item.disponible:
+                eliminadas.append(self._lineas.pop(item_id))
+            else:
+                linea.nombre = item.nombre
+                linea.precio = item.precio
+        return eliminadas
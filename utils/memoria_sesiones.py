@@ -0,0 +1,133 @@
+# utils/memoria_sesiones.py
+import threading
+import time
+import tracemalloc
+from core.config import settings
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+class MonitorMemoriaSesiones:
+    """
+    Mide con tracemalloc la memoria que ocupa cada sesión de Flet conectada.
+    Se registran dos valores:
+      - La memoria asignada al construir las vistas de cada sesión (delta de inicialización).
+      - La memoria total del proceso por encima de la línea base (tomada al iniciar el monitor)
+        dividida entre las sesiones activas, que incluye lo que las sesiones asignan después.
+    El reporte indica si los bytes por sesión están dentro del presupuesto configurado.
+    """
+    def __init__(self, presupuesto_kb: int, intervalo_reporte: int = 300):
+        """
+        Args:
+            presupuesto_kb (int): Memoria objetivo por sesión conectada, en KB.
+            intervalo_reporte (int, optional): Segundos mínimos entre reportes en el log. Defaults to 300.
+        """
+        self.presupuesto_bytes = presupuesto_kb * 1024
+        self.intervalo_reporte = intervalo_reporte
+        self._sesiones = {} # session_id -> bytes asignados al inicializar la sesión
+        self._linea_base = 0
+        self._lock = threading.Lock()
+        self._ultimo_reporte = time.monotonic()
+
+    @property
+    def activo(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def iniciar(self):
+        """Inicia tracemalloc (una sola vez por proceso) y fija la línea base de memoria."""
+        with self._lock:
+            if tracemalloc.is_tracing():
+                return
+            tracemalloc.start()
+            self._linea_base = tracemalloc.get_traced_memory()[0]
+        logger.info("Medición de memoria por sesión activada (presupuesto: %s KB por sesión).", self.presupuesto_bytes // 1024)
+
+    def medir(self) -> int:
+        """Bytes asignados actualmente según tracemalloc (0 si no está activo)."""
+        if not tracemalloc.is_tracing():
+            return 0
+        return tracemalloc.get_traced_memory()[0]
+
+    def registrar(self, session_id: str, bytes_al_iniciar: int):
+        """
+        Registra una sesión nueva con la memoria asignada desde 'bytes_al_iniciar' (ver medir()).
+        Con varias sesiones iniciándose a la vez el delta incluye asignaciones de las otras;
+        el promedio del reporte lo compensa.
+        """
+        if not tracemalloc.is_tracing():
+            return
+        delta = max(0, self.medir() - bytes_al_iniciar)
+        with self._lock:
+            self._sesiones[session_id] = delta
+        logger.debug("Sesión %s: %.1f KB asignados al construir las vistas.", session_id, delta / 1024)
+        self._reportar_si_corresponde()
+
+    def eliminar(self, session_id: str):
+        """Quita una sesión desconectada del reporte."""
+        with self._lock:
+            self._sesiones.pop(session_id, None)
+
+    def reporte(self) -> dict:
+        """
+        Resumen de memoria por sesión.
+
+        Returns:
+            dict: sesiones_activas, bytes_totales, bytes_por_sesion, bytes_inicio_promedio,
+                  presupuesto_bytes y dentro_presupuesto.
+        """
+        actual = self.medir()
+        with self._lock:
+            deltas = list(self._sesiones.values())
+            linea_base = self._linea_base
+        sesiones = len(deltas)
+        bytes_totales = max(0, actual - linea_base)
+        bytes_por_sesion = bytes_totales // sesiones if sesiones else 0
+        return {
+            "sesiones_activas": sesiones,
+            "bytes_totales": bytes_totales,
+            "bytes_por_sesion": bytes_por_sesion,
+            "bytes_inicio_promedio": sum(deltas) // sesiones if sesiones else 0,
+            "presupuesto_bytes": self.presupuesto_bytes,
+            "dentro_presupuesto": bytes_por_sesion <= self.presupuesto_bytes,
+        }
+
+    def registrar_reporte(self):
+        """Escribe el reporte en el log (WARNING si se excede el presupuesto)."""
+        datos = self.reporte()
+        mensaje = (
+            f"Memoria por sesión: {datos['sesiones_activas']} sesiones, "
+            f"{datos['bytes_totales'] / 1024:.0f} KB en total, "
+            f"{datos['bytes_por_sesion'] / 1024:.1f} KB por sesión "
+            f"({datos['bytes_inicio_promedio'] / 1024:.1f} KB al iniciar), "
+            f"presupuesto {datos['presupuesto_bytes'] / 1024:.0f} KB."
+        )
+        if datos["dentro_presupuesto"]:
+            logger.info(mensaje)
+        else:
+            logger.warning(mensaje)
+        self._ultimo_reporte = time.monotonic()
+        return datos
+
+    def _reportar_si_corresponde(self):
+        # El reporte periódico se amortiza entre los registros de sesiones, sin un hilo dedicado
+        if time.monotonic() - self._ultimo_reporte >= self.intervalo_reporte:
+            self.registrar_reporte()
+
+# Monitor compartido por todas las sesiones del proceso
+monitor_memoria = None
+
+def obtener_monitor_memoria():
+    """
+    Obtiene el monitor de memoria del proceso si settings.MEMORY_REPORT está activado.
+
+    Returns:
+        MonitorMemoriaSesiones: El monitor (ya iniciado).
+        None: Si la medición está desactivada.
+    """
+    global monitor_memoria
+    if not settings.MEMORY_REPORT:
+        return None
+    if monitor_memoria is None:
+        monitor_memoria = MonitorMemoriaSesiones(settings.SESSION_MEMORY_BUDGET_KB, settings.MEMORY_REPORT_INTERVAL)
+        monitor_memoria.iniciar()
+    return monitor_memoria
@@ -0,0 +1,53 @@
+# utils/normalizacion.py
+import re
+
+# Código de país usado cuando el teléfono se escribe en formato nacional (ej. 0412-1234567)
+CODIGO_PAIS_POR_DEFECTO = "58"
+
+_NO_DIGITOS = re.compile(r"\D")
+
+def normalizar_telefono(telefono: str, codigo_pais: str = CODIGO_PAIS_POR_DEFECTO):
+    """
+    Normaliza un número de teléfono a un formato tipo E.164 (solo dígitos con prefijo '+').
+
+    Ej: "0412-123.45.67" -> "+584121234567", "+58 412 1234567" -> "+584121234567".
+
+    Args:
+        telefono (str): El teléfono tal como lo escribió el usuario.
+        codigo_pais (str, optional): Código de país para números en formato nacional. Defaults to "58".
+
+    Returns:
+        str: El teléfono normalizado.
+        None: Si el teléfono está vacío o no contiene dígitos.
+    """
+    if not telefono:
+        return None
+    digitos = _NO_DIGITOS.sub("", telefono)
+    if not digitos:
+        return None
+    if digitos.startswith("00"):
+        # Prefijo internacional (00 58 ...)
+        digitos = digitos[2:]
+    elif digitos.startswith("0"):
+        # Formato nacional: se reemplaza el 0 de larga distancia por el código de país
+        digitos = codigo_pais + digitos[1:]
+    elif not telefono.strip().startswith("+") and len(digitos) <= 10:
+        # Número nacional escrito sin el 0 inicial (ej. 412-1234567)
+        digitos = codigo_pais + digitos
+    return f"+{digitos}"
+
+def normalizar_email(email: str):
+    """
+    Normaliza un correo electrónico (sin espacios y en minúsculas).
+
+    Args:
+        email (str): El correo electrónico.
+
+    Returns:
+        str: El correo normalizado.
+        None: Si el correo está vacío.
+    """
+    if not email:
+        return None
+    email = email.strip().lower()
+    return email or None
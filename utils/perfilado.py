@@ -0,0 +1,158 @@
+# utils/perfilado.py
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from core.config import settings
+import logging # Importa el módulo logging
+
+logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
+
+# Contexto vacío reutilizable: perfilar() lo devuelve cuando el perfilado está desactivado
+_SIN_PERFIL = nullcontext()
+
+def _nombre_frame(codigo) -> str:
+    # Formato de las pilas colapsadas: sin ';' ni espacios, que separan frames y el conteo
+    return f"{codigo.co_name}({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})".replace(";", ",").replace(" ", "_")
+
+class _Muestreador(threading.Thread):
+    """Toma muestras periódicas de la pila de un hilo y las acumula en formato de pilas colapsadas."""
+    def __init__(self, hilo_id: int, intervalo: float):
+        super().__init__(name="perfilado-muestreo", daemon=True)
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.pilas = Counter() # "raiz;...;hoja" -> cantidad de muestras
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            pila = []
+            while frame is not None:
+                pila.append(_nombre_frame(frame.f_code))
+                frame = frame.f_back
+            if pila:
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+class PerfiladorAcciones:
+    """
+    Perfila las acciones de la interfaz (cambios de ruta y manejadores de eventos) bajo demanda.
+    Por cada acción más lenta que 'minimo_ms' se guardan en 'directorio':
+      - <acción>.folded: pilas colapsadas del muestreador (entrada de flamegraph.pl o speedscope).
+      - <acción>.txt: resumen legible (funciones con más tiempo).
+      - <acción>.prof: estadísticas de cProfile (solo en modo "cprofile"; se abren con pstats o snakeviz).
+    El modo "muestreo" casi no afecta la duración de la acción; "cprofile" mide cada llamada (tiempo
+    exacto por función, por ejemplo consultas SQL, construcción de controles o page.update) pero la
+    ralentiza. Desactivado, perfilar() cuesta una comprobación de un atributo.
+    El interruptor es por proceso: con varios workers se activa en el worker de la sesión que lo cambia.
+    """
+    def __init__(self, directorio: str, modo: str = "muestreo", intervalo_ms: float = 2.0, minimo_ms: float = 10.0,
+                 activo: bool = False):
+        """
+        Args:
+            directorio (str): Carpeta donde se guardan los perfiles.
+            modo (str, optional): "muestreo" o "cprofile". Defaults to "muestreo".
+            intervalo_ms (float, optional): Intervalo entre muestras de la pila. Defaults to 2.0.
+            minimo_ms (float, optional): Las acciones más rápidas no se guardan. Defaults to 10.0.
+            activo (bool, optional): Estado inicial del perfilado. Defaults to False.
+        """
+        if modo not in ("muestreo", "cprofile"):
+            raise ValueError(f"Modo de perfilado desconocido: {modo}")
+        self.directorio = directorio
+        self.modo = modo
+        self.intervalo = intervalo_ms / 1000
+        self.minimo_ms = minimo_ms
+        self.activo = activo
+        self._local = threading.local() # Evita perfilar acciones anidadas (ej. route_change dentro de un manejador)
+
+    def activar(self, activo: bool):
+        """Activa o desactiva el perfilado (ej. desde el panel de administración)."""
+        self.activo = activo
+        logger.info("Perfilado de acciones %s (modo %s, carpeta %s).", "activado" if activo else "desactivado",
+                    self.modo, os.path.abspath(self.directorio))
+
+    def perfilar(self, accion: str):
+        """
+        Contexto que perfila el bloque 'with' como la acción 'accion' si el perfilado está activo.
+
+        Args:
+            accion (str): Nombre de la acción (ej. "MainView._add_to_order").
+        """
+        if not self.activo or getattr(self._local, "en_curso", False):
+            return _SIN_PERFIL
+        return self._perfilar(accion)
+
+    @contextmanager
+    def _perfilar(self, accion: str):
+        self._local.en_curso = True
+        muestreador = _Muestreador(threading.get_ident(), self.intervalo)
+        perfil = cProfile.Profile() if self.modo == "cprofile" else None
+        muestreador.start()
+        inicio = time.perf_counter()
+        if perfil is not None:
+            perfil.enable()
+        try:
+            yield
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            muestreador.detener()
+            self._local.en_curso = False
+            if duracion_ms >= self.minimo_ms:
+                self._guardar(accion, duracion_ms, muestreador.pilas, perfil)
+
+    def _guardar(self, accion: str, duracion_ms: float, pilas: Counter, perfil):
+        nombre = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{re.sub(r'[^A-Za-z0-9_.-]', '_', accion)}"
+        ruta = os.path.join(self.directorio, nombre)
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(f"{ruta}.folded", "w", encoding="utf-8") as archivo:
+                archivo.writelines(f"{pila} {cantidad}\n" for pila, cantidad in pilas.items())
+            with open(f"{ruta}.txt", "w", encoding="utf-8") as archivo:
+                archivo.write(self._resumen(accion, duracion_ms, pilas, perfil))
+            if perfil is not None:
+                perfil.dump_stats(f"{ruta}.prof")
+        except OSError as e:
+            logger.error("No se pudo guardar el perfil de '%s': %s", accion, e)
+            return
+        logger.info("Perfil de '%s' (%.1f ms) guardado en %s.*", accion, duracion_ms, ruta)
+
+    @staticmethod
+    def _resumen(accion: str, duracion_ms: float, pilas: Counter, perfil, limite: int = 25) -> str:
+        total = sum(pilas.values())
+        lineas = [f"Acción: {accion}", f"Duración: {duracion_ms:.1f} ms", f"Muestras: {total}", ""]
+        if total:
+            propias = Counter() # Muestras en las que la función estaba ejecutándose (hoja de la pila)
+            inclusivas = Counter() # Muestras en las que la función estaba en la pila
+            for pila, cantidad in pilas.items():
+                frames = pila.split(";")
+                propias[frames[-1]] += cantidad
+                for frame in set(frames):
+                    inclusivas[frame] += cantidad
+            lineas.append("Tiempo propio (muestras en la hoja de la pila):")
+            lineas.extend(f"  {cantidad * 100 / total:5.1f}%  {frame}" for frame, cantidad in propias.most_common(limite))
+            lineas += ["", "Tiempo inclusivo (muestras con la función en la pila):"]
+            lineas.extend(f"  {cantidad * 100 / total:5.1f}%  {frame}" for frame, cantidad in inclusivas.most_common(limite))
+        if perfil is not None:
+            salida = io.StringIO()
+            pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(limite)
+            lineas += ["", "cProfile (ordenado por tiempo acumulado):", salida.getvalue()]
+        return "\n".join(lineas) + "\n"
+
+# Perfilador compartido por todas las sesiones del proceso
+perfilador_acciones = PerfiladorAcciones(
+    settings.PROFILE_DIR, settings.PROFILE_MODE, settings.PROFILE_SAMPLE_INTERVAL_MS, settings.PROFILE_MIN_MS,
+    activo=settings.PROFILE_ACTIONS
+)
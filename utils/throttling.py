@@ -0,0 +1,92 @@
+# utils/throttling.py
+import threading
+import time
+from collections import OrderedDict
+
+class TokenBucket:
+    """
+    Cubeta de tokens: permite ráfagas de hasta 'capacity' intentos y se recarga
+    a razón de 'refill_rate' tokens por segundo.
+    """
+    __slots__ = ("capacity", "refill_rate", "tokens", "updated_at")
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def retry_after(self, amount: float = 1.0) -> float:
+        """Segundos que faltan para poder consumir 'amount' tokens (0 si ya se puede)."""
+        self._refill(time.monotonic())
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float = 1.0) -> bool:
+        """Consume 'amount' tokens si hay suficientes. Retorna True si se consumieron."""
+        self._refill(time.monotonic())
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+class LoginThrottler:
+    """
+    Limita los intentos de login por usuario y por IP con una cubeta de tokens para cada clave.
+    El número de claves en memoria está acotado (LRU) para que un ataque con muchos usuarios
+    o IPs distintas no haga crecer la memoria sin límite.
+    """
+    def __init__(self, user_capacity: int, ip_capacity: int, window_seconds: float, max_keys: int = 10000):
+        """
+        Args:
+            user_capacity (int): Intentos permitidos por usuario en cada ventana.
+            ip_capacity (int): Intentos permitidos por IP en cada ventana.
+            window_seconds (float): Segundos en los que se recarga la capacidad completa.
+            max_keys (int, optional): Máximo de claves (usuarios + IPs) en memoria. Defaults to 10000.
+        """
+        self.user_capacity = user_capacity
+        self.ip_capacity = ip_capacity
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: tuple, capacity: int) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity, capacity / self.window_seconds)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False) # Descarta la clave usada hace más tiempo
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def try_acquire(self, usuario: str, ip: str = None) -> float:
+        """
+        Registra un intento de login para el usuario y la IP.
+
+        Returns:
+            float: 0 si el intento está permitido; si no, segundos a esperar antes de reintentar.
+        """
+        with self._lock:
+            buckets = [self._bucket(("usuario", (usuario or "").lower()), self.user_capacity)]
+            if ip:
+                buckets.append(self._bucket(("ip", ip), self.ip_capacity))
+            # Solo se consume si todas las cubetas tienen tokens, para no penalizar dos veces
+            espera = max(bucket.retry_after() for bucket in buckets)
+            if espera > 0:
+                return espera
+            for bucket in buckets:
+                bucket.consume()
+            return 0.0
+
+    def reset(self, usuario: str):
+        """Restablece los intentos de un usuario (ej. tras un login exitoso)."""
+        with self._lock:
+            self._buckets.pop(("usuario", (usuario or "").lower()), None)
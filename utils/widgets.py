@@ -1,6 +1,20 @@
 # utils/widgets.py
 import flet as ft
+import functools
+import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime, date, time
+from time import perf_counter
+from core.metricas import registro_metricas
+from core.replicas import sesion_usuario
+from utils.perfilado import perfilador_acciones
+
+logger = logging.getLogger(__name__)
+
+_latencia_handlers = registro_metricas.histogram(
+    "pizzeria_handler_seconds", "Duración de los manejadores de eventos de las vistas (incluye el envío de actualizaciones).",
+    ("handler",))
 
 class CustomCard(ft.Card):
     """
@@ -26,6 +40,136 @@ class CustomCard(ft.Card):
             )
         )
 
+class UpdateBatcher:
+    """
+    Agrupa las actualizaciones de una página de Flet. Dentro de un lote (batch) los controles se
+    marcan como pendientes en lugar de enviarse, y al terminar el manejador de eventos se hace un
+    único envío (diff) al navegador. Fuera de un lote las actualizaciones se envían de inmediato.
+
+    Lleva contadores para medir cuántas actualizaciones se pidieron y cuántos envíos se hicieron por evento.
+    """
+    def __init__(self, page: ft.Page):
+        self.page = page
+        self._local = threading.local() # Cada manejador de Flet se ejecuta en su propio hilo
+        self._lock = threading.Lock()
+        self.events = 0 # Eventos (lotes) procesados
+        self.requests = 0 # Actualizaciones solicitadas (page.update()/control.update() evitados)
+        self.flushes = 0 # Envíos reales al navegador
+        self.last_event_requests = 0
+
+    def _state(self):
+        state = getattr(self._local, "state", None)
+        if state is None:
+            state = self._local.state = {"depth": 0, "controls": [], "page": False, "requests": 0}
+        return state
+
+    @contextmanager
+    def batch(self, name: str = None):
+        """Agrupa todas las actualizaciones del bloque en un único envío al salir."""
+        state = self._state()
+        state["depth"] += 1
+        try:
+            yield self
+        finally:
+            state["depth"] -= 1
+            if state["depth"] == 0:
+                requests = state["requests"]
+                state["requests"] = 0
+                flushed = self.flush()
+                with self._lock:
+                    self.events += 1
+                    self.requests += requests
+                    self.last_event_requests = requests
+                if name:
+                    logger.debug("Evento '%s': %s actualizaciones solicitadas, %s envío(s).", name, requests, (1 if flushed else 0))
+
+    def mark_dirty(self, *controls: ft.Control):
+        """Marca controles como modificados (dentro de un lote) o los actualiza de inmediato (fuera de él)."""
+        state = self._state()
+        state["requests"] += 1
+        if state["depth"] == 0:
+            self._send(controls, page_update=False)
+            return
+        for control in controls:
+            if not any(control is pending for pending in state["controls"]):
+                state["controls"].append(control)
+
+    def request_update(self):
+        """Solicita un page.update() (dentro de un lote se hace uno solo al final)."""
+        state = self._state()
+        state["requests"] += 1
+        if state["depth"] == 0:
+            self._send((), page_update=True)
+            return
+        state["page"] = True
+
+    def flush(self) -> bool:
+        """Envía las actualizaciones pendientes del hilo actual. Retorna True si hubo envío."""
+        state = self._state()
+        controls, page_update = state["controls"], state["page"]
+        state["controls"], state["page"] = [], False
+        if not controls and not page_update:
+            return False
+        self._send(controls, page_update)
+        return True
+
+    def _send(self, controls, page_update: bool):
+        # Si algún control aún no está en la página (o se pidió la página completa) se envía el diff completo
+        if page_update or any(control.page is None for control in controls):
+            self.page.update()
+        else:
+            self.page.update(*controls)
+        with self._lock:
+            self.flushes += 1
+
+    @property
+    def updates_per_event(self) -> float:
+        """Promedio de envíos al navegador por evento."""
+        return self.flushes / self.events if self.events else 0.0
+
+def get_update_batcher(page: ft.Page) -> UpdateBatcher:
+    """Obtiene (o crea) el UpdateBatcher de una página."""
+    batcher = getattr(page, "_update_batcher", None)
+    if batcher is None:
+        batcher = UpdateBatcher(page)
+        page._update_batcher = batcher
+    return batcher
+
+def mark_dirty(page: ft.Page, *controls: ft.Control):
+    """Marca controles para actualizar en el próximo envío en lugar de llamar a control.update()."""
+    get_update_batcher(page).mark_dirty(*controls)
+
+def request_page_update(page: ft.Page):
+    """Solicita un page.update(); dentro de un manejador con @batched se agrupa en un único envío."""
+    get_update_batcher(page).request_update()
+
+def batched(handler, page: ft.Page = None):
+    """
+    Decorador para manejadores de eventos: todas las actualizaciones hechas con mark_dirty,
+    request_page_update o show_snackbar durante el manejador se envían juntas al final.
+
+    Se usa como @batched en métodos de vistas (toma self.page) o como batched(funcion, page)
+    para funciones anidadas. Cada llamada se registra en la métrica pizzeria_handler_seconds y,
+    con el perfilado de acciones activo, se perfila (incluido el envío de las actualizaciones).
+    """
+    accion = handler.__qualname__.replace(".<locals>", "")
+    latencia = None # Serie de la métrica: se crea en la primera llamada
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        nonlocal latencia
+        inicio = perf_counter()
+        target_page = page if page is not None else args[0].page
+        try:
+            with perfilador_acciones.perfilar(accion), get_update_batcher(target_page).batch(handler.__name__), \
+                    sesion_usuario(target_page.session_id):
+                return handler(*args, **kwargs)
+        finally:
+            if latencia is None:
+                latencia = _latencia_handlers.labels(accion)
+            latencia.observe(perf_counter() - inicio)
+    return wrapper
+
 def create_data_table(columns: list[str], rows_data: list[list[str]],
                       heading_row_bgcolor: str = ft.colors.BLUE_GREY_100,
                       data_row_bgcolor_hover: str = ft.colors.BLUE_GREY_50,
@@ -75,6 +219,257 @@ def create_data_table(columns: list[str], rows_data: list[list[str]],
         horizontal_lines=ft.border.BorderSide(0.5, border_color) if border_color else None,
     )
 
+class VirtualDataTable(ft.Column):
+    """
+    Tabla virtualizada para listados grandes. Las filas se piden por páginas a una función
+    fuente de datos (orden y filtro se resuelven en el servidor) y se muestran en un ft.ListView
+    con altura de fila fija (item_extent). Al desplazarse se cargan más filas y, al superar
+    'max_loaded_rows', se descartan las más lejanas, así que el costo de render y de sincronización
+    depende del área visible y no de la cantidad total de registros.
+
+    La fuente de datos recibe (offset, limit, sort_key, descending, filter_text, with_total) y
+    devuelve (filas, total): cada fila es una lista de celdas (texto o controles de Flet, como en
+    create_data_table) y total es la cantidad de filas filtradas (None si with_total es False).
+    La celda 'key_column' identifica cada fila y permite reemplazar filas cargadas con patch_rows().
+    """
+    def __init__(self, columns: list[str], fetch_rows, column_widths: list[float] = None,
+                 sort_keys: dict = None, sort_key: str = None, descending: bool = True, sort_with_filter: bool = True,
+                 row_height: float = 48, visible_rows: int = 10, page_size: int = 50, max_loaded_rows: int = 200,
+                 key_column: int = 0, heading_row_bgcolor: str = ft.colors.BLUE_GREY_100, border_color: str = ft.colors.BLUE_GREY_200,
+                 text_color: str = ft.colors.BLACK):
+        """
+        Args:
+            columns (list[str]): Nombres de las columnas.
+            fetch_rows (callable): Fuente de datos (ver descripción de la clase).
+            column_widths (list[float], optional): Ancho de cada columna. Defaults to 120 por columna.
+            sort_keys (dict, optional): {nombre de columna: clave de orden} de las columnas ordenables. Defaults to None.
+            sort_key (str, optional): Clave de orden inicial. Defaults to None.
+            descending (bool, optional): Orden inicial descendente. Defaults to True.
+            sort_with_filter (bool, optional): Si es False, con un filtro activo el orden lo decide la fuente
+                                               de datos (ej. relevancia) y el encabezado no permite ordenar. Defaults to True.
+            row_height (float, optional): Altura fija de cada fila. Defaults to 48.
+            visible_rows (int, optional): Filas visibles (define la altura de la lista). Defaults to 10.
+            page_size (int, optional): Filas pedidas en cada llamada a la fuente de datos. Defaults to 50.
+            max_loaded_rows (int, optional): Máximo de filas cargadas a la vez. Defaults to 200.
+            key_column (int, optional): Índice de la celda que identifica la fila (ej. el ID). Defaults to 0.
+            heading_row_bgcolor (str, optional): Color de fondo del encabezado. Defaults to ft.colors.BLUE_GREY_100.
+            border_color (str, optional): Color del borde. Defaults to ft.colors.BLUE_GREY_200.
+            text_color (str, optional): Color del texto. Defaults to ft.colors.BLACK.
+        """
+        self.columns = columns
+        self.fetch_rows = fetch_rows
+        self.column_widths = column_widths or [120] * len(columns)
+        self.sort_keys = sort_keys or {}
+        self.sort_key = sort_key
+        self.descending = descending
+        self.sort_with_filter = sort_with_filter
+        self.row_height = row_height
+        self.page_size = page_size
+        self.max_loaded_rows = max(max_loaded_rows, 2 * page_size)
+        self.key_column = key_column
+        self.text_color = text_color
+        self.border_color = border_color
+        self.heading_row_bgcolor = heading_row_bgcolor
+        self.filter_text = ""
+
+        self.offset = 0 # Índice (en el resultado completo) de la primera fila cargada
+        self.total = 0
+        self._scroll_pixels = 0.0
+        self._loading = threading.Lock() # Evita cargas simultáneas por eventos de scroll seguidos
+
+        self.header = ft.Row(spacing=0)
+        self.list_view = ft.ListView(
+            item_extent=row_height,
+            height=row_height * visible_rows,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=100,
+        )
+        self.status_text = ft.Text("", size=12, color=text_color)
+        width = sum(self.column_widths)
+        super().__init__(
+            controls=[
+                ft.Row([
+                    ft.Container(
+                        content=ft.Column([self.header, self.list_view], spacing=0, width=width),
+                        border=ft.border.all(1, border_color),
+                        border_radius=ft.border_radius.all(8),
+                    )
+                ], scroll=ft.ScrollMode.AUTO), # Desplazamiento horizontal si la tabla es más ancha que la tarjeta
+                self.status_text,
+            ],
+            spacing=5,
+        )
+        self._build_header()
+        self._load_first_page()
+
+    # --- Construcción de controles ---
+
+    @property
+    def sort_enabled(self) -> bool:
+        """True si el orden de las columnas se aplica (ver sort_with_filter)."""
+        return self.sort_with_filter or not self.filter_text
+
+    def _build_header(self):
+        cells = []
+        for column, width in zip(self.columns, self.column_widths):
+            key = self.sort_keys.get(column) if self.sort_enabled else None
+            label = column
+            if key is not None and key == self.sort_key:
+                label = f"{column} {'▼' if self.descending else '▲'}"
+            text = ft.Text(label, weight=ft.FontWeight.BOLD, color=self.text_color, no_wrap=True)
+            cells.append(ft.Container(
+                content=text,
+                width=width,
+                height=self.row_height,
+                padding=ft.padding.symmetric(horizontal=8),
+                alignment=ft.alignment.center_left,
+                bgcolor=self.heading_row_bgcolor,
+                on_click=(lambda e, key=key: self.set_sort(key)) if key is not None else None,
+                tooltip="Ordenar" if key is not None else None,
+            ))
+        self.header.controls = cells
+
+    def _build_row(self, row: list):
+        cells = []
+        for cell_content, width in zip(row, self.column_widths):
+            if not isinstance(cell_content, ft.Control):
+                cell_content = ft.Text(str(cell_content), color=self.text_color, no_wrap=True,
+                                       overflow=ft.TextOverflow.ELLIPSIS, tooltip=str(cell_content))
+            cells.append(ft.Container(content=cell_content, width=width, padding=ft.padding.symmetric(horizontal=8),
+                                      alignment=ft.alignment.center_left))
+        return ft.Container(content=ft.Row(cells, spacing=0), data=str(row[self.key_column]),
+                            border=ft.border.only(bottom=ft.border.BorderSide(0.5, self.border_color)))
+
+    def _update_status(self):
+        loaded = len(self.list_view.controls)
+        if not self.total:
+            self.status_text.value = "No hay registros para mostrar."
+        else:
+            self.status_text.value = f"Filas {self.offset + 1}-{self.offset + loaded} cargadas de {self.total}."
+
+    # --- Carga de datos ---
+
+    def _fetch(self, offset: int, limit: int, with_total: bool = False):
+        rows, total = self.fetch_rows(offset, limit, self.sort_key, self.descending, self.filter_text, with_total)
+        if total is not None:
+            self.total = total
+        return rows or []
+
+    def _load_first_page(self):
+        self.offset = 0
+        self._scroll_pixels = 0.0
+        rows = self._fetch(0, self.page_size, with_total=True)
+        self.list_view.controls = [self._build_row(row) for row in rows]
+        self._update_status()
+
+    def _load_next(self):
+        loaded = len(self.list_view.controls)
+        if self.offset + loaded >= self.total:
+            return False
+        rows = self._fetch(self.offset + loaded, self.page_size)
+        if not rows:
+            return False
+        self.list_view.controls.extend(self._build_row(row) for row in rows)
+        excess = len(self.list_view.controls) - self.max_loaded_rows
+        if excess > 0:
+            # Se descartan las filas de arriba y se compensa el desplazamiento (altura de fila fija)
+            del self.list_view.controls[:excess]
+            self.offset += excess
+            self._scroll_pixels = max(0.0, self._scroll_pixels - excess * self.row_height)
+            self.list_view.scroll_to(offset=self._scroll_pixels, duration=0)
+        return True
+
+    def _load_previous(self):
+        if self.offset == 0:
+            return False
+        count = min(self.page_size, self.offset)
+        rows = self._fetch(self.offset - count, count)
+        if not rows:
+            return False
+        self.list_view.controls[:0] = [self._build_row(row) for row in rows]
+        self.offset -= len(rows)
+        excess = len(self.list_view.controls) - self.max_loaded_rows
+        if excess > 0:
+            del self.list_view.controls[-excess:]
+        self._scroll_pixels += len(rows) * self.row_height
+        self.list_view.scroll_to(offset=self._scroll_pixels, duration=0)
+        return True
+
+    def _on_scroll(self, e: ft.OnScrollEvent):
+        self._scroll_pixels = e.pixels
+        margin = self.row_height * 5 # Se carga antes de llegar al borde
+        if not self._loading.acquire(blocking=False):
+            return
+        try:
+            changed = False
+            if e.pixels >= e.max_scroll_extent - margin:
+                changed = self._load_next()
+            elif e.pixels <= e.min_scroll_extent + margin:
+                changed = self._load_previous()
+            if changed:
+                self._update_status()
+                self.update()
+        finally:
+            self._loading.release()
+
+    # --- API pública ---
+
+    def reload(self):
+        """Vuelve a cargar la tabla desde la primera fila (ej. tras eliminar un registro)."""
+        with self._loading:
+            self._build_header()
+            self._load_first_page()
+            if self.page:
+                self.list_view.scroll_to(offset=0, duration=0)
+                self.update()
+
+    @property
+    def is_at_top(self) -> bool:
+        """True si se muestran las primeras filas del resultado (donde aparecen los registros nuevos)."""
+        return self.offset == 0 and self._scroll_pixels < self.row_height
+
+    def patch_rows(self, rows: list) -> list:
+        """
+        Reemplaza las filas cargadas que tengan la misma clave que las filas recibidas, sin volver a
+        consultar la fuente de datos. Solo se actualizan en el cliente las filas reemplazadas.
+
+        Args:
+            rows (list): Filas con el formato de la fuente de datos.
+
+        Returns:
+            list: Las filas recibidas que no estaban cargadas (ej. registros nuevos o fuera de la ventana).
+        """
+        missing = []
+        patched = []
+        with self._loading:
+            positions = {control.data: index for index, control in enumerate(self.list_view.controls)}
+            for row in rows:
+                index = positions.get(str(row[self.key_column]))
+                if index is None:
+                    missing.append(row)
+                    continue
+                self.list_view.controls[index] = self._build_row(row)
+                patched.append(index)
+            if patched and self.page:
+                self.list_view.update()
+        return missing
+
+    def set_filter(self, filter_text: str):
+        """Aplica un filtro (resuelto por la fuente de datos) y recarga la tabla."""
+        self.filter_text = (filter_text or "").strip()
+        self.reload()
+
+    def set_sort(self, sort_key: str):
+        """Ordena por la clave indicada; si ya era la actual, invierte la dirección."""
+        if not self.sort_enabled:
+            return
+        if sort_key == self.sort_key:
+            self.descending = not self.descending
+        else:
+            self.sort_key = sort_key
+            self.descending = False
+        self.reload()
+
 def create_date_picker(page: ft.Page, on_change_callback):
     """
     Crea un selector de fecha de Flet (calendario).
@@ -113,6 +508,62 @@ def create_time_picker(page: ft.Page, on_change_callback):
     return time_picker
 
 
+def create_search_field(on_search, delay: float = 0.3, label: str = "Buscar", hint_text: str = None,
+                        fill_color: str = None, text_color: str = ft.colors.BLACK, width: float = None):
+    """
+    Crea un campo de búsqueda con "debounce": on_search solo se llama cuando el usuario
+    deja de escribir durante 'delay' segundos, en lugar de en cada pulsación.
+
+    Args:
+        on_search (callable): Función a llamar con el texto de búsqueda (str).
+        delay (float, optional): Segundos de inactividad antes de buscar. Defaults to 0.3.
+        label (str, optional): Etiqueta del campo. Defaults to "Buscar".
+        hint_text (str, optional): Texto de ayuda. Defaults to None.
+        fill_color (str, optional): Color de fondo del campo. Defaults to None.
+        text_color (str, optional): Color del texto. Defaults to ft.colors.BLACK.
+        width (float, optional): Ancho del campo. Defaults to None.
+
+    Returns:
+        ft.TextField: El campo de búsqueda.
+    """
+    lock = threading.Lock()
+    pending = {"timer": None}
+
+    def fire(value):
+        with lock:
+            pending["timer"] = None
+        on_search(value)
+
+    def schedule(e):
+        with lock:
+            if pending["timer"]:
+                pending["timer"].cancel() # Cancela la búsqueda anterior si el usuario sigue escribiendo
+            timer = threading.Timer(delay, fire, args=(e.control.value or "",))
+            timer.daemon = True
+            pending["timer"] = timer
+            timer.start()
+
+    def submit(e):
+        # Enter busca de inmediato
+        with lock:
+            if pending["timer"]:
+                pending["timer"].cancel()
+                pending["timer"] = None
+        on_search(e.control.value or "")
+
+    return ft.TextField(
+        label=label,
+        hint_text=hint_text,
+        prefix_icon=ft.icons.SEARCH,
+        filled=fill_color is not None,
+        fill_color=fill_color,
+        color=text_color,
+        hint_style=ft.TextStyle(color=ft.colors.WHITE54),
+        width=width,
+        on_change=schedule,
+        on_submit=submit,
+    )
+
 def show_snackbar(page: ft.Page, message: str, color: str = ft.colors.GREEN_500, icon: ft.Icon = None):
     """
     Muestra una notificación tipo SnackBar en la parte inferior de la pantalla.
@@ -137,8 +588,15 @@ def show_snackbar(page: ft.Page, message: str, color: str = ft.colors.GREEN_500,
         margin=10,
         shape=ft.RoundedRectangleBorder(radius=ft.border_radius.all(10)) # Bordes redondeados
     )
-    page.open(snack_bar)
-    page.update()
+    # Equivale a page.open(snack_bar) pero sin sus envíos intermedios: se añade al overlay y
+    # se envía junto con el resto de cambios del manejador (ver UpdateBatcher). El SnackBar anterior
+    # (ya cerrado o reemplazado por este) se quita: el overlay no crece con cada mensaje de la sesión.
+    anterior = getattr(page, "_snack_bar", None)
+    if anterior is not None and anterior in page.overlay:
+        page.overlay.remove(anterior)
+    page._snack_bar = snack_bar
+    page.overlay.append(snack_bar)
+    request_page_update(page)
 
 def show_alert_dialog(page: ft.Page, title: str, content: str, on_close: callable = None, title_color: str = ft.colors.BLACK, content_color: str = ft.colors.BLACK):
     """
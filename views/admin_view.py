@@ -1,7 +1,10 @@
 # views/admin_view.py
 import flet as ft
-from utils.widgets import CustomCard, create_data_table, show_snackbar, show_alert_dialog, create_message_box, create_simple_bar_chart
-from datetime import datetime, date
+from utils.widgets import CustomCard, create_data_table, show_snackbar, show_alert_dialog, create_message_box, create_simple_bar_chart, create_search_field, VirtualDataTable, batched, mark_dirty, request_page_update
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
 import logging # Importa el módulo logging
 
 # Importaciones de servicios (estos se pasarán al constructor)
@@ -11,15 +14,31 @@ from services.pedido_service import PedidoService
 from services.financiero_service import FinancieroService
 from services.pizzeria_info_service import PizzeriaInfoService
 from services.administrador_service import AdministradorService
+from services.metricas_cliente_service import MetricasClienteService
+from services.session_store import InMemorySessionStore
+from core.config import settings
+from utils.perfilado import perfilador_acciones
 
 logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
 
+# Pool compartido por todas las sesiones para las consultas del dashboard (ver _cargar_widget_dashboard)
+_dashboard_executor = ThreadPoolExecutor(max_workers=settings.DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
 class AdminView(ft.View):
     """
     Vista del panel de administración para gestionar la base de datos de la pizzería.
     Permite a los administradores gestionar menú, clientes, pedidos, finanzas,
     información de la pizzería y otros administradores.
     """
+    # Configuración de colores para modo oscuro (similar a MainView). Atributos de clase compartidos
+    # por todas las sesiones, como en MainView.
+    page_bg_color = ft.colors.BLACK # Color de fondo general de la vista
+    card_bg_color = ft.colors.BLUE_GREY_900 # Color de fondo de las tarjetas
+    text_color = ft.colors.WHITE # Color de texto principal
+    nav_rail_bg_color = ft.colors.BLUE_GREY_800 # Color de la barra de navegación lateral
+    appbar_bg_color = ft.colors.BLUE_GREY_900 # Color de la barra superior
+    textfield_fill_color = ft.colors.BLUE_GREY_700 # Color de fondo de TextField
+
     def __init__(self,
                  page: ft.Page,
                  cliente_service: ClienteService,
@@ -27,20 +46,14 @@ class AdminView(ft.View):
                  pedido_service: PedidoService,
                  financiero_service: FinancieroService,
                  pizzeria_info_service: PizzeriaInfoService,
-                 administrador_service: AdministradorService):
+                 administrador_service: AdministradorService,
+                 metricas_cliente_service: MetricasClienteService,
+                 session_store: InMemorySessionStore):
         
         super().__init__()
         self.page = page
         self.route = "/admin" # Ruta para esta vista
 
-        # Configuración de colores para modo oscuro (similar a MainView)
-        self.page_bg_color = ft.colors.BLACK # Color de fondo general de la vista
-        self.card_bg_color = ft.colors.BLUE_GREY_900 # Color de fondo de las tarjetas
-        self.text_color = ft.colors.WHITE # Color de texto principal
-        self.nav_rail_bg_color = ft.colors.BLUE_GREY_800 # Color de la barra de navegación lateral
-        self.appbar_bg_color = ft.colors.BLUE_GREY_900 # Color de la barra superior
-        self.textfield_fill_color = ft.colors.BLUE_GREY_700 # Color de fondo de TextField
-
         # Establece el color de fondo de la VISTA
         self.bgcolor = self.page_bg_color
 
@@ -51,6 +64,8 @@ class AdminView(ft.View):
         self.financiero_service = financiero_service
         self.pizzeria_info_service = pizzeria_info_service
         self.administrador_service = administrador_service
+        self.metricas_cliente_service = metricas_cliente_service
+        self.session_store = session_store # Almacén de sesiones (en memoria o PostgreSQL)
 
         # Referencias a los campos de login (para usarlos en el método _admin_login)
         self.admin_username_field = ft.TextField(label="Usuario", hint_text="admin_user", filled=True, fill_color=self.textfield_fill_color, color=self.text_color, hint_style=ft.TextStyle(color=ft.colors.WHITE54))
@@ -76,8 +91,13 @@ class AdminView(ft.View):
         self.whatsapp_numero_field = ft.TextField(label="WhatsApp - Número", filled=True, fill_color=self.textfield_fill_color, color=self.text_color, hint_style=ft.TextStyle(color=ft.colors.WHITE54))
         self.whatsapp_chat_link_field = ft.TextField(label="WhatsApp - Link de Chat", filled=True, fill_color=self.textfield_fill_color, color=self.text_color, hint_style=ft.TextStyle(color=ft.colors.WHITE54))
 
-        # Variable para controlar si el administrador está logueado
-        self.is_logged_in = False # Por defecto, no logueado. Este estado será actualizado por MainView.
+        # Token de la sesión del administrador (None si no hay sesión). Lo establece iniciar_sesion().
+        self.session_token = None
+
+        # Se incrementa al cambiar de sección (o recargar el dashboard); las tareas en segundo plano de
+        # la sección anterior (widgets del dashboard, refresco de tablas) comparan su valor y terminan
+        self._seccion_generacion = 0
+        self._detener_tareas = threading.Event() # Se activa al desconectarse la sesión (detener_tareas)
 
         self.page.title = "Panel de Administración - La Mejor Pizzería"
         self.page.vertical_alignment = ft.CrossAxisAlignment.START
@@ -180,6 +200,30 @@ class AdminView(ft.View):
         # No se llama a .update() dentro de esta función ni en las que llama directamente.
         # self._load_initial_admin_section() # Eliminado. La MainView activará la carga del dashboard.
 
+    @property
+    def is_logged_in(self) -> bool:
+        """True si el token de sesión es válido y no ha expirado (renueva su expiración)."""
+        return self.session_store.validar(self.session_token) is not None
+
+    def iniciar_sesion(self, admin_user):
+        """
+        Crea una sesión para el administrador autenticado.
+
+        Args:
+            admin_user (Administrador): El administrador que inició sesión.
+
+        Returns:
+            bool: True si la sesión se creó correctamente.
+        """
+        self.session_store.revocar(self.session_token) # Una sesión por página
+        self.session_token = self.session_store.crear(admin_user.id, admin_user.usuario)
+        return self.session_token is not None
+
+    def cerrar_sesion(self):
+        """Revoca la sesión actual del administrador."""
+        self.session_store.revocar(self.session_token)
+        self.session_token = None
+
     def _load_initial_admin_section(self):
         """Carga la sección de login o el dashboard si ya está logueado.
            Ahora esta función es llamada externamente por MainView."""
@@ -190,10 +234,12 @@ class AdminView(ft.View):
             self._load_admin_login_form()
         # El page.update() en main.py o la llamada externa se encargará de esto.
 
+    @batched
     def _logout(self, e):
         """Cierra la sesión del administrador y regresa a la vista principal."""
         logger.info("Cerrando sesión de administrador.")
-        self.is_logged_in = False # Establecer el estado a no logueado
+        self.cerrar_sesion() # Revocar el token de sesión
+        self._seccion_generacion += 1
         show_snackbar(self.page, "Sesión de administrador cerrada.", ft.colors.AMBER_700)
         
         # Limpiar campos de login (sin llamar a .update() individualmente)
@@ -207,22 +253,24 @@ class AdminView(ft.View):
         # Redirige a la ruta principal de la aplicación.
         # Esto automáticamente limpiará la vista actual y cargará la MainView.
         self.page.go("/") 
-        self.page.update() # Actualiza la página completa, incluyendo la nueva vista
+        request_page_update(self.page) # Actualiza la página completa, incluyendo la nueva vista
 
+    @batched
     def _on_navigation_change(self, e):
         """Maneja el cambio de selección en la barra de navegación lateral del administrador."""
-        logger.info(f"Navegación de administrador seleccionada: {e.control.selected_index}")
+        logger.info("Navegación de administrador seleccionada: %s", e.control.selected_index)
         # Solo permitir navegación si el administrador está logueado
         if not self.is_logged_in:
             logger.warning("Intento de navegación sin sesión iniciada en AdminView.")
             show_snackbar(self.page, "Por favor, inicia sesión para acceder a las funciones de administración.", ft.colors.RED_500)
             self._load_admin_login_form() # Siempre redirige al formulario de login
             self.navigation_rail.selected_index = None # Deseleccionar cualquier opción
-            self.admin_content_area.update() # Mantenemos update aquí, ya que la vista ya debería estar en la página
-            self.page.update()
+            mark_dirty(self.page, self.admin_content_area) # Mantenemos update aquí, ya que la vista ya debería estar en la página
+            request_page_update(self.page)
             return
 
         self.navigation_rail.selected_index = e.control.selected_index
+        self._seccion_generacion += 1 # Las tareas en segundo plano de la sección anterior terminan
         if self.navigation_rail.selected_index == 0:
             self._load_dashboard_section()
         elif self.navigation_rail.selected_index == 1:
@@ -238,8 +286,8 @@ class AdminView(ft.View):
         elif self.navigation_rail.selected_index == 6:
             self._load_admin_management()
         
-        self.admin_content_area.update() # Mantenemos update aquí, ya que la vista ya debería estar en la página
-        self.page.update()
+        mark_dirty(self.page, self.admin_content_area) # Mantenemos update aquí, ya que la vista ya debería estar en la página
+        request_page_update(self.page)
 
     # --- Sección de Login de Administrador ---
     def _load_admin_login_form(self):
@@ -268,6 +316,7 @@ class AdminView(ft.View):
         # es quien finalmente actualiza la vista después de que se añade.
         # self.admin_content_area.update() # Eliminado.
 
+    @batched
     def _admin_login_from_admin_view(self, e):
         """
         Maneja la lógica de inicio de sesión del administrador cuando se intenta desde AdminView.
@@ -275,27 +324,29 @@ class AdminView(ft.View):
         username = self.admin_username_field.value
         password = self.admin_password_field.value
 
-        logger.info(f"Intento de login (desde AdminView) para usuario: {username}")
+        logger.info("Intento de login (desde AdminView) para usuario: %s", username)
 
         if not username or not password:
             show_snackbar(self.page, "Por favor, ingresa usuario y contraseña.", ft.colors.RED_500)
             logger.warning("Intento de login (desde AdminView) fallido: campos vacíos.")
             return
 
-        admin_user = self.administrador_service.get_administrador_by_usuario(username)
+        resultado = self.administrador_service.autenticar(username, password, self.page.client_ip)
+        admin_user = resultado.admin
 
-        if admin_user and self.administrador_service.check_password(password, admin_user.contrasena_hash):
-            self.is_logged_in = True # Marcar como logueado
-            logger.info(f"Login exitoso (desde AdminView) para el usuario: {username}")
+        if resultado.bloqueado:
+            show_snackbar(self.page, f"Demasiados intentos de inicio de sesión. Inténtalo de nuevo en {max(1, int(resultado.reintentar_en))} segundos.", ft.colors.RED_500)
+        elif admin_user and self.iniciar_sesion(admin_user):
+            logger.info("Login exitoso (desde AdminView) para el usuario: %s", username)
             show_snackbar(self.page, f"¡Bienvenido, {admin_user.usuario}! Sesión iniciada.", ft.colors.GREEN_500)
             self._load_dashboard_section() # Cargar el dashboard después del login
             self.navigation_rail.selected_index = 0 # Asegurarse de que el dashboard esté seleccionado
         else:
-            logger.warning(f"Login (desde AdminView) fallido para el usuario: {username}. Credenciales incorrectas.")
+            logger.warning("Login (desde AdminView) fallido para el usuario: %s. Credenciales incorrectas.", username)
             show_snackbar(self.page, "Usuario o contraseña incorrectos.", ft.colors.RED_500)
-        self.admin_content_area.update() # Mantenemos update aquí para el caso de fallo y éxito,
+        mark_dirty(self.page, self.admin_content_area) # Mantenemos update aquí para el caso de fallo y éxito,
                                          # ya que la vista ya está en la página después del primer render.
-        self.page.update()
+        request_page_update(self.page)
 
     # --- Secciones de Gestión (Solo accesibles si is_logged_in es True) ---
 
@@ -312,69 +363,206 @@ class AdminView(ft.View):
         
         self.admin_content_area.controls.clear()
 
-        # Datos de ejemplo o fetched de servicios
-        total_clientes = self.cliente_service.get_all_clientes()
-        num_clientes = len(total_clientes) if total_clientes else 0
-
-        total_pedidos = self.pedido_service.get_all_pedidos()
-        num_pedidos_pendientes = len([p for p in total_pedidos if p.estado == 'Pendiente']) if total_pedidos else 0
-        num_pedidos_completados = len([p for p in total_pedidos if p.estado == 'Entregado']) if total_pedidos else 0
+        # Cada tarjeta y el gráfico se muestran de inmediato con un indicador de carga y se completan
+        # cuando llega su consulta. Las consultas se ejecutan en paralelo en _dashboard_executor, así que
+        # el dashboard tarda lo que la consulta más lenta y no la suma de todas.
+        self._seccion_generacion += 1
+        generacion = self._seccion_generacion
+
+        card_clientes, valor_clientes = self._crear_tarjeta_dashboard("Clientes Registrados", 250, 150)
+        card_pendientes, valor_pendientes = self._crear_tarjeta_dashboard("Pedidos Pendientes", 250, 150)
+        card_ingresos, valor_ingresos = self._crear_tarjeta_dashboard("Ingresos Hoy", 250, 150)
+        card_gastos, valor_gastos = self._crear_tarjeta_dashboard("Gastos Hoy", 250, 150)
+        card_balance, valor_balance = self._crear_tarjeta_dashboard("Balance Hoy", 200, 120)
+        card_completados, valor_completados = self._crear_tarjeta_dashboard("Pedidos Completados", 250, 150)
+        chart_container = ft.Container(
+            content=ft.ProgressRing(),
+            alignment=ft.alignment.center,
+            width=420, height=300, bgcolor=self.card_bg_color, border_radius=10
+        )
 
-        ingresos_hoy = self.financiero_service.get_total_ingresos(date.today(), date.today())
-        gastos_hoy = self.financiero_service.get_total_gastos(date.today(), date.today())
-        balance_hoy = ingresos_hoy - gastos_hoy
+        # Perfilado de acciones (diagnóstico de pantallas lentas): los perfiles se guardan en settings.PROFILE_DIR
+        switch_perfilado = ft.Switch(
+            label="Perfilar acciones", value=perfilador_acciones.activo,
+            tooltip=f"Guarda un perfil de cada acción de más de {perfilador_acciones.minimo_ms:.0f} ms en '{perfilador_acciones.directorio}'",
+            on_change=self._on_perfilado_change
+        )
 
-        # Ejemplo de datos para el gráfico (últimos 7 días)
-        # Esto sería más dinámico en una app real, calculando ingresos por día
-        sales_data = {
-            "Lun": 850, "Mar": 920, "Mié": 780, "Jue": 1100, "Vie": 1500, "Sáb": 1800, "Dom": 1600
-        }
-        
         self.admin_content_area.controls.append(
             ft.Column([
-                ft.Text("Dashboard de Administración", size=28, weight=ft.FontWeight.BOLD, color=self.text_color),
-                ft.Divider(color=ft.colors.BLUE_GREY_700),
-                ft.Row([
-                    CustomCard(
-                        title="Clientes Registrados",
-                        content=ft.Text(str(num_clientes), size=40, weight=ft.FontWeight.BOLD, color=self.text_color),
-                        width=250, height=150, bgcolor=self.card_bg_color, title_color=self.text_color
-                    ),
-                    CustomCard(
-                        title="Pedidos Pendientes",
-                        content=ft.Text(str(num_pedidos_pendientes), size=40, weight=ft.FontWeight.BOLD, color=self.text_color),
-                        width=250, height=150, bgcolor=self.card_bg_color, title_color=self.text_color
-                    ),
-                    CustomCard(
-                        title="Ingresos Hoy",
-                        content=ft.Text(f"${ingresos_hoy:,.2f}", size=40, weight=ft.FontWeight.BOLD, color=self.text_color),
-                        width=250, height=150, bgcolor=self.card_bg_color, title_color=self.text_color
-                    ),
-                ], alignment=ft.MainAxisAlignment.CENTER),
                 ft.Row([
-                    CustomCard(
-                        title="Gastos Hoy",
-                        content=ft.Text(f"${gastos_hoy:,.2f}", size=40, weight=ft.FontWeight.BOLD, color=self.text_color),
-                        width=250, height=150, bgcolor=self.card_bg_color, title_color=self.text_color
-                    ),
-                    CustomCard(
-                        title="Balance Hoy",
-                        content=ft.Text(f"${balance_hoy:,.2f}", size=30, weight=ft.FontWeight.BOLD, color=ft.colors.GREEN_700 if balance_hoy >= 0 else ft.colors.RED_700),
-                        width=200, height=120, bgcolor=self.card_bg_color, title_color=self.text_color
-                    ),
-                    CustomCard(
-                        title="Pedidos Completados",
-                        content=ft.Text(str(num_pedidos_completados), size=40, weight=ft.FontWeight.BOLD, color=self.text_color),
-                        width=250, height=150, bgcolor=self.card_bg_color, title_color=self.text_color
-                    ),
-                ], alignment=ft.MainAxisAlignment.CENTER),
-                create_simple_bar_chart(sales_data, "Ventas de la Semana (Ejemplo)", text_color=self.text_color, bar_color=ft.colors.GREEN_400, card_bgcolor=self.card_bg_color, title_color=self.text_color)
+                    ft.Text("Dashboard de Administración", size=28, weight=ft.FontWeight.BOLD, color=self.text_color),
+                    switch_perfilado
+                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                ft.Divider(color=ft.colors.BLUE_GREY_700),
+                ft.Row([card_clientes, card_pendientes, card_ingresos], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([card_gastos, card_balance, card_completados], alignment=ft.MainAxisAlignment.CENTER),
+                chart_container
             ],
             horizontal_alignment=ft.CrossAxisAlignment.CENTER,
             expand=True)
         )
+
+        def mostrar_clientes(num_clientes):
+            self._mostrar_valor_dashboard(valor_clientes, str(num_clientes))
+            return [valor_clientes]
+
+        def mostrar_pedidos(pedidos_por_estado):
+            self._mostrar_valor_dashboard(valor_pendientes, str(pedidos_por_estado.get('Pendiente', 0)))
+            self._mostrar_valor_dashboard(valor_completados, str(pedidos_por_estado.get('Entregado', 0)))
+            return [valor_pendientes, valor_completados]
+
+        def mostrar_totales_hoy(totales):
+            ingresos_hoy, gastos_hoy = totales['Ingreso'], totales['Gasto']
+            balance_hoy = ingresos_hoy - gastos_hoy
+            self._mostrar_valor_dashboard(valor_ingresos, f"${ingresos_hoy:,.2f}")
+            self._mostrar_valor_dashboard(valor_gastos, f"${gastos_hoy:,.2f}")
+            self._mostrar_valor_dashboard(valor_balance, f"${balance_hoy:,.2f}", size=30,
+                                          color=ft.colors.GREEN_700 if balance_hoy >= 0 else ft.colors.RED_700)
+            return [valor_ingresos, valor_gastos, valor_balance]
+
+        def mostrar_grafico(ingresos_por_dia):
+            dias_semana = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+            sales_data = {dias_semana[dia.weekday()]: total for dia, total in ingresos_por_dia.items()}
+            chart_container.content = create_simple_bar_chart(sales_data, "Ingresos de los Últimos 7 Días", text_color=self.text_color, bar_color=ft.colors.GREEN_400, card_bgcolor=self.card_bg_color, title_color=self.text_color)
+            chart_container.height = None
+            return [chart_container]
+
+        hoy = date.today()
+        self._cargar_widget_dashboard(generacion, self.cliente_service.count_clientes, mostrar_clientes, [valor_clientes])
+        self._cargar_widget_dashboard(generacion, self.pedido_service.count_pedidos_por_estado, mostrar_pedidos, [valor_pendientes, valor_completados])
+        self._cargar_widget_dashboard(generacion, lambda: self.financiero_service.get_totales_por_tipo(hoy, hoy), mostrar_totales_hoy, [valor_ingresos, valor_gastos, valor_balance])
+        self._cargar_widget_dashboard(generacion, lambda: self.financiero_service.get_ingresos_por_dia(hoy - timedelta(days=6), hoy), mostrar_grafico, [chart_container])
         # No self.admin_content_area.update() aquí.
 
+    @batched
+    def _on_perfilado_change(self, e):
+        """Activa o desactiva el perfilado de acciones del proceso."""
+        perfilador_acciones.activar(e.control.value)
+        estado = "activado" if e.control.value else "desactivado"
+        show_snackbar(self.page, f"Perfilado de acciones {estado}. Carpeta: {perfilador_acciones.directorio}", ft.colors.BLUE_GREY_600)
+
+    def _crear_tarjeta_dashboard(self, title: str, width: int, height: int):
+        """
+        Crea una tarjeta del dashboard con un indicador de carga en lugar del valor.
+
+        Returns:
+            tuple[CustomCard, ft.Container]: La tarjeta y el contenedor donde se mostrará el valor.
+        """
+        valor = ft.Container(content=ft.ProgressRing(width=32, height=32), alignment=ft.alignment.center)
+        card = CustomCard(title=title, content=valor, width=width, height=height, bgcolor=self.card_bg_color, title_color=self.text_color)
+        return card, valor
+
+    def _mostrar_valor_dashboard(self, contenedor: ft.Container, texto: str, size: int = 40, color: str = None):
+        """Reemplaza el indicador de carga de una tarjeta del dashboard por su valor."""
+        contenedor.content = ft.Text(texto, size=size, weight=ft.FontWeight.BOLD, color=color or self.text_color)
+
+    def _cargar_widget_dashboard(self, generacion: int, cargar, mostrar, controles: list):
+        """
+        Ejecuta 'cargar()' en el pool del dashboard y, al terminar, llama a 'mostrar(resultado)',
+        que rellena los controles y retorna los que deben actualizarse.
+        Si entretanto se navegó a otra sección (o se recargó el dashboard) el resultado se descarta.
+
+        Args:
+            generacion (int): Valor de self._seccion_generacion al solicitar los datos.
+            cargar (callable): Consulta sin argumentos; retorna None si ocurre un error.
+            mostrar (callable): Rellena los controles con el resultado.
+            controles (list): Contenedores que muestran un error si la consulta falla.
+        """
+        def al_terminar(future):
+            if generacion != self._seccion_generacion:
+                return # El dashboard ya no está visible
+            try:
+                resultado = future.result()
+            except Exception as e:
+                logger.error("Error al cargar un widget del dashboard: %s", e)
+                resultado = None
+            if resultado is None:
+                for contenedor in controles:
+                    contenedor.content = ft.Icon(ft.icons.ERROR_OUTLINE, color=ft.colors.RED_400, tooltip="No se pudieron cargar los datos.")
+                actualizados = controles
+            else:
+                actualizados = mostrar(resultado)
+            # Se envían siempre: control.page solo se asigna cuando termina el envío del manejador, así que
+            # un control sin página puede pertenecer a un diff ya construido sin este contenido. Si alguno
+            # aún no está en la página, UpdateBatcher hace un page.update() completo.
+            mark_dirty(self.page, *actualizados)
+
+        # El contexto del manejador acompaña a la carga (sesión de la interfaz para leer sus propias escrituras)
+        _dashboard_executor.submit(contextvars.copy_context().run, cargar).add_done_callback(al_terminar)
+
+    def _iniciar_refresco_tabla(self, tabla: VirtualDataTable, cargar_cambios, convertir_fila):
+        """
+        Refresca periódicamente una tabla virtualizada mientras su sección esté visible: cada
+        settings.ADMIN_REFRESH_INTERVAL segundos pide solo las filas modificadas desde la última
+        consulta (cursor sobre fecha_actualizacion) y reemplaza las que están cargadas, así que el
+        costo depende de la cantidad de cambios y no del tamaño de la tabla.
+        Si hay registros nuevos y se están viendo las primeras filas, o hubo demasiados cambios,
+        la tabla se recarga. Los registros eliminados desaparecen al recargar la tabla.
+
+        Args:
+            tabla (VirtualDataTable): La tabla a refrescar.
+            cargar_cambios (callable): Método *_changed_since(desde, limit) del servicio.
+            convertir_fila (callable): Convierte una instancia del modelo en una fila de la tabla.
+        """
+        intervalo = settings.ADMIN_REFRESH_INTERVAL
+        if intervalo <= 0:
+            return
+        limite = settings.ADMIN_REFRESH_LIMIT
+        margen = timedelta(seconds=settings.ADMIN_REFRESH_MARGEN_SEGUNDOS)
+        generacion = self._seccion_generacion
+
+        def refrescar():
+            _, cursor = cargar_cambios(None, limite) # Última modificación al abrir la sección
+            recargada = False # True tras una recarga completa, hasta que el cursor vuelva a avanzar
+            aplicadas = {} # id -> fecha_actualizacion ya mostrada (filas dentro del margen)
+            while not self._detener_tareas.wait(intervalo):
+                if generacion != self._seccion_generacion or not self.session_token:
+                    return # Se cambió de sección o se cerró la sesión
+                # Se consulta con un margen hacia atrás: una transacción larga puede confirmar
+                # filas con una marca anterior al cursor. Tras una recarga completa el cursor ya es la
+                # última modificación que muestra la tabla y el solape no se vuelve a leer.
+                if not cursor:
+                    desde = datetime.min # Tabla vacía al abrir la sección
+                else:
+                    desde = cursor if recargada else cursor - margen
+                filas, nuevo_cursor = cargar_cambios(desde, limite)
+                if filas is None or generacion != self._seccion_generacion:
+                    continue
+                try:
+                    if len(filas) >= limite:
+                        # Demasiados cambios (la página puede estar llena de filas ya aplicadas y dejar
+                        # fuera las posteriores): se recarga la ventana visible y el cursor salta a la
+                        # última modificación actual, sin volver a leer el solape que la recarga ya incluye
+                        _, ultima = cargar_cambios(None, limite)
+                        if ultima and (not cursor or ultima > cursor):
+                            cursor = ultima
+                        recargada = True
+                        aplicadas = {}
+                        tabla.reload()
+                        continue
+                    nuevas = [f for f in filas if aplicadas.get(f.id) != f.fecha_actualizacion]
+                    if not nuevas:
+                        continue
+                    if not cursor or nuevo_cursor > cursor:
+                        cursor, recargada = nuevo_cursor, False
+                    for f in nuevas:
+                        aplicadas[f.id] = f.fecha_actualizacion
+                    aplicadas = {i: ts for i, ts in aplicadas.items() if ts >= cursor - margen}
+                    faltantes = tabla.patch_rows([convertir_fila(f) for f in nuevas])
+                    if faltantes and tabla.is_at_top:
+                        tabla.reload()
+                    logger.debug("Refresco de tabla: %s filas modificadas, %s no cargadas.", len(nuevas), len(faltantes))
+                except Exception as e:
+                    logger.error("Error al refrescar la tabla del panel de administración: %s", e)
+                    return
+
+        threading.Thread(target=contextvars.copy_context().run, args=(refrescar,), name="admin-refresco", daemon=True).start()
+
+    def detener_tareas(self):
+        """Detiene las tareas en segundo plano de la vista (llamar al desconectarse la sesión)."""
+        self._detener_tareas.set()
+
     def _load_menu_management(self):
         """Carga la sección para gestionar el menú (categorías e ítems)."""
         logger.info("Cargando sección de gestión de Menú.")
@@ -476,11 +664,12 @@ class AdminView(ft.View):
                 width=1000
             )
         )
-        self.admin_content_area.update()
+        mark_dirty(self.page, self.admin_content_area)
     
+    @batched
     def _open_add_edit_categoria_dialog(self, e, category_id=None):
         """Abre un diálogo para añadir o editar una categoría."""
-        logger.info(f"Abriendo diálogo para {'editar' if category_id else 'añadir'} categoría. ID: {category_id}")
+        logger.info("Abriendo diálogo para %s categoría. ID: %s", ('editar' if category_id else 'añadir'), category_id)
         # Solo cargar si está logueado
         if not self.is_logged_in:
             self._load_admin_login_form()
@@ -492,7 +681,7 @@ class AdminView(ft.View):
             current_category = self.menu_service.get_categoria_by_id(category_id)
             if not current_category:
                 show_snackbar(self.page, "Categoría no encontrada.", ft.colors.RED_500)
-                logger.warning(f"Intento de editar categoría con ID {category_id} no encontrada.")
+                logger.warning("Intento de editar categoría con ID %s no encontrada.", category_id)
                 return
 
         nombre_field = ft.TextField(
@@ -507,7 +696,7 @@ class AdminView(ft.View):
         )
 
         def save_categoria(e):
-            logger.info(f"Intentando {'actualizar' if is_edit_mode else 'guardar nueva'} categoría.")
+            logger.info("Intentando %s categoría.", ('actualizar' if is_edit_mode else 'guardar nueva'))
             if not nombre_field.value:
                 show_snackbar(self.page, "El nombre de la categoría es requerido.", ft.colors.RED_500)
                 logger.warning("Fallo al guardar categoría: nombre vacío.")
@@ -519,15 +708,15 @@ class AdminView(ft.View):
                 updated_cat = self.menu_service.update_categoria(current_category)
                 if updated_cat:
                     show_snackbar(self.page, f"Categoría '{updated_cat.nombre}' actualizada con éxito.", ft.colors.GREEN_500)
-                    logger.info(f"Categoría '{updated_cat.nombre}' actualizada con éxito (ID: {updated_cat.id}).")
+                    logger.info("Categoría '%s' actualizada con éxito (ID: %s).", updated_cat.nombre, updated_cat.id)
                 else:
                     show_snackbar(self.page, "Error al actualizar la categoría.", ft.colors.RED_500)
-                    logger.error(f"Error al actualizar la categoría con ID {category_id}.")
+                    logger.error("Error al actualizar la categoría con ID %s.", category_id)
             else:
                 new_cat = self.menu_service.add_categoria(nombre_field.value, descripcion_field.value)
                 if new_cat:
                     show_snackbar(self.page, f"Categoría '{new_cat.nombre}' añadida con éxito.", ft.colors.GREEN_500)
-                    logger.info(f"Categoría '{new_cat.nombre}' añadida con éxito (ID: {new_cat.id}).")
+                    logger.info("Categoría '%s' añadida con éxito (ID: %s).", new_cat.nombre, new_cat.id)
                 else:
                     show_snackbar(self.page, "Error al añadir la categoría.", ft.colors.RED_500)
                     logger.error("Error al añadir la categoría.")
@@ -544,7 +733,7 @@ class AdminView(ft.View):
             ], spacing=10),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda e: self.page.close(dialog)),
-                ft.ElevatedButton("Guardar", on_click=save_categoria)
+                ft.ElevatedButton("Guardar", on_click=batched(save_categoria, self.page))
             ],
             actions_alignment=ft.MainAxisAlignment.END,
             bgcolor=self.card_bg_color, # Fondo del diálogo
@@ -552,11 +741,12 @@ class AdminView(ft.View):
         )
         self.page.open(dialog)
         dialog.open = True
-        self.page.update()
+        request_page_update(self.page)
 
+    @batched
     def _confirm_delete_categoria(self, e, category_id: int):
         """Muestra un diálogo de confirmación antes de eliminar una categoría."""
-        logger.info(f"Confirmación de eliminación para categoría ID: {category_id}.")
+        logger.info("Confirmación de eliminación para categoría ID: %s.", category_id)
         # Solo cargar si está logueado
         if not self.is_logged_in:
             self._load_admin_login_form()
@@ -565,19 +755,19 @@ class AdminView(ft.View):
         category_to_delete = self.menu_service.get_categoria_by_id(category_id)
         if not category_to_delete:
             show_snackbar(self.page, "Categoría no encontrada para eliminar.", ft.colors.RED_500)
-            logger.warning(f"Intento de eliminar categoría con ID {category_id} no encontrada.")
+            logger.warning("Intento de eliminar categoría con ID %s no encontrada.", category_id)
             return
 
         def delete_confirmed(e):
-            logger.info(f"Eliminando categoría ID: {category_id}.")
+            logger.info("Eliminando categoría ID: %s.", category_id)
             result = self.menu_service.delete_categoria(category_to_delete)
             if result:
                 show_snackbar(self.page, f"Categoría '{category_to_delete.nombre}' eliminada con éxito.", ft.colors.GREEN_500)
-                logger.info(f"Categoría '{category_to_delete.nombre}' eliminada con éxito (ID: {category_to_delete.id}).")
+                logger.info("Categoría '%s' eliminada con éxito (ID: %s).", category_to_delete.nombre, category_to_delete.id)
                 self._load_menu_management() # Recarga la sección para mostrar los cambios
             else:
                 show_snackbar(self.page, "Error al eliminar la categoría.", ft.colors.RED_500)
-                logger.error(f"Error al eliminar la categoría con ID {category_id}.")
+                logger.error("Error al eliminar la categoría con ID %s.", category_id)
             self.page.close(confirm_dialog) # Cierra el diálogo
 
         confirm_dialog = ft.AlertDialog(
@@ -586,7 +776,7 @@ class AdminView(ft.View):
             content=ft.Text(f"¿Estás seguro de que quieres eliminar la categoría '{category_to_delete.nombre}'? Esta acción no se puede deshacer.", color=self.text_color),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda e: self.page.close(confirm_dialog)),
-                ft.ElevatedButton("Eliminar", on_click=delete_confirmed, style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
+                ft.ElevatedButton("Eliminar", on_click=batched(delete_confirmed, self.page), style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
             ],
             actions_alignment=ft.MainAxisAlignment.END,
             bgcolor=self.card_bg_color,
@@ -594,11 +784,12 @@ class AdminView(ft.View):
         )
         self.page.open(confirm_dialog)
         confirm_dialog.open = True
-        self.page.update()
+        request_page_update(self.page)
 
+    @batched
     def _open_add_edit_item_dialog(self, e, item_id=None):
         """Abre un diálogo para añadir o editar un ítem del menú."""
-        logger.info(f"Abriendo diálogo para {'editar' if item_id else 'añadir'} ítem del menú. ID: {item_id}")
+        logger.info("Abriendo diálogo para %s ítem del menú. ID: %s", ('editar' if item_id else 'añadir'), item_id)
         # Solo cargar si está logueado
         if not self.is_logged_in:
             self._load_admin_login_form()
@@ -610,7 +801,7 @@ class AdminView(ft.View):
             current_item = self.menu_service.get_item_menu_by_id(item_id)
             if not current_item:
                 show_snackbar(self.page, "Ítem del menú no encontrado.", ft.colors.RED_500)
-                logger.warning(f"Intento de editar ítem con ID {item_id} no encontrado.")
+                logger.warning("Intento de editar ítem con ID %s no encontrado.", item_id)
                 return
 
         nombre_field = ft.TextField(
@@ -656,7 +847,7 @@ class AdminView(ft.View):
         )
 
         def save_item(e):
-            logger.info(f"Intentando {'actualizar' if is_edit_mode else 'guardar nuevo'} ítem del menú.")
+            logger.info("Intentando %s ítem del menú.", ('actualizar' if is_edit_mode else 'guardar nuevo'))
             try:
                 precio = float(precio_field.value)
             except ValueError:
@@ -679,10 +870,10 @@ class AdminView(ft.View):
                 updated_item = self.menu_service.update_item_menu(current_item)
                 if updated_item:
                     show_snackbar(self.page, f"Ítem '{updated_item.nombre}' actualizado con éxito.", ft.colors.GREEN_500)
-                    logger.info(f"Ítem '{updated_item.nombre}' actualizado con éxito (ID: {updated_item.id}).")
+                    logger.info("Ítem '%s' actualizado con éxito (ID: %s).", updated_item.nombre, updated_item.id)
                 else:
                     show_snackbar(self.page, "Error al actualizar el ítem.", ft.colors.RED_500)
-                    logger.error(f"Error al actualizar el ítem con ID {item_id}.")
+                    logger.error("Error al actualizar el ítem con ID %s.", item_id)
             else:
                 new_item = self.menu_service.add_item_menu(
                     nombre=nombre_field.value,
@@ -694,7 +885,7 @@ class AdminView(ft.View):
                 )
                 if new_item:
                     show_snackbar(self.page, f"Ítem '{new_item.nombre}' añadido con éxito.", ft.colors.GREEN_500)
-                    logger.info(f"Ítem '{new_item.nombre}' añadido con éxito (ID: {new_item.id}).")
+                    logger.info("Ítem '%s' añadido con éxito (ID: %s).", new_item.nombre, new_item.id)
                 else:
                     show_snackbar(self.page, "Error al añadir el ítem.", ft.colors.RED_500)
                     logger.error("Error al añadir el ítem del menú.")
@@ -715,7 +906,7 @@ class AdminView(ft.View):
             ], spacing=10),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda e: self.page.close(dialog)),
-                ft.ElevatedButton("Guardar", on_click=save_item)
+                ft.ElevatedButton("Guardar", on_click=batched(save_item, self.page))
             ],
             actions_alignment=ft.MainAxisAlignment.END,
             bgcolor=self.card_bg_color, # Fondo del diálogo
@@ -723,11 +914,12 @@ class AdminView(ft.View):
         )
         self.page.open(dialog)
         dialog.open = True
-        self.page.update()
+        request_page_update(self.page)
 
+    @batched
     def _confirm_delete_item(self, e, item_id: int):
         """Muestra un diálogo de confirmación antes de eliminar un ítem del menú."""
-        logger.info(f"Confirmación de eliminación para ítem ID: {item_id}.")
+        logger.info("Confirmación de eliminación para ítem ID: %s.", item_id)
         # Solo cargar si está logueado
         if not self.is_logged_in:
             self._load_admin_login_form()
@@ -736,19 +928,19 @@ class AdminView(ft.View):
         item_to_delete = self.menu_service.get_item_menu_by_id(item_id)
         if not item_to_delete:
             show_snackbar(self.page, "Ítem del menú no encontrado para eliminar.", ft.colors.RED_500)
-            logger.warning(f"Intento de eliminar ítem con ID {item_id} no encontrado.")
+            logger.warning("Intento de eliminar ítem con ID %s no encontrado.", item_id)
             return
 
         def delete_confirmed(e):
-            logger.info(f"Eliminando ítem ID: {item_id}.")
+            logger.info("Eliminando ítem ID: %s.", item_id)
             result = self.menu_service.delete_item_menu(item_to_delete)
             if result:
                 show_snackbar(self.page, f"Ítem '{item_to_delete.nombre}' eliminado con éxito.", ft.colors.GREEN_500)
-                logger.info(f"Ítem '{item_to_delete.nombre}' eliminado con éxito (ID: {item_to_delete.id}).")
+                logger.info("Ítem '%s' eliminado con éxito (ID: %s).", item_to_delete.nombre, item_to_delete.id)
                 self._load_menu_management() # Recarga la sección para mostrar los cambios
             else:
                 show_snackbar(self.page, "Error al eliminar el ítem.", ft.colors.RED_500)
-                logger.error(f"Error al eliminar el ítem con ID {item_id}.")
+                logger.error("Error al eliminar el ítem con ID %s.", item_id)
             self.page.close(confirm_dialog) # Cierra el diálogo
 
         confirm_dialog = ft.AlertDialog(
@@ -757,7 +949,7 @@ class AdminView(ft.View):
             content=ft.Text(f"¿Estás seguro de que quieres eliminar el ítem '{item_to_delete.nombre}'? Esta acción no se puede deshacer.", color=self.text_color),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda e: self.page.close(confirm_dialog)),
-                ft.ElevatedButton("Eliminar", on_click=delete_confirmed, style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
+                ft.ElevatedButton("Eliminar", on_click=batched(delete_confirmed, self.page), style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
             ],
             actions_alignment=ft.MainAxisAlignment.END,
             bgcolor=self.card_bg_color,
@@ -765,7 +957,7 @@ class AdminView(ft.View):
         )
         self.page.open(confirm_dialog)
         confirm_dialog.open = True
-        self.page.update()
+        request_page_update(self.page)
 
     def _load_client_management(self):
         """Carga la sección para gestionar clientes."""
@@ -774,30 +966,30 @@ class AdminView(ft.View):
             self._load_admin_login_form()
             return
         self.admin_content_area.controls.clear()
-        
-        clientes = self.cliente_service.get_all_clientes()
-        client_columns = ["ID", "Nombre", "Email", "Teléfono", "Dirección", "Registro", "Acciones"] # Añadida columna de Acciones
-        client_rows = []
-        if clientes:
-            for client in clientes:
-                reg_date = client.fecha_registro.strftime("%Y-%m-%d %H:%M") if client.fecha_registro else "N/A"
-                client_rows.append([
-                    str(client.id), client.nombre, client.email if client.email else "N/A",
-                    client.telefono if client.telefono else "N/A",
-                    client.direccion, reg_date,
-                    ft.Row([
-                        # ft.IconButton(
-                        #     icon=ft.icons.EDIT,
-                        #     tooltip="Editar Cliente",
-                        #     on_click=lambda e, client_id=client.id: show_snackbar(self.page, f"Editar cliente {client_id} - implementar.")
-                        # ),
-                        ft.IconButton(
-                            icon=ft.icons.DELETE,
-                            tooltip="Eliminar Cliente",
-                            on_click=lambda e, client_id=client.id: self._confirm_delete_client(e, client_id)
-                        )
-                    ])
-                ])
+
+        # Búsqueda difusa con debounce: solo consulta cuando el usuario deja de escribir
+        self.client_search_field = create_search_field(
+            self._on_client_search,
+            label="Buscar cliente",
+            hint_text="Nombre, email o teléfono",
+            fill_color=self.textfield_fill_color,
+            text_color=self.text_color,
+            width=500
+        )
+        self.client_results_info = ft.Text("", size=14, color=ft.colors.WHITE70)
+        self._client_search_results = None # (término, clientes) de la última búsqueda, para paginarla sin repetirla
+        # Tabla virtualizada: sin término de búsqueda pagina todos los clientes (orden en el servidor)
+        self.client_table = VirtualDataTable(
+            ["ID", "Nombre", "Email", "Teléfono", "Dirección", "Registro", "Pedidos", "Total Gastado", "Última Compra", "Acciones"],
+            self._fetch_client_rows,
+            column_widths=[60, 160, 180, 130, 200, 130, 80, 120, 110, 80],
+            sort_keys={"ID": "id", "Nombre": "nombre", "Email": "email", "Registro": "registro"},
+            sort_key="registro",
+            sort_with_filter=False, # Los resultados de la búsqueda se muestran por relevancia
+            heading_row_bgcolor=ft.colors.BLUE_GREY_700,
+            border_color=ft.colors.BLUE_GREY_700,
+            text_color=self.text_color
+        )
 
         self.admin_content_area.controls.append(
             CustomCard(
@@ -806,11 +998,9 @@ class AdminView(ft.View):
                 bgcolor=self.card_bg_color,
                 content=ft.Column([
                     ft.Text("Gestiona los clientes registrados en tu pizzería.", size=16, color=self.text_color),
-                    create_data_table(client_columns, client_rows,
-                                      heading_row_bgcolor=ft.colors.BLUE_GREY_700,
-                                      data_row_bgcolor_hover=ft.colors.BLUE_GREY_800,
-                                      border_color=ft.colors.BLUE_GREY_700,
-                                      text_color=self.text_color),
+                    self.client_search_field,
+                    self.client_results_info,
+                    self.client_table,
                     ft.Row([
                         # ft.ElevatedButton("Añadir Cliente", on_click=lambda e: show_snackbar(self.page, "Añadir cliente - implementar.")),
                         # ft.ElevatedButton("Editar Cliente", on_click=lambda e: show_snackbar(self.page, "Editar cliente - implementar.")),
@@ -819,11 +1009,63 @@ class AdminView(ft.View):
                 width=1000
             )
         )
-        self.admin_content_area.update()
+        mark_dirty(self.page, self.admin_content_area)
+
+    @batched
+    def _on_client_search(self, query: str):
+        """Ejecuta la búsqueda de clientes (llamado por el campo con debounce) y refresca solo la tabla."""
+        if not self.is_logged_in:
+            return
+        logger.info("Buscando clientes: '%s'", query)
+        self.client_table.set_filter(query)
+        mark_dirty(self.page, self.client_results_info)
 
+    def _fetch_client_rows(self, offset: int, limit: int, sort_key: str, descending: bool, query: str, with_total: bool):
+        """
+        Fuente de datos de la tabla de clientes. Sin término de búsqueda pagina todos los clientes;
+        con término usa la búsqueda difusa (resultado ya limitado y ordenado por relevancia), que se
+        ejecuta una vez al cargar la primera página: el desplazamiento pagina el resultado guardado.
+        """
+        if query:
+            busqueda = self._client_search_results
+            if with_total or busqueda is None or busqueda[0] != query:
+                busqueda = self._client_search_results = (query, self.cliente_service.search_clientes(query) or [])
+            resultados = busqueda[1]
+            clientes, total = resultados[offset:offset + limit], len(resultados)
+            self.client_results_info.value = f"{total} resultado(s) más relevantes para '{query}'."
+        else:
+            self._client_search_results = None
+            clientes, total = self.cliente_service.get_clientes_page(offset, limit, sort_key, descending, with_total)
+            if total is not None:
+                self.client_results_info.value = f"{total} clientes registrados. Usa el buscador para encontrar uno en particular."
+        if not clientes:
+            return [], total
+
+        # Métricas precalculadas (cliente_metricas): una sola consulta para los clientes de la página
+        metricas = self.metricas_cliente_service.get_metricas_por_clientes([c.id for c in clientes])
+        client_rows = []
+        for client in clientes:
+            reg_date = client.fecha_registro.strftime("%Y-%m-%d %H:%M") if client.fecha_registro else "N/A"
+            metrica = metricas.get(client.id)
+            client_rows.append([
+                str(client.id), client.nombre, client.email if client.email else "N/A",
+                client.telefono if client.telefono else "N/A",
+                client.direccion, reg_date,
+                str(metrica.num_pedidos) if metrica else "0",
+                f"${metrica.total_gastado:,.2f}" if metrica else "$0.00",
+                metrica.ultima_compra.strftime("%Y-%m-%d") if metrica and metrica.ultima_compra else "N/A",
+                ft.IconButton(
+                    icon=ft.icons.DELETE,
+                    tooltip="Eliminar Cliente",
+                    on_click=lambda e, client_id=client.id: self._confirm_delete_client(e, client_id)
+                )
+            ])
+        return client_rows, total
+
+    @batched
     def _confirm_delete_client(self, e, client_id: int):
         """Muestra un diálogo de confirmación antes de eliminar un cliente."""
-        logger.info(f"Confirmación de eliminación para cliente ID: {client_id}.")
+        logger.info("Confirmación de eliminación para cliente ID: %s.", client_id)
         if not self.is_logged_in:
             self._load_admin_login_form()
             return
@@ -831,19 +1073,19 @@ class AdminView(ft.View):
         client_to_delete = self.cliente_service.get_cliente_by_id(client_id)
         if not client_to_delete:
             show_snackbar(self.page, "Cliente no encontrado para eliminar.", ft.colors.RED_500)
-            logger.warning(f"Intento de eliminar cliente con ID {client_id} no encontrado.")
+            logger.warning("Intento de eliminar cliente con ID %s no encontrado.", client_id)
             return
 
         def delete_confirmed(e):
-            logger.info(f"Eliminando cliente ID: {client_id}.")
+            logger.info("Eliminando cliente ID: %s.", client_id)
             result = self.cliente_service.delete_cliente(client_to_delete)
             if result:
                 show_snackbar(self.page, f"Cliente '{client_to_delete.nombre}' eliminado con éxito.", ft.colors.GREEN_500)
-                logger.info(f"Cliente '{client_to_delete.nombre}' eliminado con éxito (ID: {client_to_delete.id}).")
+                logger.info("Cliente '%s' eliminado con éxito (ID: %s).", client_to_delete.nombre, client_to_delete.id)
                 self._load_client_management() # Recarga la sección para mostrar los cambios
             else:
                 show_snackbar(self.page, "Error al eliminar el cliente.", ft.colors.RED_500)
-                logger.error(f"Error al eliminar el cliente con ID {client_id}.")
+                logger.error("Error al eliminar el cliente con ID %s.", client_id)
             self.page.close(confirm_dialog)
 
         confirm_dialog = ft.AlertDialog(
@@ -852,7 +1094,7 @@ class AdminView(ft.View):
             content=ft.Text(f"¿Estás seguro de que quieres eliminar al cliente '{client_to_delete.nombre}'? Esto también puede afectar pedidos asociados.", color=self.text_color),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda e: self.page.close(confirm_dialog)),
-                ft.ElevatedButton("Eliminar", on_click=delete_confirmed, style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
+                ft.ElevatedButton("Eliminar", on_click=batched(delete_confirmed, self.page), style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
             ],
             actions_alignment=ft.MainAxisAlignment.END,
             bgcolor=self.card_bg_color,
@@ -860,7 +1102,7 @@ class AdminView(ft.View):
         )
         self.page.open(confirm_dialog)
         confirm_dialog.open = True
-        self.page.update()
+        request_page_update(self.page)
 
     def _load_order_management(self):
         """Carga la sección para gestionar pedidos."""
@@ -870,31 +1112,25 @@ class AdminView(ft.View):
             return
         self.admin_content_area.controls.clear()
         
-        pedidos = self.pedido_service.get_all_pedidos()
-        order_columns = ["ID", "Cliente", "Fecha/Hora", "Total", "Estado", "Método de Pago", "Dirección", "Acciones"] # Añadida columna de Método de Pago
-        order_rows = []
-        if pedidos:
-            for order in pedidos:
-                client_name = order.cliente.nombre if order.cliente else "Desconocido"
-                order_date_time = order.fecha_hora.strftime("%Y-%m-%d %H:%M") if order.fecha_hora else "N/A"
-                order_rows.append([
-                    str(order.id), client_name, order_date_time,
-                    f"${order.total:,.2f}", order.estado,
-                    order.metodo_pago if order.metodo_pago else "N/A", # Mostrar método de pago
-                    order.direccion_delivery,
-                    ft.Row([
-                        # ft.IconButton(
-                        #     icon=ft.icons.EDIT,
-                        #     tooltip="Editar Pedido",
-                        #     on_click=lambda e, order_id=order.id: show_snackbar(self.page, f"Editar pedido {order_id} - implementar.")
-                        # ),
-                        ft.IconButton(
-                            icon=ft.icons.DELETE,
-                            tooltip="Eliminar Pedido",
-                            on_click=lambda e, order_id=order.id: self._confirm_delete_order(e, order_id)
-                        )
-                    ])
-                ])
+        # Tabla virtualizada: los pedidos se piden por páginas, ordenados y filtrados en el servidor
+        self.order_table = VirtualDataTable(
+            ["ID", "Cliente", "Fecha/Hora", "Total", "Estado", "Método de Pago", "Dirección", "Acciones"],
+            self._fetch_order_rows,
+            column_widths=[60, 170, 140, 100, 110, 130, 220, 80],
+            sort_keys={"ID": "id", "Fecha/Hora": "fecha", "Total": "total", "Estado": "estado", "Método de Pago": "metodo_pago"},
+            sort_key="fecha",
+            heading_row_bgcolor=ft.colors.BLUE_GREY_700,
+            border_color=ft.colors.BLUE_GREY_700,
+            text_color=self.text_color
+        )
+        order_filter_field = create_search_field(
+            self.order_table.set_filter,
+            label="Filtrar pedidos",
+            hint_text="N° de pedido, cliente, estado, método de pago o dirección",
+            fill_color=self.textfield_fill_color,
+            text_color=self.text_color,
+            width=500
+        )
 
         self.admin_content_area.controls.append(
             CustomCard(
@@ -903,11 +1139,8 @@ class AdminView(ft.View):
                 bgcolor=self.card_bg_color,
                 content=ft.Column([
                     ft.Text("Monitorea y gestiona el estado de todos los pedidos.", size=16, color=self.text_color),
-                    create_data_table(order_columns, order_rows,
-                                      heading_row_bgcolor=ft.colors.BLUE_GREY_700,
-                                      data_row_bgcolor_hover=ft.colors.BLUE_GREY_800,
-                                      border_color=ft.colors.BLUE_GREY_700,
-                                      text_color=self.text_color),
+                    order_filter_field,
+                    self.order_table,
                     ft.Row([
                         # ft.ElevatedButton("Ver Detalles", on_click=lambda e: show_snackbar(self.page, "Ver detalles de pedido - implementar.")),
                         # ft.ElevatedButton("Actualizar Estado", on_click=lambda e: show_snackbar(self.page, "Actualizar estado de pedido - implementar.")),
@@ -916,11 +1149,34 @@ class AdminView(ft.View):
                 width=1000
             )
         )
-        self.admin_content_area.update()
+        mark_dirty(self.page, self.admin_content_area)
+        self._iniciar_refresco_tabla(self.order_table, self.pedido_service.get_pedidos_changed_since, self._order_to_row)
+
+    def _fetch_order_rows(self, offset: int, limit: int, sort_key: str, descending: bool, filtro: str, with_total: bool):
+        """Fuente de datos de la tabla de pedidos (una consulta paginada por llamada)."""
+        pedidos, total = self.pedido_service.get_pedidos_page(offset, limit, sort_key, descending, filtro, with_total)
+        return [self._order_to_row(order) for order in pedidos or []], total
+
+    def _order_to_row(self, order) -> list:
+        """Convierte un pedido (con su cliente cargado) en una fila de la tabla de pedidos."""
+        client_name = order.cliente.nombre if order.cliente else "Desconocido"
+        order_date_time = order.fecha_hora.strftime("%Y-%m-%d %H:%M") if order.fecha_hora else "N/A"
+        return [
+            str(order.id), client_name, order_date_time,
+            f"${order.total:,.2f}", order.estado,
+            order.metodo_pago if order.metodo_pago else "N/A", # Mostrar método de pago
+            order.direccion_delivery,
+            ft.IconButton(
+                icon=ft.icons.DELETE,
+                tooltip="Eliminar Pedido",
+                on_click=lambda e, order_id=order.id: self._confirm_delete_order(e, order_id)
+            )
+        ]
 
+    @batched
     def _confirm_delete_order(self, e, order_id: int):
         """Muestra un diálogo de confirmación antes de eliminar un pedido."""
-        logger.info(f"Confirmación de eliminación para pedido ID: {order_id}.")
+        logger.info("Confirmación de eliminación para pedido ID: %s.", order_id)
         if not self.is_logged_in:
             self._load_admin_login_form()
             return
@@ -928,19 +1184,19 @@ class AdminView(ft.View):
         order_to_delete = self.pedido_service.get_pedido_by_id(order_id)
         if not order_to_delete:
             show_snackbar(self.page, "Pedido no encontrado para eliminar.", ft.colors.RED_500)
-            logger.warning(f"Intento de eliminar pedido con ID {order_id} no encontrado.")
+            logger.warning("Intento de eliminar pedido con ID %s no encontrado.", order_id)
             return
 
         def delete_confirmed(e):
-            logger.info(f"Eliminando pedido ID: {order_id}.")
+            logger.info("Eliminando pedido ID: %s.", order_id)
             result = self.pedido_service.delete_pedido(order_to_delete)
             if result:
                 show_snackbar(self.page, f"Pedido #{order_to_delete.id} eliminado con éxito.", ft.colors.GREEN_500)
-                logger.info(f"Pedido #{order_to_delete.id} eliminado con éxito.")
+                logger.info("Pedido #%s eliminado con éxito.", order_to_delete.id)
                 self._load_order_management() # Recarga la sección para mostrar los cambios
             else:
                 show_snackbar(self.page, "Error al eliminar el pedido.", ft.colors.RED_500)
-                logger.error(f"Error al eliminar el pedido con ID {order_id}.")
+                logger.error("Error al eliminar el pedido con ID %s.", order_id)
             self.page.close(confirm_dialog)
 
         confirm_dialog = ft.AlertDialog(
@@ -949,7 +1205,7 @@ class AdminView(ft.View):
             content=ft.Text(f"¿Estás seguro de que quieres eliminar el pedido #{order_to_delete.id}? Esto eliminará también sus detalles asociados.", color=self.text_color),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda e: self.page.close(confirm_dialog)),
-                ft.ElevatedButton("Eliminar", on_click=delete_confirmed, style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
+                ft.ElevatedButton("Eliminar", on_click=batched(delete_confirmed, self.page), style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
             ],
             actions_alignment=ft.MainAxisAlignment.END,
             bgcolor=self.card_bg_color,
@@ -957,7 +1213,7 @@ class AdminView(ft.View):
         )
         self.page.open(confirm_dialog)
         confirm_dialog.open = True
-        self.page.update()
+        request_page_update(self.page)
 
     def _load_finance_management(self):
         """Carga la sección para gestionar las finanzas (ingresos/gastos)."""
@@ -967,29 +1223,26 @@ class AdminView(ft.View):
             return
         self.admin_content_area.controls.clear()
         
-        registros = self.financiero_service.get_all_registros_financieros()
-        finance_columns = ["ID", "Fecha", "Tipo", "Monto", "Descripción", "Pedido ID", "Acciones"] # Añadida columna de Acciones
-        finance_rows = []
-        if registros:
-            for rec in registros:
-                rec_date = rec.fecha.strftime("%Y-%m-%d %H:%M") if rec.fecha else "N/A"
-                finance_rows.append([
-                    str(rec.id), rec_date, rec.tipo, f"${rec.monto:,.2f}",
-                    rec.descripcion if rec.descripcion else "", str(rec.pedido_id) if rec.pedido_id else "N/A",
-                    ft.Row([
-                        # ft.IconButton(
-                        #     icon=ft.icons.EDIT,
-                        #     tooltip="Editar Registro",
-                        #     on_click=lambda e, record_id=rec.id: show_snackbar(self.page, f"Editar registro {record_id} - implementar.")
-                        # ),
-                        ft.IconButton(
-                            icon=ft.icons.DELETE,
-                            tooltip="Eliminar Registro",
-                            on_click=lambda e, record_id=rec.id: self._confirm_delete_finance_record(e, record_id)
-                        )
-                    ])
-                ])
-        
+        # Tabla virtualizada: los registros se piden por páginas, ordenados y filtrados en el servidor
+        self.finance_table = VirtualDataTable(
+            ["ID", "Fecha", "Tipo", "Monto", "Descripción", "Pedido ID", "Acciones"],
+            self._fetch_finance_rows,
+            column_widths=[60, 140, 90, 110, 320, 90, 80],
+            sort_keys={"ID": "id", "Fecha": "fecha", "Tipo": "tipo", "Monto": "monto"},
+            sort_key="fecha",
+            heading_row_bgcolor=ft.colors.BLUE_GREY_700,
+            border_color=ft.colors.BLUE_GREY_700,
+            text_color=self.text_color
+        )
+        finance_filter_field = create_search_field(
+            self.finance_table.set_filter,
+            label="Filtrar registros",
+            hint_text="N° de pedido, tipo o descripción",
+            fill_color=self.textfield_fill_color,
+            text_color=self.text_color,
+            width=500
+        )
+
         # Calcular totales (ejemplo para el mes actual)
         today = date.today()
         first_day_of_month = date(today.year, today.month, 1)
@@ -1029,11 +1282,8 @@ class AdminView(ft.View):
                         ),
                     ], alignment=ft.MainAxisAlignment.CENTER),
                     ft.Divider(color=ft.colors.BLUE_GREY_700),
-                    create_data_table(finance_columns, finance_rows,
-                                      heading_row_bgcolor=ft.colors.BLUE_GREY_700,
-                                      data_row_bgcolor_hover=ft.colors.BLUE_GREY_800,
-                                      border_color=ft.colors.BLUE_GREY_700,
-                                      text_color=self.text_color),
+                    finance_filter_field,
+                    self.finance_table,
                     ft.Row([
                         # ft.ElevatedButton("Añadir Registro", on_click=lambda e: show_snackbar(self.page, "Añadir registro financiero - implementar.")),
                         # ft.ElevatedButton("Editar Registro", on_click=lambda e: show_snackbar(self.page, "Editar registro financiero - implementar.")),
@@ -1042,11 +1292,31 @@ class AdminView(ft.View):
                 width=1000
             )
         )
-        self.admin_content_area.update()
+        mark_dirty(self.page, self.admin_content_area)
+        self._iniciar_refresco_tabla(self.finance_table, self.financiero_service.get_registros_changed_since, self._finance_to_row)
+
+    def _fetch_finance_rows(self, offset: int, limit: int, sort_key: str, descending: bool, filtro: str, with_total: bool):
+        """Fuente de datos de la tabla de finanzas (una consulta paginada por llamada)."""
+        registros, total = self.financiero_service.get_registros_page(offset, limit, sort_key, descending, filtro, with_total)
+        return [self._finance_to_row(rec) for rec in registros or []], total
+
+    def _finance_to_row(self, rec) -> list:
+        """Convierte un registro financiero en una fila de la tabla de finanzas."""
+        rec_date = rec.fecha.strftime("%Y-%m-%d %H:%M") if rec.fecha else "N/A"
+        return [
+            str(rec.id), rec_date, rec.tipo, f"${rec.monto:,.2f}",
+            rec.descripcion if rec.descripcion else "", str(rec.pedido_id) if rec.pedido_id else "N/A",
+            ft.IconButton(
+                icon=ft.icons.DELETE,
+                tooltip="Eliminar Registro",
+                on_click=lambda e, record_id=rec.id: self._confirm_delete_finance_record(e, record_id)
+            )
+        ]
 
+    @batched
     def _confirm_delete_finance_record(self, e, record_id: int):
         """Muestra un diálogo de confirmación antes de eliminar un registro financiero."""
-        logger.info(f"Confirmación de eliminación para registro financiero ID: {record_id}.")
+        logger.info("Confirmación de eliminación para registro financiero ID: %s.", record_id)
         if not self.is_logged_in:
             self._load_admin_login_form()
             return
@@ -1054,19 +1324,19 @@ class AdminView(ft.View):
         record_to_delete = self.financiero_service.get_registro_by_id(record_id)
         if not record_to_delete:
             show_snackbar(self.page, "Registro financiero no encontrado para eliminar.", ft.colors.RED_500)
-            logger.warning(f"Intento de eliminar registro financiero con ID {record_id} no encontrado.")
+            logger.warning("Intento de eliminar registro financiero con ID %s no encontrado.", record_id)
             return
 
         def delete_confirmed(e):
-            logger.info(f"Eliminando registro financiero ID: {record_id}.")
+            logger.info("Eliminando registro financiero ID: %s.", record_id)
             result = self.financiero_service.delete_registro(record_to_delete)
             if result:
                 show_snackbar(self.page, f"Registro financiero #{record_to_delete.id} eliminado con éxito.", ft.colors.GREEN_500)
-                logger.info(f"Registro financiero #{record_to_delete.id} eliminado con éxito.")
+                logger.info("Registro financiero #%s eliminado con éxito.", record_to_delete.id)
                 self._load_finance_management() # Recarga la sección para mostrar los cambios
             else:
                 show_snackbar(self.page, "Error al eliminar el registro financiero.", ft.colors.RED_500)
-                logger.error(f"Error al eliminar el registro financiero con ID {record_id}.")
+                logger.error("Error al eliminar el registro financiero con ID %s.", record_id)
             self.page.close(confirm_dialog)
 
         confirm_dialog = ft.AlertDialog(
@@ -1075,7 +1345,7 @@ class AdminView(ft.View):
             content=ft.Text(f"¿Estás seguro de que quieres eliminar el registro financiero #{record_to_delete.id}?", color=self.text_color),
             actions=[
                 ft.TextButton("Cancelar", on_click=lambda e: self.page.close(confirm_dialog)),
-                ft.ElevatedButton("Eliminar", on_click=delete_confirmed, style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
+                ft.ElevatedButton("Eliminar", on_click=batched(delete_confirmed, self.page), style=ft.ButtonStyle(bgcolor=ft.colors.RED_700))
             ],
             actions_alignment=ft.MainAxisAlignment.END,
             bgcolor=self.card_bg_color,
@@ -1083,7 +1353,7 @@ class AdminView(ft.View):
         )
         self.page.open(confirm_dialog)
         confirm_dialog.open = True
-        self.page.update()
+        request_page_update(self.page)
 
 
     def _load_pizzeria_info_management(self):
@@ -1145,8 +1415,9 @@ class AdminView(ft.View):
                 width=600
             )
         )
-        self.admin_content_area.update() # Asegura que la UI se actualice
+        mark_dirty(self.page, self.admin_content_area) # Asegura que la UI se actualice
 
+    @batched
     def _save_pizzeria_info(self, e):
         """Método para guardar la información de la pizzería."""
         logger.info("Intentando guardar información de la pizzería.")
@@ -1235,7 +1506,7 @@ class AdminView(ft.View):
             else:
                 show_snackbar(self.page, "Error al añadir la información inicial.", ft.colors.RED_500)
                 logger.error("Error al añadir la información inicial de la pizzería.")
-        self.page.update()
+        request_page_update(self.page)
 
     def _load_admin_management(self):
         """Carga la sección para gestionar otros administradores (solo para super-admins)."""
@@ -1273,5 +1544,5 @@ class AdminView(ft.View):
                 width=800
             )
         )
-        self.admin_content_area.update()
+        mark_dirty(self.page, self.admin_content_area)
 
@@ -1,6 +1,7 @@
 # views/main_view.py
 import flet as ft
-from utils.widgets import CustomCard, create_data_table, show_snackbar, show_alert_dialog, create_date_picker, create_time_picker, create_message_box, create_simple_bar_chart
+from utils.widgets import CustomCard, create_data_table, show_snackbar, show_alert_dialog, create_date_picker, create_time_picker, create_message_box, create_simple_bar_chart, batched, mark_dirty, request_page_update
+from utils.carrito import Carrito
 import logging # Importa el módulo logging
 
 # Importamos los servicios necesarios
@@ -10,7 +11,11 @@ from services.menu_service import MenuService # Importa MenuService para obtener
 from services.cliente_service import ClienteService # Importar ClienteService
 from services.pedido_service import PedidoService # Importar PedidoService
 from services.financiero_service import FinancieroService # Importar FinancieroService
-from views.admin_view import AdminView # Importa AdminView para poder manipular su instancia
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Solo para las anotaciones: views.admin_view se importa al abrir el panel de administración (ver main.py)
+    from views.admin_view import AdminView
 
 logger = logging.getLogger(__name__) # Obtiene una instancia del logger para este módulo
 
@@ -19,7 +24,15 @@ class MainView(ft.View):
     Vista principal de la aplicación de la pizzería.
     Contiene la barra de navegación lateral, la barra superior y el contenido dinámico.
     """
-    def __init__(self, page: ft.Page, administrador_service: AdministradorService, admin_view_instance: AdminView, pizzeria_info_service: PizzeriaInfoService, menu_service: MenuService, cliente_service: ClienteService, pedido_service: PedidoService, financiero_service: FinancieroService): # Recibe los nuevos servicios
+    # Configuración de colores para modo oscuro. Son atributos de clase: el tema es inmutable
+    # y lo comparten todas las sesiones en lugar de copiarse en cada instancia.
+    page_bg_color = ft.colors.BLACK # Color de fondo general de la página/vista
+    card_bg_color = ft.colors.BLUE_GREY_900 # Color de fondo de las tarjetas
+    text_color = ft.colors.WHITE # Color de texto principal
+    nav_rail_bg_color = ft.colors.BLUE_GREY_900 # Color de fondo de la barra de navegación lateral
+    textfield_fill_color = ft.colors.BLUE_GREY_800 # Color de fondo para los TextField
+
+    def __init__(self, page: ft.Page, administrador_service: AdministradorService, admin_view_factory, pizzeria_info_service: PizzeriaInfoService, menu_service: MenuService, cliente_service: ClienteService, pedido_service: PedidoService, financiero_service: FinancieroService): # Recibe los nuevos servicios
         super().__init__()
         self.page = page
         self.route = "/" # Ruta por defecto para esta vista
@@ -31,8 +44,8 @@ class MainView(ft.View):
         self.cliente_service = cliente_service # Asigna ClienteService
         self.pedido_service = pedido_service # Asigna PedidoService
         self.financiero_service = financiero_service # Asigna FinancieroService
-        # Instancia de AdminView para poder manipular su estado
-        self.admin_view_instance = admin_view_instance
+        # Fábrica de la AdminView de esta sesión: se crea solo si se usa el panel de administración
+        self._admin_view_factory = admin_view_factory
 
         # Referencias a los campos de texto para el login
         self.admin_username_field = ft.TextField(
@@ -53,15 +66,8 @@ class MainView(ft.View):
             hint_style=ft.TextStyle(color=ft.colors.WHITE54)
         )
 
-        # Configuración de colores para modo oscuro
-        self.page_bg_color = ft.colors.BLACK # Color de fondo general de la página/vista
-        self.card_bg_color = ft.colors.BLUE_GREY_900 # Color de fondo de las tarjetas
-        self.text_color = ft.colors.WHITE # Color de texto principal
-        self.nav_rail_bg_color = ft.colors.BLUE_GREY_900 # Color de fondo de la barra de navegación lateral
-        self.textfield_fill_color = ft.colors.BLUE_GREY_800 # Color de fondo para los TextField
-
         self.drawer_open = False # Estado del drawer (panel lateral)
-        self.selected_items = {} # Diccionario para almacenar ítems seleccionados para el pedido: {item_id: cantidad}
+        self.carrito = Carrito() # Carrito de la sesión: copias de nombre/precio de los ítems y cantidades
 
         # Define el NavRail y su contenido
         self.navigation_rail = self._create_navigation_rail()
@@ -108,7 +114,17 @@ class MainView(ft.View):
         # Atributos para la sección de menú que necesitan ser accesibles globalmente en la clase
         self.menu_tabs = None
         self.menu_tab_content_area = None
-        self.tab_views_content_list = [] # Lista para almacenar los ft.Column de cada pestaña
+        self.tab_views_content_list = [] # ft.Column de cada pestaña (None hasta que se selecciona por primera vez)
+        self.tab_items_list = [] # Ítems de cada pestaña: [(items, mensaje_si_vacia), ...]
+        # Contadores de cantidad de cada tarjeta del menú: {item_id: [ft.Text, ...]}
+        # (un ítem aparece en la pestaña "Todos" y en la de su categoría). Permiten actualizar
+        # solo el contador al añadir/quitar un ítem en lugar de reconstruir todo el menú.
+        self.menu_card_counters = {}
+
+    @property
+    def admin_view_instance(self) -> "AdminView":
+        """AdminView de la sesión (se crea la primera vez que se necesita)."""
+        return self._admin_view_factory()
 
     def _create_navigation_rail(self):
         """Crea la barra de navegación lateral."""
@@ -144,6 +160,7 @@ class MainView(ft.View):
             on_change=self._on_navigation_rail_change,
         )
 
+    @batched
     def _on_navigation_rail_change(self, e):
         """Maneja el cambio de selección en el NavRail.
         
@@ -155,7 +172,7 @@ class MainView(ft.View):
         else: # Asume que es un ControlEvent
             selected_index = e.control.selected_index
         
-        logger.info(f"Navegación seleccionada: {selected_index}")
+        logger.info("Navegación seleccionada: %s", selected_index)
         self.navigation_rail.selected_index = selected_index # Actualiza el índice seleccionado
         if selected_index == 0:
             self._load_home_section()
@@ -165,7 +182,7 @@ class MainView(ft.View):
             self._load_orders_section() # Puedes definir esta función
         elif selected_index == 3: # Índice para administrador
             self._load_admin_section()
-        self.page.update()
+        request_page_update(self.page)
 
     def _load_home_section(self):
         """Carga la sección de inicio."""
@@ -234,60 +251,29 @@ class MainView(ft.View):
                 )
             )
         )
-        self.main_content_area.update() # Asegura que la UI se actualice
+        mark_dirty(self.page, self.main_content_area) # Asegura que la UI se actualice
 
     def _load_menu_section(self):
         """Carga la sección del menú con pestañas por categoría."""
         logger.info("Cargando sección de menú para el cliente con pestañas.")
         self.main_content_area.controls.clear()
+        self.menu_card_counters = {} # Las tarjetas se vuelven a crear y registran sus contadores
 
-        all_items = self.menu_service.get_all_items_menu()
-        all_categories = self.menu_service.get_all_categorias()
-
-        # Agrupar ítems por categoría
-        menu_by_category = {}
-        # Inicializar menu_by_category con todas las categorías existentes
-        for category in all_categories:
-            menu_by_category[category.nombre] = []
-
-        if all_items:
-            for item in all_items:
-                if item.disponible: # Solo mostrar ítems disponibles
-                    category_name = item.categoria.nombre if item.categoria else "Sin Categoría"
-                    if category_name in menu_by_category:
-                        menu_by_category[category_name].append(item)
-                    else: # En caso de que un ítem tenga una categoría no registrada previamente
-                        menu_by_category[category_name] = [item]
-        
-        # Crear la lista de pestañas (Tabs) y el contenido de las vistas
-        tabs = []
-        self.tab_views_content_list = [] # Reiniciar la lista de contenidos de las pestañas
-        
-        # Pestaña "Todos"
-        all_items_content = []
-        if all_items:
-            for item in all_items:
-                if item.disponible:
-                    all_items_content.append(self._create_menu_item_card(item))
-        else:
-            all_items_content.append(ft.Text("¡No hay ítems disponibles en el menú por ahora!", size=16, color=ft.colors.WHITE54))
+        # Catálogo inmutable compartido por todas las sesiones (sin consultas si ya está en caché)
+        catalogo = self.menu_service.get_catalogo()
+        available_items = catalogo.items if catalogo else ()
+        menu_by_category = catalogo.por_categoria if catalogo else ()
 
-        tabs.append(ft.Tab(text="Todos"))
-        # El scroll se aplica al Column, no al Container que lo envuelve
-        self.tab_views_content_list.append(ft.Column(all_items_content, spacing=15, horizontal_alignment=ft.CrossAxisAlignment.CENTER, scroll=ft.ScrollMode.AUTO, expand=True))
+        # Crear la lista de pestañas (Tabs). El contenido de cada pestaña se construye al seleccionarla
+        # por primera vez (ver _get_tab_content), así el primer render solo crea las tarjetas visibles.
+        tabs = [ft.Tab(text="Todos")]
+        self.tab_items_list = [(available_items, "¡No hay ítems disponibles en el menú por ahora!")]
 
         # Pestañas por categoría
-        for category_name, items in menu_by_category.items():
+        for category_name, items in menu_by_category:
             tabs.append(ft.Tab(text=category_name))
-            category_items_content = []
-            if items:
-                for item in items:
-                    category_items_content.append(self._create_menu_item_card(item))
-            else:
-                category_items_content.append(ft.Text(f"No hay ítems en la categoría '{category_name}'.", size=14, color=ft.colors.WHITE54))
-            
-            # El scroll se aplica al Column, no al Container que lo envuelve
-            self.tab_views_content_list.append(ft.Column(category_items_content, spacing=15, horizontal_alignment=ft.CrossAxisAlignment.CENTER, scroll=ft.ScrollMode.AUTO, expand=True))
+            self.tab_items_list.append((items, f"No hay ítems en la categoría '{category_name}'."))
+        self.tab_views_content_list = [None] * len(self.tab_items_list)
 
         # El componente Tabs
         self.menu_tabs = ft.Tabs(
@@ -304,7 +290,7 @@ class MainView(ft.View):
         # El contenedor que mostrará el contenido de la pestaña seleccionada
         # Inicialmente muestra el contenido de la primera pestaña (Todos)
         self.menu_tab_content_area = ft.Container(
-            content=self.tab_views_content_list[self.menu_tabs.selected_index],
+            content=self._get_tab_content(self.menu_tabs.selected_index),
             expand=True, # Permite que ocupe el espacio disponible
             # Eliminado: scroll=ft.ScrollMode.AUTO de aquí
         )
@@ -333,21 +319,42 @@ class MainView(ft.View):
                 width=800
             )
         )
-        self.main_content_area.update()
+        mark_dirty(self.page, self.main_content_area)
 
+    @batched
     def _on_tab_change(self, e):
         """Maneja el cambio de pestaña en la sección del menú."""
         selected_index = e.control.selected_index
-        logger.info(f"Pestaña del menú cambiada a índice: {selected_index}")
+        logger.info("Pestaña del menú cambiada a índice: %s", selected_index)
         # Actualizar el contenido del contenedor principal del menú
         if self.menu_tab_content_area and selected_index < len(self.tab_views_content_list):
-            self.menu_tab_content_area.content = self.tab_views_content_list[selected_index]
-            self.menu_tab_content_area.update() # Forzar la actualización del contenedor de contenido
-        self.page.update()
+            self.menu_tab_content_area.content = self._get_tab_content(selected_index)
+            mark_dirty(self.page, self.menu_tab_content_area) # Forzar la actualización del contenedor de contenido
+        request_page_update(self.page)
 
 
+    def _get_tab_content(self, index: int):
+        """
+        Obtiene el contenido de una pestaña del menú, construyéndolo la primera vez que se necesita.
+        El resultado se memoriza para la sesión hasta que se vuelve a cargar la sección del menú.
+        """
+        content = self.tab_views_content_list[index]
+        if content is None:
+            items, empty_message = self.tab_items_list[index]
+            if items:
+                cards = [self._create_menu_item_card(item) for item in items]
+            else:
+                cards = [ft.Text(empty_message, size=16 if index == 0 else 14, color=ft.colors.WHITE54)]
+            # El scroll se aplica al Column, no al Container que lo envuelve
+            content = ft.Column(cards, spacing=15, horizontal_alignment=ft.CrossAxisAlignment.CENTER, scroll=ft.ScrollMode.AUTO, expand=True)
+            self.tab_views_content_list[index] = content
+            logger.debug("Pestaña del menú %s construida: %s tarjetas.", index, len(items))
+        return content
+
     def _create_menu_item_card(self, item):
-        """Crea una tarjeta (Card) para un ítem del menú."""
+        """Crea una tarjeta (Card) para un ítem del menú y registra su contador de cantidad."""
+        counter_text = ft.Text(str(self.carrito.cantidad(item.id)), size=16, color=self.text_color, text_align=ft.TextAlign.CENTER)
+        self.menu_card_counters.setdefault(item.id, []).append(counter_text)
         return ft.Card(
             elevation=3,
             content=ft.Container(
@@ -373,9 +380,9 @@ class MainView(ft.View):
                             icon=ft.icons.ADD_SHOPPING_CART,
                             tooltip="Añadir al Pedido",
                             icon_color=ft.colors.BLUE_400,
-                            on_click=lambda e, item_id=item.id, item_name=item.nombre, item_price=item.precio: self._add_to_order(item_id, item_name, item_price)
+                            on_click=lambda e, item=item: self._add_to_order(item)
                         ),
-                        ft.Text(str(self.selected_items.get(item.id, 0)), size=16, color=self.text_color, text_align=ft.TextAlign.CENTER),
+                        counter_text,
                         ft.IconButton(
                             icon=ft.icons.REMOVE_SHOPPING_CART,
                             tooltip="Quitar del Pedido",
@@ -390,67 +397,77 @@ class MainView(ft.View):
         )
 
 
-    def _add_to_order(self, item_id: int, item_name: str, item_price: float):
+    def _update_menu_card_counter(self, item_id: int):
+        """
+        Actualiza el contador de cantidad de las tarjetas de un ítem.
+        Solo se modifica el valor de los ft.Text; el page.update() posterior (ej. el de show_snackbar)
+        envía únicamente esos cambios, sin importar el tamaño del menú, y conserva la pestaña y el scroll.
+        """
+        quantity = str(self.carrito.cantidad(item_id))
+        for counter_text in self.menu_card_counters.get(item_id, ()):
+            counter_text.value = quantity
+
+    @batched
+    def _add_to_order(self, item):
         """Añade un ítem al pedido del cliente."""
-        self.selected_items[item_id] = self.selected_items.get(item_id, 0) + 1
-        show_snackbar(self.page, f"'{item_name}' añadido al pedido. Cantidad: {self.selected_items[item_id]}", ft.colors.BLUE_GREY_600)
-        logger.info(f"Añadido item {item_name} (ID: {item_id}). Cantidad: {self.selected_items[item_id]}") # Corregido para item_id directamente
-        self._load_menu_section() # Recargar la sección del menú para actualizar las cantidades
-        # No llamar a page.update() aquí, lo hará _load_menu_section()
+        quantity = self.carrito.agregar(item)
+        self._update_menu_card_counter(item.id)
+        show_snackbar(self.page, f"'{item.nombre}' añadido al pedido. Cantidad: {quantity}", ft.colors.BLUE_GREY_600)
+        logger.info("Añadido item %s (ID: %s). Cantidad: %s", item.nombre, item.id, quantity)
+        # No llamar a page.update() aquí, lo hace show_snackbar()
 
+    @batched
     def _remove_from_order(self, item_id: int):
         """Remueve un ítem del pedido del cliente."""
-        if item_id in self.selected_items:
-            self.selected_items[item_id] -= 1
-            if self.selected_items[item_id] <= 0:
-                del self.selected_items[item_id]
+        linea = self.carrito.quitar(item_id)
+        if linea:
+            self._update_menu_card_counter(item_id) # show_snackbar() envía el cambio del contador
+            if linea.cantidad <= 0:
                 show_snackbar(self.page, "Ítem removido del pedido.", ft.colors.AMBER_600)
-                logger.info(f"Removido item ID: {item_id}. Cantidad: 0.")
+                logger.info("Removido item ID: %s. Cantidad: 0.", item_id)
             else:
-                item_name = self.menu_service.get_item_menu_by_id(item_id).nombre # Obtener nombre para snackbar
-                show_snackbar(self.page, f"Cantidad de '{item_name}' reducida. Cantidad: {self.selected_items[item_id]}", ft.colors.AMBER_600)
-                logger.info(f"Cantidad de item ID: {item_id} reducida. Cantidad: {self.selected_items[item_id]}.")
+                show_snackbar(self.page, f"Cantidad de '{linea.nombre}' reducida. Cantidad: {linea.cantidad}", ft.colors.AMBER_600)
+                logger.info("Cantidad de item ID: %s reducida. Cantidad: %s.", item_id, linea.cantidad)
         else:
             show_snackbar(self.page, "El ítem no está en tu pedido.", ft.colors.RED_500)
-            logger.warning(f"Intento de remover ítem ID: {item_id} que no está en el pedido.")
-        self._load_menu_section() # Recargar la sección del menú para actualizar las cantidades
+            logger.warning("Intento de remover ítem ID: %s que no está en el pedido.", item_id)
 
     def _load_orders_section(self):
         """Carga la sección de pedidos."""
         logger.info("Cargando sección de pedidos para el cliente.")
         self.main_content_area.controls.clear()
 
+        # Revalidar nombres/precios del carrito con una sola consulta al menú
+        for linea in self.carrito.refrescar(self.menu_service):
+            self._update_menu_card_counter(linea.item_id)
+            logger.info("Ítem ID: %s quitado del carrito: ya no está disponible.", linea.item_id)
+
         # Mostrar ítems seleccionados
         order_items_display = []
-        total_order_price = 0.0
 
-        if not self.selected_items:
+        if not self.carrito:
             order_items_display.append(ft.Text("Tu carrito está vacío. ¡Explora nuestro menú!", size=16, color=self.text_color))
         else:
             order_items_display.append(ft.Text("Detalles de tu Pedido:", size=20, weight=ft.FontWeight.BOLD, color=self.text_color))
-            for item_id, quantity in self.selected_items.items():
-                item = self.menu_service.get_item_menu_by_id(item_id)
-                if item:
-                    item_total = item.precio * quantity
-                    total_order_price += item_total
-                    order_items_display.append(
-                        ft.Row([
-                            ft.Text(f"{quantity} x {item.nombre}", expand=True, color=self.text_color),
-                            ft.Text(f"${item_total:,.2f}", color=self.text_color),
-                            ft.IconButton(
-                                icon=ft.icons.DELETE_FOREVER,
-                                tooltip="Quitar todo el ítem",
-                                icon_color=ft.colors.RED_700,
-                                on_click=lambda e, item_id=item.id: self._remove_all_of_item(item_id)
-                            )
-                        ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN, vertical_alignment=ft.CrossAxisAlignment.CENTER)
-                    )
+            for linea in self.carrito.lineas():
+                order_items_display.append(
+                    ft.Row([
+                        ft.Text(f"{linea.cantidad} x {linea.nombre}", expand=True, color=self.text_color),
+                        ft.Text(f"${linea.subtotal:,.2f}", color=self.text_color),
+                        ft.IconButton(
+                            icon=ft.icons.DELETE_FOREVER,
+                            tooltip="Quitar todo el ítem",
+                            icon_color=ft.colors.RED_700,
+                            on_click=lambda e, item_id=linea.item_id: self._remove_all_of_item(item_id)
+                        )
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN, vertical_alignment=ft.CrossAxisAlignment.CENTER)
+                )
             
             order_items_display.append(ft.Divider(color=ft.colors.BLUE_GREY_700))
             order_items_display.append(
                 ft.Row([
                     ft.Text("Total del Pedido:", size=22, weight=ft.FontWeight.BOLD, color=self.text_color),
-                    ft.Text(f"${total_order_price:,.2f}", size=22, weight=ft.FontWeight.BOLD, color=ft.colors.GREEN_500)
+                    ft.Text(f"${self.carrito.total:,.2f}", size=22, weight=ft.FontWeight.BOLD, color=ft.colors.GREEN_500)
                 ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
             )
 
@@ -483,17 +500,19 @@ class MainView(ft.View):
                 width=600
             )
         )
-        self.main_content_area.update()
+        mark_dirty(self.page, self.main_content_area)
 
+    @batched
     def _remove_all_of_item(self, item_id: int):
         """Elimina todas las unidades de un ítem del pedido."""
-        if item_id in self.selected_items:
-            item_name = self.menu_service.get_item_menu_by_id(item_id).nombre # Obtener nombre para snackbar
-            del self.selected_items[item_id]
-            show_snackbar(self.page, f"Todas las unidades de '{item_name}' removidas del pedido.", ft.colors.AMBER_700)
-            logger.info(f"Todas las unidades de item ID: {item_id} removidas.")
+        linea = self.carrito.quitar_todo(item_id)
+        if linea:
+            self._update_menu_card_counter(item_id)
+            show_snackbar(self.page, f"Todas las unidades de '{linea.nombre}' removidas del pedido.", ft.colors.AMBER_700)
+            logger.info("Todas las unidades de item ID: %s removidas.", item_id)
         self._load_orders_section() # Recargar la sección de pedidos para actualizar la vista
 
+    @batched
     def _show_payment_options(self, e):
         """Muestra un diálogo para que el cliente elija el método de pago."""
         logger.info("Mostrando opciones de pago.")
@@ -511,9 +530,9 @@ class MainView(ft.View):
                 self._display_pago_movil_info()
             else:
                 self._hide_pago_movil_info()
-            self.page.update()
+            request_page_update(self.page)
 
-        self.payment_method.on_change = on_payment_selected
+        self.payment_method.on_change = batched(on_payment_selected, self.page)
 
         self.pago_movil_info_display = ft.Column([], visible=False) # Contenedor para la info de Pago Móvil
 
@@ -537,7 +556,7 @@ class MainView(ft.View):
         )
         self.page.open(payment_dialog)
         payment_dialog.open = True
-        self.page.update()
+        request_page_update(self.page)
 
     def _display_pago_movil_info(self):
         """Muestra la información de Pago Móvil y el botón de WhatsApp."""
@@ -587,23 +606,24 @@ class MainView(ft.View):
             self.pago_movil_info_display.controls.append(ft.Text("Información de Pago Móvil no configurada. Por favor, consulta a la administración.", color=ft.colors.RED_400))
             self.pago_movil_info_display.visible = True # Mostrar el mensaje de error
         
-        self.pago_movil_info_display.update() # Asegura que el contenido se actualice
+        mark_dirty(self.page, self.pago_movil_info_display) # Asegura que el contenido se actualice
 
     def _hide_pago_movil_info(self):
         """Oculta la información de Pago Móvil."""
         logger.info("Ocultando información de Pago Móvil.")
         self.pago_movil_info_display.visible = False
         self.pago_movil_info_display.controls.clear()
-        self.pago_movil_info_display.update()
+        mark_dirty(self.page, self.pago_movil_info_display)
 
+    @batched
     def _confirm_order_with_payment(self, dialog):
         """
         Confirma el pedido con el método de pago seleccionado
         y cierra el diálogo de pago.
         """
-        logger.info(f"Confirmando pedido con método de pago: {self.payment_method.value}")
+        logger.info("Confirmando pedido con método de pago: %s", self.payment_method.value)
         dialog.open = False # Cerrar el diálogo de selección de pago
-        self.page.update()
+        request_page_update(self.page)
 
         customer_name = self.customer_name_field.value
         customer_phone = self.customer_phone_field.value
@@ -616,68 +636,41 @@ class MainView(ft.View):
             return
         
         try:
-            # 1. Gestionar el cliente: buscar existente o crear nuevo
-            cliente = None
-            if customer_email:
-                cliente = self.cliente_service.get_cliente_by_email(customer_email)
-            
-            if not cliente:
-                clientes_por_telefono = self.cliente_service.search_clientes(query=customer_phone)
-                if clientes_por_telefono:
-                    cliente_match = next((c for c in clientes_por_telefono if c.nombre.lower() == customer_name.lower()), None)
-                    if cliente_match:
-                        cliente = cliente_match
-                        logger.info(f"Cliente existente encontrado por nombre y teléfono con ID: {cliente.id}")
-                
-                if not cliente: # Si aún no se encontró, crear un nuevo cliente
-                    logger.info(f"Cliente no encontrado. Creando nuevo cliente: {customer_name}")
-                    cliente_data = {
-                        'nombre': customer_name,
-                        'telefono': customer_phone,
-                        'direccion': delivery_address
-                    }
-                    if customer_email:
-                        cliente_data['email'] = customer_email
-                    
-                    cliente = self.cliente_service.add_cliente(cliente_data)
-                    if not cliente:
-                        show_snackbar(self.page, "Error al registrar un nuevo cliente.", ft.colors.RED_500)
-                        logger.error("Fallo al añadir nuevo cliente.")
-                        return
-
-            logger.info(f"Cliente final para el pedido con ID: {cliente.id}")
+            # 1. Registrar o actualizar el cliente en una sola sentencia (upsert por teléfono normalizado)
+            cliente_data = {
+                'nombre': customer_name,
+                'telefono': customer_phone,
+                'email': customer_email,
+                'direccion': delivery_address
+            }
+            cliente_id = self.cliente_service.upsert_cliente(cliente_data)
+            if not cliente_id:
+                show_snackbar(self.page, "Error al registrar el cliente.", ft.colors.RED_500)
+                logger.error("Fallo al registrar (upsert) el cliente.")
+                return
+
+            logger.info("Cliente final para el pedido con ID: %s", cliente_id)
 
             # 2. Preparar ítems para el pedido
-            items_para_pedido = []
-            for item_id, quantity in self.selected_items.items():
-                items_para_pedido.append({'item_id': item_id, 'cantidad': quantity})
+            items_para_pedido = self.carrito.items_para_pedido()
 
-            # Calcular el total del pedido antes de añadirlo (podría ser redundante si el servicio ya lo hace, pero es buena práctica)
-            total_pedido_calculated = sum(self.menu_service.get_item_menu_by_id(item_id).precio * quantity for item_id, quantity in self.selected_items.items() if self.menu_service.get_item_menu_by_id(item_id))
-
-
-            # 3. Añadir el pedido a la base de datos, incluyendo el método de pago
-            nuevo_pedido = self.pedido_service.add_pedido(
-                cliente_id=cliente.id,
+            # 3. Registrar el pedido, sus detalles y el ingreso en una sola transacción.
+            # El total se calcula en el servicio con los precios actuales del menú.
+            recibo = self.pedido_service.place_order(
+                cliente_id=cliente_id,
                 direccion_delivery=delivery_address,
                 items_con_cantidad=items_para_pedido,
-                total=total_pedido_calculated, # Asegúrate que el servicio acepte 'total' como argumento
                 metodo_pago=metodo_pago # Pasa el método de pago
             )
 
-            if nuevo_pedido:
-                # 4. Registrar la transacción financiera (ingreso)
-                self.financiero_service.add_registro(
-                    tipo='Ingreso',
-                    monto=nuevo_pedido.total,
-                    descripcion=f"Venta de pedido #{nuevo_pedido.id} ({metodo_pago}) a {cliente.nombre}",
-                    pedido_id=nuevo_pedido.id
-                )
-                show_snackbar(self.page, f"¡Pedido #{nuevo_pedido.id} realizado con éxito para {cliente.nombre}! Total: ${nuevo_pedido.total:,.2f} ({metodo_pago})", ft.colors.GREEN_700)
-                logger.info(f"Pedido #{nuevo_pedido.id} completado y registrado. Cliente: {cliente.nombre}, Total: {nuevo_pedido.total}, Método: {metodo_pago}")
+            if recibo:
+                show_snackbar(self.page, f"¡Pedido #{recibo.pedido_id} realizado con éxito para {recibo.cliente_nombre}! Total: ${recibo.total:,.2f} ({metodo_pago})", ft.colors.GREEN_700)
+                logger.info("Pedido #%s completado y registrado. Cliente: %s, Total: %s, Método: %s", recibo.pedido_id, recibo.cliente_nombre, recibo.total, metodo_pago)
 
                 # Limpiar el carrito y campos de formulario después del pedido exitoso
-                self.selected_items.clear()
+                self.carrito.vaciar()
+                for item_id in self.menu_card_counters:
+                    self._update_menu_card_counter(item_id)
                 self.customer_name_field.value = ""
                 self.customer_phone_field.value = ""
                 self.customer_email_field.value = ""
@@ -692,7 +685,7 @@ class MainView(ft.View):
             show_snackbar(self.page, f"Ocurrió un error inesperado al procesar el pedido: {ex}", ft.colors.RED_700)
             logger.exception("Error inesperado en _confirm_order_with_payment:")
         
-        self.page.update()
+        request_page_update(self.page)
 
 
     def _load_admin_section(self):
@@ -717,8 +710,9 @@ class MainView(ft.View):
                 width=400
             )
         )
-        self.main_content_area.update() # Asegura que la UI se actualice
+        mark_dirty(self.page, self.main_content_area) # Asegura que la UI se actualice
 
+    @batched
     def _admin_login(self, e):
         """
         Maneja la lógica de inicio de sesión del administrador.
@@ -726,27 +720,29 @@ class MainView(ft.View):
         username = self.admin_username_field.value
         password = self.admin_password_field.value
 
-        logger.info(f"Intento de login para usuario: {username}")
+        logger.info("Intento de login para usuario: %s", username)
 
         if not username or not password:
             show_snackbar(self.page, "Por favor, ingresa usuario y contraseña.", ft.colors.RED_500)
             logger.warning("Intento de login fallido: campos vacíos.")
             return
 
-        admin_user = self.administrador_service.get_administrador_by_usuario(username)
+        resultado = self.administrador_service.autenticar(username, password, self.page.client_ip)
+        admin_user = resultado.admin
 
-        if admin_user and self.administrador_service.check_password(password, admin_user.contrasena_hash):
-            logger.info(f"Login exitoso para el usuario: {username}")
+        if resultado.bloqueado:
+            show_snackbar(self.page, f"Demasiados intentos de inicio de sesión. Inténtalo de nuevo en {max(1, int(resultado.reintentar_en))} segundos.", ft.colors.RED_500)
+        elif admin_user and self.admin_view_instance.iniciar_sesion(admin_user):
+            logger.info("Login exitoso para el usuario: %s", username)
             show_snackbar(self.page, f"¡Bienvenido, {admin_user.usuario}! Sesión iniciada.", ft.colors.GREEN_500)
             
-            # Establecer el estado de login en la instancia de AdminView
-            self.admin_view_instance.is_logged_in = True
+            # La sesión (token con expiración) ya quedó registrada en la instancia de AdminView
             # Forzar la recarga del dashboard en AdminView
             self.admin_view_instance._load_dashboard_section() # Asegurarse de que el dashboard se cargue
 
             self.page.go("/admin") # Redirige a la ruta de administración
         else:
-            logger.warning(f"Login fallido para el usuario: {username}. Credenciales incorrectas.")
+            logger.warning("Login fallido para el usuario: %s. Credenciales incorrectas.", username)
             show_snackbar(self.page, "Usuario o contraseña incorrectos.", ft.colors.RED_500)
-        self.page.update()
+        request_page_update(self.page)
 